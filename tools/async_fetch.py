@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+async_fetch - asyncio fetch engine for the metadata phases of the batch tools
+
+The metadata phase of a large selection is dominated by round trips, not
+work. AsyncFetchEngine runs many fetch coroutines on one event loop under a
+single concurrency semaphore: `gh` calls become `asyncio` subprocesses, and
+blocking calls (such as GitHubClient requests, since the standard library
+has no async HTTP client) run on a worker pool sized to the same limit.
+With a RateLimitScheduler, `gh` calls are paced to the remaining budget and
+retried on rate limits and server errors without blocking the loop.
+"""
+
+import asyncio
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, List, Sequence, TypeVar
+
+from rate_limit import RateLimitScheduler, gh_resource
+
+
+DEFAULT_FETCH_CONCURRENCY = 16
+
+T = TypeVar("T")
+
+
+class AsyncFetchEngine:
+    """Run fetch coroutines concurrently, at most `concurrency` requests at a time."""
+
+    def __init__(
+        self,
+        concurrency: int = DEFAULT_FETCH_CONCURRENCY,
+        scheduler: RateLimitScheduler | None = None,
+    ) -> None:
+        self.concurrency = max(1, concurrency)
+        self.scheduler = scheduler
+        self._semaphore: asyncio.Semaphore | None = None
+        self._executor: ThreadPoolExecutor | None = None
+        self.requests = 0
+
+    def gather(
+        self, factories: Sequence[Callable[[], Awaitable[T]]]
+    ) -> List[T | BaseException]:
+        """Run every coroutine factory on a fresh event loop.
+
+        Results come back in input order; a failed coroutine contributes its
+        exception instead of cancelling the others.
+        """
+        if not factories:
+            return []
+
+        async def run_all() -> List[T | BaseException]:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            try:
+                return await asyncio.gather(
+                    *(factory() for factory in factories), return_exceptions=True
+                )
+            finally:
+                self._semaphore = None
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            self._executor = executor
+            try:
+                return asyncio.run(run_all())
+            finally:
+                self._executor = None
+
+    def _slot(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            raise RuntimeError("AsyncFetchEngine requests must run inside gather()")
+        return self._semaphore
+
+    async def gh(self, args: Sequence[str], check: bool = True) -> str:
+        """Run `gh <args>` as an asyncio subprocess and return its stripped stdout."""
+        resource = gh_resource(args)
+        attempt = 0
+        while True:
+            if self.scheduler is not None:
+                await asyncio.sleep(self.scheduler.reserve(resource))
+            async with self._slot():
+                self.requests += 1
+                process = await asyncio.create_subprocess_exec(
+                    "gh",
+                    *args,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                )
+                stdout, stderr = await process.communicate()
+            if process.returncode == 0 or self.scheduler is None:
+                break
+            delay = self.scheduler.retry_delay_for_gh(
+                attempt, stderr.decode("utf-8", errors="replace")
+            )
+            if delay is None:
+                break
+            await asyncio.sleep(delay)
+            attempt += 1
+        if check and process.returncode != 0:
+            raise subprocess.CalledProcessError(
+                process.returncode or 1, ["gh", *args], stdout, stderr
+            )
+        return stdout.decode("utf-8", errors="replace").strip()
+
+    async def call(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a blocking call on the engine's worker pool under the same limit."""
+        async with self._slot():
+            self.requests += 1
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, lambda: func(*args, **kwargs))
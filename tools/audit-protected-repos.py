@@ -19,6 +19,9 @@ import subprocess
 import sys
 from pathlib import Path
 
+from github_client import GITHUB_REQUEST_ERRORS, GitHubClient
+from rate_limit import RateLimitScheduler
+
 CONFIG = json.loads(
     (Path(__file__).parent.parent / "governance" / "protected-repos.json").read_text()
 )
@@ -26,13 +29,33 @@ CONFIG = json.loads(
 errors = []
 checks = 0
 
+# One pooled client for every repo when GH_TOKEN is set; otherwise each call runs gh.
+# Either way requests are paced to the remaining budget and retried on rate limits.
+RATE_LIMITS = RateLimitScheduler()
+CLIENT = GitHubClient.from_environment(scheduler=RATE_LIMITS)
+RATE_LIMITS.refresh((lambda: CLIENT.get_json("rate_limit")) if CLIENT is not None else None)
+
 
 def gh_api(path: str) -> dict:
-    out = subprocess.check_output(
-        ["gh", "api", "-H", "Accept: application/vnd.github+json", path],
-        text=True,
-    )
-    return json.loads(out)
+    if CLIENT is not None:
+        return CLIENT.get_json(path)
+    attempt = 0
+    while True:
+        RATE_LIMITS.acquire("core")
+        result = subprocess.run(
+            ["gh", "api", "-H", "Accept: application/vnd.github+json", path],
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode == 0:
+            return json.loads(result.stdout)
+        delay = RATE_LIMITS.retry_delay_for_gh(attempt, result.stderr)
+        if delay is None:
+            raise subprocess.CalledProcessError(
+                result.returncode, result.args, result.stdout, result.stderr
+            )
+        RATE_LIMITS.sleep(delay)
+        attempt += 1
 
 
 def names(items) -> list[str]:
@@ -54,7 +77,7 @@ for entry in CONFIG["repos"]:
 
     try:
         protection = gh_api(f"repos/{repo}/branches/{branch}/protection")
-    except subprocess.CalledProcessError as exc:
+    except (subprocess.CalledProcessError, *GITHUB_REQUEST_ERRORS) as exc:
         errors.append(f"{prefix}: unable to read protection settings ({exc})")
         continue
 
@@ -132,6 +155,13 @@ for entry in CONFIG["repos"]:
         checks += 1
 
 
+if RATE_LIMITS.throttled:
+    RATE_LIMITS.refresh((lambda: CLIENT.get_json("rate_limit")) if CLIENT is not None else None)
+for line in RATE_LIMITS.report_lines():
+    print(line)
+if CLIENT is not None:
+    CLIENT.close()
+
 print(f"Protected repo audit: {checks} checks passed, {len(errors)} failed\n")
 
 if errors:
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+batch_cache - Persistent result cache for the batch big-picture tools
+
+Entries live in an SQLite index next to content-addressed blob files, so
+identical payloads (the same diff or log reached through different keys)
+are stored once. Immutable inputs such as diffs between two SHAs or logs of
+completed runs are stored without an expiry; mutable data such as PR
+metadata is stored with a TTL. A running total of blob bytes is kept, so the
+least-recently-used scan only runs when a put pushes the store over its size
+cap, plus once at close() to drop expired entries.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any
+
+
+DEFAULT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_CACHE_TTL = 600
+
+
+class ResultCache:
+    """SQLite-indexed, content-addressed cache for command and API results."""
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_CACHE_MAX_BYTES) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(directory, "blobs"), exist_ok=True)
+        self._db = sqlite3.connect(
+            os.path.join(directory, "index.sqlite3"), check_same_thread=False
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY,"
+            " blob TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " expires REAL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._db.commit()
+        self._stored_bytes = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM"
+            " (SELECT MAX(size) AS size FROM entries GROUP BY blob)"
+        ).fetchone()[0]
+
+    @staticmethod
+    def make_key(namespace: str, *parts: Any) -> str:
+        """Build a stable cache key from a namespace and JSON-serializable parts."""
+        encoded = json.dumps(parts, sort_keys=True, separators=(",", ":"))
+        return f"{namespace}:{hashlib.sha256(encoded.encode('utf-8')).hexdigest()}"
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.directory, "blobs", digest[:2], digest)
+
+    def get_path(self, key: str) -> str | None:
+        """Return the blob file backing a live entry, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT blob, expires FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] < now):
+                self.misses += 1
+                return None
+            path = self._blob_path(row[0])
+            if not os.path.exists(path):
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._db.commit()
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.hits += 1
+            return path
+
+    def get_bytes(self, key: str) -> bytes | None:
+        path = self.get_path(key)
+        if path is None:
+            return None
+        with open(path, "rb") as blob_file:
+            return blob_file.read()
+
+    def get_json(self, key: str) -> Any:
+        data = self.get_bytes(key)
+        return None if data is None else json.loads(data.decode("utf-8"))
+
+    def put_bytes(self, key: str, data: bytes, ttl: float | None = None) -> None:
+        """Store a payload; ttl=None marks it immutable."""
+        fd, temp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, "wb") as temp_file:
+            temp_file.write(data)
+        self.put_file(key, temp_path, ttl)
+
+    def put_json(self, key: str, value: Any, ttl: float | None = None) -> None:
+        self.put_bytes(key, json.dumps(value).encode("utf-8"), ttl)
+
+    def put_file(self, key: str, source_path: str, ttl: float | None = None) -> None:
+        """Move a finished file into the blob store under its content hash."""
+        digest = hashlib.sha256()
+        with open(source_path, "rb") as source:
+            for chunk in iter(lambda: source.read(1024 * 1024), b""):
+                digest.update(chunk)
+        blob = digest.hexdigest()
+        size = os.path.getsize(source_path)
+        blob_path = self._blob_path(blob)
+        now = time.time()
+        expires = None if ttl is None else now + ttl
+        with self._lock:
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            if os.path.exists(blob_path):
+                os.remove(source_path)
+            else:
+                os.replace(source_path, blob_path)
+                self._stored_bytes += size
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, blob, size, expires, accessed) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, blob, size, expires, now),
+            )
+            self._db.commit()
+            over_cap = bool(self.max_bytes) and self._stored_bytes > self.max_bytes
+        if over_cap:
+            self.evict()
+
+    def new_temp_path(self) -> str:
+        """Return a temp file path on the cache filesystem for put_file."""
+        fd, temp_path = tempfile.mkstemp(dir=self.directory)
+        os.close(fd)
+        return temp_path
+
+    def evict(self) -> None:
+        """Drop expired entries, then least recently used ones until under the size cap."""
+        now = time.time()
+        with self._lock:
+            candidates = {
+                row[0]
+                for row in self._db.execute(
+                    "SELECT blob FROM entries WHERE expires IS NOT NULL AND expires < ?",
+                    (now,),
+                )
+            }
+            self._db.execute(
+                "DELETE FROM entries WHERE expires IS NOT NULL AND expires < ?", (now,)
+            )
+            rows = self._db.execute(
+                "SELECT blob, MAX(size) FROM entries GROUP BY blob "
+                "ORDER BY MAX(accessed) DESC"
+            ).fetchall()
+            total = kept = 0
+            for blob, size in rows:
+                total += size
+                if self.max_bytes and total > self.max_bytes:
+                    candidates.add(blob)
+                    self._db.execute("DELETE FROM entries WHERE blob = ?", (blob,))
+                else:
+                    kept += size
+            self._db.commit()
+            self._stored_bytes = kept
+
+            for blob in candidates:
+                still_used = self._db.execute(
+                    "SELECT 1 FROM entries WHERE blob = ? LIMIT 1", (blob,)
+                ).fetchone()
+                if still_used is None:
+                    try:
+                        os.remove(self._blob_path(blob))
+                    except FileNotFoundError:
+                        pass
+
+    def close(self) -> None:
+        """Evict expired and over-cap entries once, then close the index."""
+        self.evict()
+        with self._lock:
+            self._db.close()
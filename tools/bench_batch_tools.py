@@ -0,0 +1,818 @@
+#!/usr/bin/env python3
+"""
+bench_batch_tools - Offline benchmarks for the batch big-picture tools
+
+Builds a synthetic git repository with N pull-request heads (and a linear
+chain of N commits), installs a fake `gh` on PATH that serves canned JSON
+for `repo view`, `pr view`, `api` and `run view`, and runs
+pr_batch_big_picture.py, commit_batch_big_picture.py and
+audit-protected-repos.py against it at several scales. Each run records
+wall time, subprocess and `gh` call counts and peak memory, so regressions
+show up without network access or a GitHub token.
+
+Usage:
+  python3 tools/bench_batch_tools.py --scales 10,100,1000 --output bench.json
+  python3 tools/bench_batch_tools.py --scales 10,100 --baseline bench.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+from command_runner import run_argv
+
+
+TOOLS_DIR = Path(__file__).resolve().parent
+BENCH_TOOLS = ("pr", "commit", "audit")
+DEFAULT_SCALES = "10,100,1000"
+DEFAULT_MAX_REGRESSION = 25.0
+BENCH_SLUG = "bench/repo"
+BENCH_EPOCH = 1_700_000_000
+# Every FAILING_EVERY-th item carries a failed check whose log is served by `gh run view`.
+FAILING_EVERY = 5
+
+FAKE_GH = r'''#!/usr/bin/env python3
+"""Fake gh serving the fixtures written by bench_batch_tools.py."""
+import json
+import os
+import re
+import sys
+import time
+
+FIXTURES = os.environ["BENCH_GH_FIXTURES"]
+VALUE_FLAGS = {"-H", "--header", "-f", "-F", "--raw-field", "--field", "-q", "--jq", "-X", "--method", "--json"}
+
+
+def load(*parts):
+    try:
+        with open(os.path.join(FIXTURES, *parts), encoding="utf-8") as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return None
+
+
+def positional(args):
+    words, skip = [], False
+    for arg in args:
+        if skip:
+            skip = False
+        elif arg in VALUE_FLAGS:
+            skip = True
+        elif not arg.startswith("-"):
+            words.append(arg)
+    return words
+
+
+def option(args, name):
+    return args[args.index(name) + 1] if name in args else None
+
+
+def emit(payload, query=None):
+    if query:
+        for key in query.lstrip(".").split("."):
+            payload = payload.get(key) if isinstance(payload, dict) else None
+        print(payload if isinstance(payload, str) else json.dumps(payload))
+    else:
+        print(json.dumps(payload))
+
+
+def fail(message, status=None):
+    if status:
+        message = f"{message} (HTTP {status})"
+    print(f"gh: {message}", file=sys.stderr)
+    sys.exit(1)
+
+
+def connection_nodes(connection):
+    return list((connection or {}).get("nodes") or [])
+
+
+def pr_view(number, fields):
+    node = load("prs", f"{number}.json")
+    if node is None:
+        fail(f"Could not resolve to a PullRequest with the number of {number}.")
+    view = {}
+    for field in fields.split(","):
+        if field == "statusCheckRollup":
+            commit = connection_nodes(node.get("commits"))[-1]["commit"]
+            view[field] = connection_nodes(commit["statusCheckRollup"]["contexts"])
+        elif isinstance(node.get(field), dict) and "nodes" in node[field]:
+            view[field] = connection_nodes(node[field])
+        else:
+            view[field] = node.get(field)
+    return view
+
+
+def list_prs(query):
+    numbers = sorted((int(name[:-5]) for name in os.listdir(os.path.join(FIXTURES, "prs"))), reverse=True)
+    after = re.search(r'after: "c(\d+)"', query)
+    offset = int(after.group(1)) if after else 0
+    page = numbers[offset : offset + 100]
+    return {
+        "pageInfo": {"hasNextPage": offset + 100 < len(numbers), "endCursor": f"c{offset + 100}"},
+        "nodes": [{"number": number, "author": load("prs", f"{number}.json")["author"]} for number in page],
+    }
+
+
+def api(args):
+    endpoint = positional(args)[0].lstrip("/")
+    if endpoint == "graphql":
+        query = next(arg[6:] for arg in args if arg.startswith("query="))
+        if "pullRequests(" in query:
+            return {"data": {"repository": {"pullRequests": list_prs(query)}}}
+        if "search(" in query:
+            found = list_prs(query)
+            found["issueCount"] = len(os.listdir(os.path.join(FIXTURES, "prs")))
+            return {"data": {"search": found}}
+        numbers = [int(number) for number in re.findall(r"pr(\d+): pullRequest", query)]
+        return {"data": {"repository": {f"pr{n}": load("prs", f"{n}.json") for n in numbers}}}
+    if endpoint == "rate_limit":
+        budget = {"limit": 5000, "remaining": 5000, "used": 0, "reset": int(time.time()) + 3600}
+        return {"resources": {name: dict(budget) for name in ("core", "graphql", "search")}}
+    match = re.fullmatch(r"repos/[^/]+/[^/]+/commits/([0-9a-f]+)/(check-runs|status)", endpoint)
+    if match:
+        if match.group(2) == "status":
+            return {"statuses": []}
+        return {"check_runs": load("commits", f"{match.group(1)}.json") or []}
+    if re.fullmatch(r"repos/[^/]+/[^/]+/pulls/\d+/comments", endpoint):
+        return []
+    if re.fullmatch(r"repos/[^/]+/[^/]+/branches/[^/]+/protection", endpoint):
+        return load("protection.json")
+    fail(f"Not Found: {endpoint}", 404)
+
+
+def main(args):
+    with open(os.environ["BENCH_GH_LOG"], "a", encoding="utf-8") as log:
+        log.write(json.dumps(args) + "\n")
+    words = positional(args)
+    if words[:2] == ["repo", "view"]:
+        emit(load("repo.json"), option(args, "-q"))
+    elif words[:2] == ["pr", "view"]:
+        emit(pr_view(int(words[2]), option(args, "--json")))
+    elif words[:2] == ["run", "view"]:
+        with open(os.path.join(FIXTURES, "run.log"), encoding="utf-8") as handle:
+            sys.stdout.write(handle.read().replace("RUN_ID", words[2]))
+    elif words[:1] == ["api"]:
+        emit(api(args[1:]), option(args, "-q") or option(args, "--jq"))
+    else:
+        fail(f"unsupported command: {' '.join(args)}")
+
+
+main(sys.argv[1:])
+'''
+
+
+@dataclass
+class BenchShape:
+    """Size of the synthetic workload at one scale."""
+
+    items: int
+    files_per_item: int = 5
+    overlap: float = 0.3
+    lines_per_file: int = 40
+
+
+@dataclass
+class BenchResult:
+    """One tool run at one scale."""
+
+    tool: str
+    items: int
+    exitCode: int
+    wallSeconds: float
+    subprocesses: int | None
+    ghCalls: int
+    peakRssBytes: int
+    log: str
+
+
+def item_files(index: int, shape: BenchShape) -> List[str]:
+    """Paths item `index` touches: a shared share of a hot pool plus files of its own."""
+    shared = min(shape.files_per_item, round(shape.files_per_item * shape.overlap))
+    pool = max(1, shape.files_per_item * 2)
+    paths = [f"src/shared/module_{(index + offset) % pool:03d}.py" for offset in range(shared)]
+    paths += [
+        f"src/item_{index:05d}/part_{part}.py" for part in range(shape.files_per_item - shared)
+    ]
+    return list(dict.fromkeys(paths))
+
+
+def file_body(path: str, variant: int, lines: int) -> bytes:
+    """Deterministic file contents; variant 0 is the base revision."""
+    rows = [f"# {path}"]
+    for line in range(lines):
+        tag = f"v{variant}" if variant and line % 4 == 0 else "base"
+        rows.append(f"def {Path(path).stem}_{line}():  # {tag}\n    return {line}")
+    return ("\n".join(rows) + "\n").encode("utf-8")
+
+
+class _FastImport:
+    """Builds a git fast-import stream of blobs and commits."""
+
+    def __init__(self) -> None:
+        self.chunks: List[bytes] = []
+        self.marks = 0
+        self.tick = 0
+
+    def _mark(self) -> int:
+        self.marks += 1
+        return self.marks
+
+    def blob(self, data: bytes) -> int:
+        mark = self._mark()
+        self.chunks.append(b"blob\nmark :%d\ndata %d\n" % (mark, len(data)) + data + b"\n")
+        return mark
+
+    def commit(self, ref: str, message: str, files: Dict[str, int], parent: int | None) -> int:
+        mark = self._mark()
+        self.tick += 1
+        encoded = message.encode("utf-8")
+        lines = [
+            b"commit " + ref.encode("utf-8"),
+            b"mark :%d" % mark,
+            b"committer Bench <bench@example.com> %d +0000" % (BENCH_EPOCH + self.tick),
+            b"data %d" % len(encoded),
+            encoded,
+        ]
+        if parent is not None:
+            lines.append(b"from :%d" % parent)
+        lines += [b"M 100644 :%d %s" % (blob, path.encode("utf-8")) for path, blob in files.items()]
+        self.chunks.append(b"\n".join(lines) + b"\n\n")
+        return mark
+
+    def reset(self, ref: str, mark: int) -> None:
+        self.chunks.append(b"reset %s\nfrom :%d\n\n" % (ref.encode("utf-8"), mark))
+
+    def stream(self) -> bytes:
+        return b"".join(self.chunks) + b"done\n"
+
+
+def build_synthetic_repo(root: Path, shape: BenchShape) -> Dict[str, Any]:
+    """Create a bare origin with N PR heads and an N-commit chain, plus a clone of it.
+
+    PR `n` is a commit on top of main at refs/pull/n/head (and branch pr-n);
+    the chain lives on branch bench-commits. Returns the clone path, the PR
+    head SHAs and the chain's commit range.
+    """
+    origin = root / "origin.git"
+    clone = root / "clone"
+    run_argv(["git", "init", "-q", "--bare", "-b", "main", str(origin)])
+
+    stream = _FastImport()
+    base_files = sorted({path for index in range(1, shape.items + 1) for path in item_files(index, shape)})
+    shared = [path for path in base_files if path.startswith("src/shared/")]
+    main = stream.commit(
+        "refs/heads/main",
+        "Synthetic base",
+        {
+            "README.md": stream.blob(b"# Synthetic benchmark repository\n"),
+            **{path: stream.blob(file_body(path, 0, shape.lines_per_file)) for path in shared},
+        },
+        None,
+    )
+    chain = main
+    for index in range(1, shape.items + 1):
+        files = {
+            path: stream.blob(file_body(path, index, shape.lines_per_file))
+            for path in item_files(index, shape)
+        }
+        head = stream.commit(f"refs/pull/{index}/head", f"Synthetic PR {index}", files, main)
+        stream.reset(f"refs/heads/pr-{index}", head)
+        chain = stream.commit("refs/heads/bench-commits", f"Synthetic commit {index}", files, chain)
+
+    subprocess.run(
+        ["git", "fast-import", "--quiet"],
+        input=stream.stream(),
+        cwd=origin,
+        check=True,
+    )
+    run_argv(["git", "clone", "-q", str(origin), str(clone)])
+    run_argv(["git", "config", "user.email", "bench@example.com"], cwd=str(clone))
+    run_argv(["git", "config", "user.name", "Bench"], cwd=str(clone))
+
+    heads = {}
+    listing = run_argv(
+        ["git", "for-each-ref", "--format=%(refname) %(objectname)", "refs/pull/"], cwd=str(origin)
+    ).stdout
+    for line in listing.splitlines():
+        ref, sha = line.split()
+        heads[int(ref.split("/")[2])] = sha
+    chain_shas = run_argv(
+        ["git", "rev-list", "--reverse", "main..bench-commits"], cwd=str(origin)
+    ).stdout.split()
+    base_sha = run_argv(["git", "rev-parse", "main"], cwd=str(origin)).stdout.strip()
+    return {
+        "clone": clone,
+        "baseSha": base_sha,
+        "heads": heads,
+        "commits": chain_shas,
+    }
+
+
+def _check_contexts(index: int, details_root: str) -> List[Dict[str, Any]]:
+    contexts = [
+        {
+            "__typename": "CheckRun",
+            "name": "build",
+            "status": "COMPLETED",
+            "conclusion": "SUCCESS",
+            "detailsUrl": f"{details_root}/actions/runs/{100000 + index}/job/1",
+            "title": "Build",
+            "summary": "",
+            "text": "",
+        }
+    ]
+    if index % FAILING_EVERY == 0:
+        contexts.append(
+            {
+                "__typename": "CheckRun",
+                "name": "test",
+                "status": "COMPLETED",
+                "conclusion": "FAILURE",
+                "detailsUrl": f"{details_root}/actions/runs/{200000 + index}/job/2",
+                "title": "Tests failed",
+                "summary": "1 failing test",
+                "text": "",
+            }
+        )
+    return contexts
+
+
+def _connection(nodes: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {"pageInfo": {"hasNextPage": False}, "nodes": nodes}
+
+
+def pr_node(index: int, head_sha: str, base_sha: str, shape: BenchShape) -> Dict[str, Any]:
+    """Canned GraphQL pullRequest node for PR `index`, in PR_GRAPHQL_FIELDS shape."""
+    url = f"https://github.com/{BENCH_SLUG}/pull/{index}"
+    created = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(BENCH_EPOCH + index))
+    files = item_files(index, shape)
+    return {
+        "number": index,
+        "title": f"Synthetic PR {index}",
+        "body": f"Touches {len(files)} file(s).",
+        "url": url,
+        "createdAt": created,
+        "updatedAt": created,
+        "author": {"login": f"dev{index % 7}"},
+        "headRefName": f"pr-{index}",
+        "headRefOid": head_sha,
+        "baseRefName": "main",
+        "baseRefOid": base_sha,
+        "files": _connection([{"path": path} for path in files]),
+        "comments": _connection(
+            [{"author": {"login": "reviewer"}, "createdAt": created, "body": "Looks good.", "url": url}]
+        ),
+        "reviews": _connection(
+            [
+                {
+                    "author": {"login": "reviewer"},
+                    "submittedAt": created,
+                    "body": "",
+                    "state": "APPROVED",
+                    "url": url,
+                }
+            ]
+        ),
+        "reviewThreads": _connection(
+            [
+                {
+                    "diffSide": "RIGHT",
+                    "comments": _connection(
+                        [
+                            {
+                                "author": {"login": "reviewer"},
+                                "createdAt": created,
+                                "body": "Consider a docstring here.",
+                                "url": url,
+                                "path": files[0],
+                                "line": 2,
+                                "replyTo": None,
+                            }
+                        ]
+                    ),
+                }
+            ]
+        ),
+        "commits": {
+            "nodes": [
+                {
+                    "commit": {
+                        "statusCheckRollup": {
+                            "contexts": _connection(
+                                _check_contexts(index, f"https://github.com/{BENCH_SLUG}")
+                            )
+                        }
+                    }
+                }
+            ]
+        },
+    }
+
+
+def synthetic_log(lines: int = 400) -> str:
+    """A failed-run log with setup noise, one error window and a tail."""
+    rows = [f"test\tRun tests\t2024-01-01T00:00:{index % 60:02d}.0000000Z step {index}" for index in range(lines)]
+    rows[lines // 2] = "test\tRun tests\t2024-01-01T00:00:30.0000000Z ##[error]AssertionError in run RUN_ID"
+    return "\n".join(rows) + "\n"
+
+
+def write_fixtures(fixtures: Path, repo: Dict[str, Any], shape: BenchShape) -> None:
+    """Write the files the fake gh serves."""
+    (fixtures / "prs").mkdir(parents=True)
+    (fixtures / "commits").mkdir()
+    (fixtures / "repo.json").write_text(
+        json.dumps({"nameWithOwner": BENCH_SLUG, "url": f"https://github.com/{BENCH_SLUG}"}),
+        encoding="utf-8",
+    )
+    for index, head_sha in repo["heads"].items():
+        (fixtures / "prs" / f"{index}.json").write_text(
+            json.dumps(pr_node(index, head_sha, repo["baseSha"], shape)), encoding="utf-8"
+        )
+    for index, commit_sha in enumerate(repo["commits"], start=1):
+        runs = [
+            {
+                "name": context["name"],
+                "status": context["status"].lower(),
+                "conclusion": context["conclusion"].lower(),
+                "details_url": context["detailsUrl"],
+                "output": {"title": context["title"], "summary": context["summary"]},
+            }
+            for context in _check_contexts(index, f"https://github.com/{BENCH_SLUG}")
+        ]
+        (fixtures / "commits" / f"{commit_sha}.json").write_text(json.dumps(runs), encoding="utf-8")
+    (fixtures / "protection.json").write_text(
+        json.dumps(
+            {
+                "required_pull_request_reviews": {
+                    "required_approving_review_count": 0,
+                    "bypass_pull_request_allowances": {
+                        "apps": [{"slug": "bench-bot"}],
+                        "users": [],
+                        "teams": [],
+                    },
+                },
+                "enforce_admins": {"enabled": True},
+                "allow_force_pushes": {"enabled": False},
+                "allow_deletions": {"enabled": False},
+            }
+        ),
+        encoding="utf-8",
+    )
+    (fixtures / "run.log").write_text(synthetic_log(), encoding="utf-8")
+
+
+def install_fake_gh(bin_dir: Path) -> Path:
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    fake_gh = bin_dir / "gh"
+    fake_gh.write_text(FAKE_GH, encoding="utf-8")
+    fake_gh.chmod(0o755)
+    return fake_gh
+
+
+def prepare_audit_tree(root: Path, items: int) -> Path:
+    """Copy the audit script next to a protected-repos.json listing `items` repos.
+
+    The script reads its config relative to its own location, so it runs
+    from a copy of tools/ inside `root`.
+    """
+    tools = root / "audit" / "tools"
+    governance = root / "audit" / "governance"
+    tools.mkdir(parents=True)
+    governance.mkdir()
+    for name in ("audit-protected-repos.py", "github_client.py", "rate_limit.py"):
+        shutil.copy2(TOOLS_DIR / name, tools / name)
+    repos = [
+        {
+            "repo": f"bench/repo-{index:05d}",
+            "branch": "main",
+            "required_approving_review_count": 0,
+            "allowed_bypass_apps": ["bench-bot"],
+            "allow_force_pushes": False,
+            "allow_deletions": False,
+        }
+        for index in range(1, items + 1)
+    ]
+    (governance / "protected-repos.json").write_text(
+        json.dumps({"repos": repos}, indent=2), encoding="utf-8"
+    )
+    return tools / "audit-protected-repos.py"
+
+
+def bench_env(bin_dir: Path, fixtures: Path, gh_log: Path) -> Dict[str, str]:
+    """Environment that routes every GitHub call to the fake gh."""
+    env = {
+        key: value
+        for key, value in os.environ.items()
+        if key not in ("GH_TOKEN", "GITHUB_TOKEN", "GH_REPO", "GITHUB_API_URL")
+    }
+    env["PATH"] = f"{bin_dir}{os.pathsep}{env.get('PATH', '')}"
+    env["BENCH_GH_FIXTURES"] = str(fixtures)
+    env["BENCH_GH_LOG"] = str(gh_log)
+    env["GIT_TERMINAL_PROMPT"] = "0"
+    return env
+
+
+def run_measured(
+    tool: str,
+    items: int,
+    argv: Sequence[str],
+    cwd: Path,
+    env: Dict[str, str],
+    log_path: Path,
+    gh_log: Path,
+    profile_path: Path | None = None,
+) -> BenchResult:
+    """Run one tool process and collect its wall time, counters and peak RSS.
+
+    Peak RSS comes from wait4(), so it covers the tool and every subprocess
+    it reaped. Subprocess counts come from the tool's --profile output when
+    it writes one.
+    """
+    gh_log.write_text("", encoding="utf-8")
+    started = time.perf_counter()
+    with open(log_path, "w", encoding="utf-8") as log_file:
+        process = subprocess.Popen(
+            list(argv), cwd=cwd, env=env, stdout=log_file, stderr=subprocess.STDOUT
+        )
+        _pid, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+    wall = time.perf_counter() - started
+
+    subprocesses = None
+    if profile_path is not None and profile_path.exists():
+        profile = json.loads(profile_path.read_text(encoding="utf-8"))
+        subprocesses = profile.get("counters", {}).get("subprocesses")
+    with open(gh_log, encoding="utf-8") as calls:
+        gh_calls = sum(1 for _line in calls)
+    scale = 1 if sys.platform == "darwin" else 1024
+    return BenchResult(
+        tool=tool,
+        items=items,
+        exitCode=process.returncode,
+        wallSeconds=round(wall, 3),
+        subprocesses=subprocesses,
+        ghCalls=gh_calls,
+        peakRssBytes=usage.ru_maxrss * scale,
+        log=str(log_path),
+    )
+
+
+def run_scale(
+    root: Path,
+    shape: BenchShape,
+    tools: Sequence[str],
+    round_robin_mode: str = "off",
+    checkout: bool = False,
+) -> List[BenchResult]:
+    """Build the synthetic inputs for one scale and benchmark each requested tool."""
+    root.mkdir(parents=True, exist_ok=True)
+    print(f"Building synthetic repository with {shape.items} item(s) in {root}...")
+    repo = build_synthetic_repo(root, shape)
+    fixtures = root / "fixtures"
+    write_fixtures(fixtures, repo, shape)
+    bin_dir = root / "bin"
+    install_fake_gh(bin_dir)
+    gh_log = root / "gh-calls.log"
+    env = bench_env(bin_dir, fixtures, gh_log)
+    clone = repo["clone"]
+
+    results = []
+    for tool in tools:
+        profile_path = root / f"{tool}-profile.json"
+        output_dir = root / f"{tool}-output"
+        if tool == "pr":
+            argv = [
+                sys.executable,
+                str(TOOLS_DIR / "pr_batch_big_picture.py"),
+                f"1-{shape.items}",
+                "--output-dir",
+                str(output_dir),
+                "--no-api-client",
+                "--round-robin-mode",
+                round_robin_mode,
+                "--profile",
+                str(profile_path),
+            ]
+            if not checkout:
+                argv.append("--no-checkout")
+        elif tool == "commit":
+            commits = repo["commits"]
+            argv = [
+                sys.executable,
+                str(TOOLS_DIR / "commit_batch_big_picture.py"),
+                f"{commits[0]}-{commits[-1]}",
+                "--output-dir",
+                str(output_dir),
+                "--no-api-client",
+                "--round-robin-mode",
+                round_robin_mode,
+                "--profile",
+                str(profile_path),
+            ]
+        elif tool == "audit":
+            argv = [sys.executable, str(prepare_audit_tree(root, shape.items))]
+            profile_path = None
+        else:
+            raise ValueError(f"Unknown benchmark tool: {tool}")
+
+        print(f"  {tool} @ {shape.items}...", flush=True)
+        result = run_measured(
+            tool, shape.items, argv, clone, env, root / f"{tool}.log", gh_log, profile_path
+        )
+        if result.exitCode != 0:
+            print(f"  Warning: {tool} exited with {result.exitCode}; see {result.log}")
+        results.append(result)
+    return results
+
+
+def compare_results(
+    results: Sequence[Dict[str, Any]],
+    baseline: Sequence[Dict[str, Any]],
+    max_regression: float = DEFAULT_MAX_REGRESSION,
+) -> List[str]:
+    """Describe wall-time and subprocess changes against a baseline run.
+
+    Returns one line per (tool, scale) present in both; lines for runs whose
+    wall time grew by more than `max_regression` percent start with
+    "REGRESSION".
+    """
+    previous = {(entry["tool"], entry["items"]): entry for entry in baseline}
+    lines = []
+    for entry in results:
+        before = previous.get((entry["tool"], entry["items"]))
+        if before is None or not before.get("wallSeconds"):
+            continue
+        change = 100.0 * (entry["wallSeconds"] - before["wallSeconds"]) / before["wallSeconds"]
+        label = "REGRESSION" if change > max_regression else "ok"
+        detail = f"wall {before['wallSeconds']:.2f}s -> {entry['wallSeconds']:.2f}s ({change:+.1f}%)"
+        if entry.get("subprocesses") is not None and before.get("subprocesses") is not None:
+            detail += f", subprocesses {before['subprocesses']} -> {entry['subprocesses']}"
+        lines.append(f"{label} {entry['tool']} @ {entry['items']}: {detail}")
+    return lines
+
+
+def format_results(results: Sequence[BenchResult]) -> List[str]:
+    """Render results as a fixed-width table."""
+    lines = [
+        f"{'tool':<7} {'items':>6} {'exit':>4} {'wall s':>9} {'subproc':>8} {'gh calls':>8} {'peak MiB':>9}"
+    ]
+    for result in results:
+        subprocesses = "-" if result.subprocesses is None else str(result.subprocesses)
+        lines.append(
+            f"{result.tool:<7} {result.items:>6} {result.exitCode:>4} {result.wallSeconds:>9.2f} "
+            f"{subprocesses:>8} {result.ghCalls:>8} {result.peakRssBytes / 2**20:>9.1f}"
+        )
+    return lines
+
+
+def parse_scales(value: str) -> List[int]:
+    try:
+        scales = [int(token) for token in value.replace(" ", "").split(",") if token]
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"Invalid scales '{value}': {exc}") from exc
+    if not scales or min(scales) < 1:
+        raise argparse.ArgumentTypeError(f"Invalid scales '{value}': expected positive integers")
+    return scales
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the batch tools offline against synthetic repositories",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--scales",
+        type=parse_scales,
+        default=parse_scales(DEFAULT_SCALES),
+        help=f"Comma-separated item counts to benchmark (default: {DEFAULT_SCALES})",
+    )
+    parser.add_argument(
+        "--tools",
+        default=",".join(BENCH_TOOLS),
+        help=f"Comma-separated tools to run (default: {','.join(BENCH_TOOLS)})",
+    )
+    parser.add_argument(
+        "--files-per-item",
+        type=int,
+        default=BenchShape.files_per_item,
+        help=f"Files each PR or commit touches (default: {BenchShape.files_per_item})",
+    )
+    parser.add_argument(
+        "--overlap",
+        type=float,
+        default=BenchShape.overlap,
+        help=(
+            "Share of each item's files drawn from a pool shared with other items "
+            f"(default: {BenchShape.overlap})"
+        ),
+    )
+    parser.add_argument(
+        "--lines-per-file",
+        type=int,
+        default=BenchShape.lines_per_file,
+        help=f"Functions per synthetic file (default: {BenchShape.lines_per_file})",
+    )
+    parser.add_argument(
+        "--round-robin-mode",
+        choices=("off", "overlap", "union"),
+        default="off",
+        help=(
+            "Round-robin mode passed to both batch tools; pairs grow quadratically "
+            "with scale (default: off)"
+        ),
+    )
+    parser.add_argument(
+        "--checkout",
+        action="store_true",
+        help="Check out each PR branch instead of running the PR tool with --no-checkout",
+    )
+    parser.add_argument(
+        "--work-dir",
+        help="Keep repositories, outputs and logs under this directory (default: a temp dir)",
+    )
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against results from an earlier --output")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=DEFAULT_MAX_REGRESSION,
+        help=(
+            "With --baseline, exit 1 when a run's wall time grew by more than this "
+            f"percentage (default: {DEFAULT_MAX_REGRESSION})"
+        ),
+    )
+    args = parser.parse_args()
+
+    tools = [tool.strip() for tool in args.tools.split(",") if tool.strip()]
+    unknown = sorted(set(tools) - set(BENCH_TOOLS))
+    if unknown or not tools:
+        parser.error(f"--tools must name some of {', '.join(BENCH_TOOLS)}")
+    if args.files_per_item < 1 or args.lines_per_file < 1:
+        parser.error("--files-per-item and --lines-per-file must be at least 1.")
+    if not 0.0 <= args.overlap <= 1.0:
+        parser.error("--overlap must be between 0 and 1.")
+
+    temp_dir = None
+    if args.work_dir:
+        work_dir = Path(args.work_dir).resolve()
+    else:
+        temp_dir = tempfile.mkdtemp(prefix="bench-batch-tools-")
+        work_dir = Path(temp_dir)
+
+    results: List[BenchResult] = []
+    try:
+        for items in args.scales:
+            shape = BenchShape(
+                items=items,
+                files_per_item=args.files_per_item,
+                overlap=args.overlap,
+                lines_per_file=args.lines_per_file,
+            )
+            results.extend(
+                run_scale(
+                    work_dir / f"scale-{items}",
+                    shape,
+                    tools,
+                    round_robin_mode=args.round_robin_mode,
+                    checkout=args.checkout,
+                )
+            )
+    finally:
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    print()
+    for line in format_results(results):
+        print(line)
+
+    data = [asdict(result) for result in results]
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump({"results": data}, output_file, indent=2)
+            output_file.write("\n")
+        print(f"✓ Results: {args.output}")
+
+    failed = any(result.exitCode != 0 for result in results)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file).get("results", [])
+        comparison = compare_results(data, baseline, args.max_regression)
+        print()
+        for line in comparison:
+            print(line)
+        failed = failed or any(line.startswith("REGRESSION") for line in comparison)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+check_logs - Shared failed-check log fetcher for the batch big-picture tools
+
+Several failed checks usually belong to one GitHub Actions run, and
+`gh run view <id> --log` downloads the log of every job in that run,
+including the ones that passed. FailedLogFetcher downloads each run at most
+once with `gh run view <id> --log-failed`, streams it straight to a file,
+runs up to `jobs` downloads at a time, and hands every check only the lines
+of its own job when the run log attributes them.
+
+write_log_excerpt embeds a log into a report line by line, keeping head and
+tail windows plus context around error markers, stripping Actions timestamps
+and collapsing repeated lines, so one noisy job cannot dominate a report.
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Deque, Dict, Iterable, Iterator, List, Set, TextIO, Tuple
+
+from batch_cache import ResultCache
+from rate_limit import RateLimitScheduler
+
+
+DEFAULT_LOG_JOBS = 4
+DEFAULT_LOG_HEAD_LINES = 40
+DEFAULT_LOG_TAIL_LINES = 80
+DEFAULT_LOG_CONTEXT_LINES = 10
+PASSING_CONCLUSIONS = {"success", "neutral", "skipped"}
+
+LOG_ERROR_MARKER = re.compile(
+    r"##\[error\]|\b(?:error|errors|failed|failure|fatal|panic|exception|traceback)\b",
+    re.IGNORECASE,
+)
+# Actions prefixes every log line (after any "job<TAB>step<TAB>" columns) with one of these.
+LOG_TIMESTAMP = re.compile(r"(^|\t)\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?Z ?")
+
+
+def extract_actions_run_id(details_url: str | None) -> str | None:
+    """Extract the GitHub Actions run ID from a details URL."""
+    if not details_url:
+        return None
+    match = re.search(r"/actions/runs/(\d+)", details_url)
+    return match.group(1) if match else None
+
+
+def failed_check_run_id(check: Dict[str, str]) -> str | None:
+    """Return the Actions run ID of a check whose logs are worth fetching."""
+    conclusion = (check.get("conclusion") or "").lower()
+    if conclusion in PASSING_CONCLUSIONS:
+        return None
+    return extract_actions_run_id(check.get("detailsUrl") or "")
+
+
+@dataclass
+class LogWindow:
+    """Which lines of a failed-check log are embedded in a report.
+
+    The first `head_lines`, the last `tail_lines`, and `context_lines` on
+    either side of every error marker are kept. `full` keeps every line;
+    timestamps are still stripped and repeats still collapsed.
+    """
+
+    head_lines: int = DEFAULT_LOG_HEAD_LINES
+    tail_lines: int = DEFAULT_LOG_TAIL_LINES
+    context_lines: int = DEFAULT_LOG_CONTEXT_LINES
+    full: bool = False
+
+
+def _collapse_repeats(lines: Iterable[str], stats: Dict[str, int]) -> Iterator[Tuple[str, int]]:
+    """Yield (normalized line, extra repeats), counting the input as it streams."""
+    previous: str | None = None
+    repeats = 0
+    for raw_line in lines:
+        line = raw_line.rstrip("\r\n")
+        stats["inputLines"] += 1
+        stats["inputBytes"] += len(line.encode("utf-8")) + 1
+        line = LOG_TIMESTAMP.sub(r"\1", line)
+        if line == previous:
+            repeats += 1
+            continue
+        if previous is not None:
+            yield previous, repeats
+        previous = line
+        repeats = 0
+    if previous is not None:
+        yield previous, repeats
+
+
+def write_log_excerpt(
+    lines: Iterable[str],
+    outf: TextIO,
+    indent: str = "    ",
+    window: LogWindow | None = None,
+) -> Dict[str, int]:
+    """Stream an indented, windowed excerpt of a log into `outf`.
+
+    Only `window.tail_lines` (or `context_lines`) lines are buffered at once.
+    Gaps are marked in place, and a closing note reports how many lines and
+    bytes of the original log were not reproduced. Returns the counters.
+    """
+    window = window or LogWindow()
+    stats = {
+        "inputLines": 0,
+        "inputBytes": 0,
+        "keptLines": 0,
+        "keptBytes": 0,
+        "omittedLines": 0,
+        "collapsedLines": 0,
+    }
+    gap = 0
+    pending: Deque[Tuple[str, int]] = deque()
+    keep_pending = max(window.tail_lines, window.context_lines)
+    after_marker = 0
+    seen = 0
+
+    def emit(line: str, repeats: int) -> None:
+        nonlocal gap
+        if gap:
+            outf.write(f"{indent}... [{gap} line(s) omitted]\n")
+            gap = 0
+        outf.write(f"{indent}{line}\n")
+        stats["keptLines"] += 1
+        stats["keptBytes"] += len(line.encode("utf-8")) + 1
+        if repeats:
+            outf.write(f"{indent}... [previous line repeated {repeats} more time(s)]\n")
+            stats["collapsedLines"] += repeats
+
+    def drop(repeats: int) -> None:
+        nonlocal gap
+        gap += 1 + repeats
+        stats["omittedLines"] += 1 + repeats
+
+    for line, repeats in _collapse_repeats(lines, stats):
+        seen += 1
+        if window.full or seen <= window.head_lines:
+            emit(line, repeats)
+        elif LOG_ERROR_MARKER.search(line):
+            while len(pending) > window.context_lines:
+                drop(pending.popleft()[1])
+            while pending:
+                emit(*pending.popleft())
+            emit(line, repeats)
+            after_marker = window.context_lines
+        elif after_marker:
+            emit(line, repeats)
+            after_marker -= 1
+        else:
+            pending.append((line, repeats))
+            if len(pending) > keep_pending:
+                drop(pending.popleft()[1])
+
+    while len(pending) > window.tail_lines:
+        drop(pending.popleft()[1])
+    while pending:
+        emit(*pending.popleft())
+
+    dropped_bytes = stats["inputBytes"] - stats["keptBytes"]
+    if stats["omittedLines"] or stats["collapsedLines"] or dropped_bytes:
+        outf.write(
+            f"{indent}[log excerpt: kept {stats['keptLines']} of {stats['inputLines']} line(s); "
+            f"{stats['omittedLines']} omitted, {stats['collapsedLines']} repeated line(s) "
+            f"collapsed, {dropped_bytes} of {stats['inputBytes']} byte(s) dropped]\n"
+        )
+    return stats
+
+
+def iter_check_log_lines(check: Dict[str, str]) -> Iterator[str]:
+    """Yield the log lines attached to a check, streaming file-backed logs.
+
+    Checks carry either an in-memory "logOutput" or a "logPath" (optionally
+    narrowed to the lines of job "logJob") set by FailedLogFetcher.
+    """
+    if check.get("logOutput"):
+        yield from check["logOutput"].splitlines()
+        return
+    log_path = check.get("logPath")
+    if not log_path:
+        return
+    job_prefix = f"{check['logJob']}\t" if check.get("logJob") else ""
+    try:
+        with open(log_path, encoding="utf-8", errors="replace") as log_file:
+            for line in log_file:
+                if line.startswith(job_prefix):
+                    yield line
+    except FileNotFoundError:
+        yield f"(log for {check.get('name') or 'unknown check'} is no longer available)"
+
+
+class FailedLogFetcher:
+    """Fetch failed-job logs once per Actions run, in parallel, into files.
+
+    With a ResultCache, logs of runs whose checks have all completed are
+    stored without an expiry, keyed by run ID and the failing checks' job
+    URLs (which change when a run is re-attempted), and reused by later
+    invocations. Cached logs are linked into `log_dir` so that cache
+    eviction during the run cannot remove a log before the report reads it.
+    With a RateLimitScheduler, downloads are paced and retried on rate
+    limits.
+    """
+
+    def __init__(
+        self,
+        jobs: int = DEFAULT_LOG_JOBS,
+        cache: ResultCache | None = None,
+        log_dir: str | None = None,
+        scheduler: RateLimitScheduler | None = None,
+    ) -> None:
+        self.cache = cache
+        self.scheduler = scheduler
+        self._owns_log_dir = log_dir is None
+        self.log_dir = log_dir or tempfile.mkdtemp(prefix="batch-check-logs-")
+        self._executor = ThreadPoolExecutor(max_workers=max(1, jobs))
+        self._runs: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.downloads = 0
+
+    def __enter__(self) -> "FailedLogFetcher":
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        self.close()
+
+    def prefetch(self, checks: Iterable[Dict[str, str]]) -> None:
+        """Start downloading the logs of every failed run referenced by `checks`."""
+        completed: Dict[str, bool] = {}
+        names: Dict[str, str] = {}
+        job_urls: Dict[str, Set[str]] = {}
+        for check in checks:
+            run_id = failed_check_run_id(check)
+            if not run_id:
+                continue
+            names.setdefault(run_id, check.get("name") or "unknown check")
+            job_urls.setdefault(run_id, set()).add(check.get("detailsUrl") or "")
+            is_completed = (check.get("status") or "").upper() == "COMPLETED"
+            completed[run_id] = completed.get(run_id, True) and is_completed
+
+        with self._lock:
+            for run_id, is_completed in completed.items():
+                if run_id not in self._runs:
+                    self._runs[run_id] = self._executor.submit(
+                        self._download,
+                        run_id,
+                        names[run_id],
+                        is_completed,
+                        sorted(job_urls[run_id]),
+                    )
+
+    def log_path(self, run_id: str) -> str | None:
+        """Wait for a run's log and return its file, or None if it could not be fetched."""
+        with self._lock:
+            future = self._runs.get(run_id)
+        return future.result() if future is not None else None
+
+    def log_source(self, check: Dict[str, str]) -> Dict[str, str] | None:
+        """Describe where a check's failed-job log lives without loading it.
+
+        Returns "logPath", "logJob" (empty when the check's name matches no
+        job in the run log) and "logDigest", the sha256 of the run log.
+        """
+        run_id = failed_check_run_id(check)
+        if not run_id:
+            return None
+        self.prefetch([check])
+        path = self.log_path(run_id)
+        if path is None:
+            return None
+
+        job_prefix = f"{check.get('name') or ''}\t".encode("utf-8")
+        digest = hashlib.sha256()
+        has_content = False
+        has_job_lines = False
+        with open(path, "rb") as log_file:
+            for line in log_file:
+                digest.update(line)
+                has_content = has_content or bool(line.strip())
+                has_job_lines = has_job_lines or line.startswith(job_prefix)
+        if not has_content:
+            return None
+        return {
+            "logPath": path,
+            "logJob": (check.get("name") or "") if has_job_lines else "",
+            "logDigest": digest.hexdigest(),
+        }
+
+    def get_log(self, check: Dict[str, str]) -> str | None:
+        """Return the failed-job log for one check as a string.
+
+        `gh run view --log-failed` prefixes each line with the job name and a
+        tab, so when the check's name matches a job only that job's lines are
+        returned; otherwise every failed job in the run is returned.
+        """
+        source = self.log_source(check)
+        if source is None:
+            return None
+        return "".join(iter_check_log_lines(source)).strip() or None
+
+    def _download(
+        self, run_id: str, check_name: str, cacheable: bool, job_urls: List[str]
+    ) -> str | None:
+        # A re-run keeps its run ID but gives the retried jobs new job URLs,
+        # so keying on them keeps a later attempt from reusing an older log.
+        cache_key = ResultCache.make_key("run-log-failed", run_id, job_urls)
+        if self.cache is not None and cacheable:
+            cached_path = self.cache.get_path(cache_key)
+            if cached_path is not None:
+                return self._keep_for_run(run_id, cached_path)
+
+        target = (
+            self.cache.new_temp_path()
+            if self.cache is not None and cacheable
+            else os.path.join(self.log_dir, f"run-{run_id}.log")
+        )
+        print(f"Fetching logs for failed check '{check_name}' (run {run_id})")
+        attempt = 0
+        while True:
+            if self.scheduler is not None:
+                self.scheduler.acquire("core")
+            try:
+                with open(target, "wb") as log_file:
+                    result = subprocess.run(
+                        ["gh", "run", "view", run_id, "--log-failed"],
+                        stdout=log_file,
+                        stderr=subprocess.PIPE,
+                        text=False,
+                    )
+            except OSError as exc:
+                os.remove(target)
+                print(f"Warning: Failed to fetch logs for run {run_id}: {exc}")
+                return None
+            with self._lock:
+                self.downloads += 1
+            if result.returncode == 0 or self.scheduler is None:
+                break
+            delay = self.scheduler.retry_delay_for_gh(
+                attempt, result.stderr.decode("utf-8", errors="replace")
+            )
+            if delay is None:
+                break
+            self.scheduler.sleep(delay)
+            attempt += 1
+        if result.returncode != 0:
+            os.remove(target)
+            error = result.stderr.decode("utf-8", errors="replace").strip()
+            print(f"Warning: Failed to fetch logs for run {run_id}: {error or result.returncode}")
+            return None
+
+        if self.cache is not None and cacheable:
+            self.cache.put_file(cache_key, target)
+            cached_path = self.cache.get_path(cache_key)
+            return None if cached_path is None else self._keep_for_run(run_id, cached_path)
+        return target
+
+    def _keep_for_run(self, run_id: str, cached_path: str) -> str | None:
+        """Link (or copy) a cached log into log_dir so eviction cannot remove it mid-run."""
+        path = os.path.join(self.log_dir, f"run-{run_id}.log")
+        try:
+            os.link(cached_path, path)
+        except FileExistsError:
+            pass
+        except OSError:
+            try:
+                shutil.copyfile(cached_path, path)
+            except FileNotFoundError:
+                return None
+        return path
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        if self._owns_log_dir:
+            shutil.rmtree(self.log_dir, ignore_errors=True)
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+command_runner - argv command execution shared by the batch big-picture tools
+
+Commands run as argv lists without an intermediate `/bin/sh`, so arguments
+need no quoting and no shell is forked per call. Path lists that would
+overflow the kernel's argument limit are split across several invocations
+by command_batches (git diff and git ls-tree accept no --pathspec-from-file),
+or by argument_batches for other long argument lists such as refspecs,
+and stream_command_output concatenates their output as one stream. Every
+call is timed into a CommandTimings table that the tools print at the end of
+a run.
+"""
+
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, IO, Iterator, List, Sequence
+
+
+# Bytes of path arguments per command; far below ARG_MAX on every platform
+# the tools run on, and small enough to leave room for the environment.
+PATH_ARGS_BUDGET = 128 * 1024
+
+
+@dataclass
+class CommandStat:
+    """Accumulated cost of one kind of command (e.g. "git diff")."""
+
+    calls: int = 0
+    seconds: float = 0.0
+    failures: int = 0
+
+
+def command_kind(args: Sequence[str]) -> str:
+    """Group a command by its program and subcommand, skipping leading options."""
+    words = [args[0]] if args else ["?"]
+    for arg in args[1:]:
+        if not arg.startswith("-"):
+            words.append(arg)
+            break
+    return " ".join(words)
+
+
+class CommandTimings:
+    """Thread-safe per-kind call counts and wall-clock time."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.stats: Dict[str, CommandStat] = {}
+
+    def record(self, args: Sequence[str], seconds: float, returncode: int = 0) -> None:
+        kind = command_kind(args)
+        with self._lock:
+            stat = self.stats.setdefault(kind, CommandStat())
+            stat.calls += 1
+            stat.seconds += seconds
+            if returncode != 0:
+                stat.failures += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stats.clear()
+
+    def report_lines(self, limit: int = 8) -> List[str]:
+        """Summarize the costliest command kinds, slowest first."""
+        with self._lock:
+            ranked = sorted(self.stats.items(), key=lambda item: item[1].seconds, reverse=True)
+        if not ranked:
+            return []
+        calls = sum(stat.calls for _kind, stat in ranked)
+        seconds = sum(stat.seconds for _kind, stat in ranked)
+        lines = [f"Commands: {calls} run(s), {seconds:.2f}s total"]
+        for kind, stat in ranked[:limit]:
+            failed = f", {stat.failures} failed" if stat.failures else ""
+            lines.append(f"  {kind}: {stat.calls} call(s), {stat.seconds:.2f}s{failed}")
+        return lines
+
+
+# Process-wide timings; GitObjectReader co-processes and the tools' runners record here.
+TIMINGS = CommandTimings()
+
+
+def run_argv(
+    args: Sequence[str],
+    check: bool = True,
+    capture_output: bool = True,
+    cwd: str | None = None,
+    input: str | None = None,
+) -> "subprocess.CompletedProcess[str]":
+    """Run an argv command without a shell and record its duration.
+
+    `input`, when given, is written to the command's stdin. A program that
+    cannot be started (e.g. not on PATH) is reported like a shell would, as
+    exit status 127, so callers only handle CalledProcessError.
+    """
+    started = time.perf_counter()
+    try:
+        result = subprocess.run(
+            list(args),
+            capture_output=capture_output,
+            text=True,
+            cwd=cwd,
+            input=input,
+        )
+    except OSError as exc:
+        result = subprocess.CompletedProcess(list(args), 127, "", str(exc))
+    TIMINGS.record(args, time.perf_counter() - started, result.returncode)
+    if check and result.returncode != 0:
+        raise subprocess.CalledProcessError(
+            result.returncode, list(args), result.stdout, result.stderr
+        )
+    return result
+
+
+def argument_batches(
+    prefix: Sequence[str], arguments: Sequence[str], budget: int | None = None
+) -> List[List[str]]:
+    """Split `prefix <arguments>` into commands whose arguments fit `budget` bytes.
+
+    `budget` defaults to PATH_ARGS_BUDGET. Arguments keep their order, and
+    an empty `arguments` yields no commands.
+    """
+    budget = budget or PATH_ARGS_BUDGET
+    batches: List[List[str]] = []
+    current: List[str] = []
+    size = 0
+    for argument in arguments:
+        length = len(argument.encode("utf-8")) + 1
+        if current and size + length > budget:
+            batches.append([*prefix, *current])
+            current, size = [], 0
+        current.append(argument)
+        size += length
+    if current:
+        batches.append([*prefix, *current])
+    return batches
+
+
+def command_batches(
+    prefix: Sequence[str], paths: Sequence[str], budget: int | None = None
+) -> List[List[str]]:
+    """Split `prefix -- <paths>` into commands whose path arguments fit `budget` bytes.
+
+    `budget` defaults to PATH_ARGS_BUDGET. Paths keep their order, so for
+    commands whose output is sorted by path (git diff, git ls-tree) pass
+    them sorted and the concatenated output matches a single invocation. An
+    empty `paths` yields no commands, never an unrestricted `prefix --`.
+    """
+    return argument_batches([*prefix, "--"], paths, budget)
+
+
+def run_batched(
+    prefix: Sequence[str], paths: Sequence[str], separator: str = "\n"
+) -> str:
+    """Run `prefix -- <paths>` in command_batches and join their stripped stdout."""
+    outputs = (run_argv(command).stdout.strip() for command in command_batches(prefix, paths))
+    return separator.join(output for output in outputs if output)
+
+
+@contextmanager
+def stream_command_output(commands: Sequence[Sequence[str]]) -> Iterator[IO[bytes]]:
+    """Yield one binary stream carrying the stdout of each command in turn.
+
+    Closing the context early kills the command still running; a command
+    that exits non-zero on its own raises CalledProcessError.
+    """
+    reader = _ChainedOutput(commands)
+    try:
+        yield reader
+    finally:
+        reader.close()
+
+
+class _ChainedOutput:
+    """Minimal readline() interface over the stdout of sequential commands."""
+
+    def __init__(self, commands: Sequence[Sequence[str]]) -> None:
+        self._pending = [list(command) for command in commands]
+        self._process: subprocess.Popen | None = None
+        self._args: List[str] = []
+        self._started = 0.0
+
+    def _finish(self, kill: bool = False) -> None:
+        process = self._process
+        if process is None:
+            return
+        self._process = None
+        if kill and process.poll() is None:
+            process.kill()
+        assert process.stdout is not None
+        process.stdout.close()
+        returncode = process.wait()
+        TIMINGS.record(self._args, time.perf_counter() - self._started, 0 if kill else returncode)
+        if returncode != 0 and not kill:
+            raise subprocess.CalledProcessError(returncode, self._args)
+
+    def readline(self, size: int = -1) -> bytes:
+        while True:
+            if self._process is None:
+                if not self._pending:
+                    return b""
+                self._args = self._pending.pop(0)
+                self._started = time.perf_counter()
+                self._process = subprocess.Popen(self._args, stdout=subprocess.PIPE)
+            assert self._process.stdout is not None
+            line = self._process.stdout.readline(size)
+            if line:
+                return line
+            self._finish()
+
+    def close(self) -> None:
+        self._pending = []
+        self._finish(kill=True)
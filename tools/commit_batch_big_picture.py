@@ -7,81 +7,99 @@ for selected commits, including check results and touched file snapshots.
 """
 
 import argparse
+import asyncio
+import atexit
 import hashlib
 import json
 import os
 import re
-import shlex
+import shutil
 import subprocess
 import sys
 from datetime import datetime
+from functools import partial
 from itertools import combinations
-from pathlib import Path
-from typing import Dict, List, Set, Tuple
+from typing import Any, Dict, List, Mapping, Sequence, Set, Tuple
+
+from async_fetch import DEFAULT_FETCH_CONCURRENCY, AsyncFetchEngine
+from batch_cache import DEFAULT_CACHE_MAX_BYTES, DEFAULT_CACHE_TTL, ResultCache
+from check_logs import (
+    DEFAULT_LOG_CONTEXT_LINES,
+    DEFAULT_LOG_HEAD_LINES,
+    DEFAULT_LOG_JOBS,
+    DEFAULT_LOG_TAIL_LINES,
+    FailedLogFetcher,
+    LogWindow,
+    iter_check_log_lines,
+    write_log_excerpt,
+)
+from command_runner import TIMINGS, run_argv, run_batched
+from diff_stats import (
+    FileStat,
+    changed_line_counts,
+    collect_diff_stats,
+    empty_diff_line,
+    hot_file_lines,
+    plan_diff_budget,
+    plan_header_lines,
+    stats_block_lines,
+)
+from exclusion_rules import ExclusionRules, build_exclusion_rules, format_exclusions
+from git_object_reader import BINARY_PLACEHOLDER, GitObjectReader, non_blob_placeholder
+from github_client import (
+    GITHUB_REQUEST_ERRORS,
+    GitHubClient,
+    repo_slug_from_git_remotes,
+)
+from rate_limit import DEFAULT_MAX_RETRIES, RateLimitScheduler, gh_resource
+from run_profile import PROFILE
 
 
 class SelectionParseError(ValueError):
     """Raised when a commit selection string cannot be parsed."""
 
 
-def run_command(cmd: str, check: bool = True, capture_output: bool = True) -> str:
-    """Run a shell command and return the result."""
-    result = subprocess.run(
-        cmd,
-        shell=True,
-        check=check,
-        capture_output=capture_output,
-        text=True,
-    )
+# Optional rate-limit scheduler for gh commands, set by configure_rate_limits.
+_RATE_LIMITS: RateLimitScheduler | None = None
+
+
+def configure_rate_limits(scheduler: RateLimitScheduler | None) -> None:
+    """Pace and retry gh commands through `scheduler` (None runs them once, unpaced)."""
+    global _RATE_LIMITS
+    _RATE_LIMITS = scheduler
+
+
+def run_command(args: Sequence[str], check: bool = True, capture_output: bool = True) -> str:
+    """Run an argv command without a shell and return its stripped stdout.
+
+    With a rate-limit scheduler configured, gh commands wait for their budget
+    and are retried when they fail on a rate limit or server error.
+    """
+    scheduler = _RATE_LIMITS if args and args[0] == "gh" else None
+    attempt = 0
+    while True:
+        if scheduler is not None:
+            scheduler.acquire(gh_resource(args))
+        result = run_argv(args, check=False, capture_output=capture_output)
+        if result.returncode == 0 or scheduler is None or not capture_output:
+            break
+        delay = scheduler.retry_delay_for_gh(attempt, result.stderr)
+        if delay is None:
+            break
+        scheduler.sleep(delay)
+        attempt += 1
+    if check and result.returncode != 0:
+        raise subprocess.CalledProcessError(result.returncode, list(args), result.stdout, result.stderr)
     return result.stdout.strip() if capture_output else ""
 
 
-def run_command_result(cmd: str) -> subprocess.CompletedProcess:
-    """Run a shell command and return the CompletedProcess."""
-    return subprocess.run(
-        cmd,
-        shell=True,
-        check=False,
-        capture_output=True,
-        text=True,
-    )
-
-
-def run_command_bytes(cmd: str, check: bool = True) -> bytes:
-    """Run a shell command and return raw stdout bytes."""
-    result = subprocess.run(
-        cmd,
-        shell=True,
-        check=check,
-        capture_output=True,
-        text=False,
-    )
-    return result.stdout or b""
-
-
-def decode_file_snapshot(content: bytes) -> Tuple[str, bool]:
-    """Decode git show output while flagging probable binary content."""
-    if not content:
-        return "", False
-    if b"\0" in content:
-        return "# (binary file omitted from report)", True
-
-    control_bytes = sum(
-        1 for byte in content if byte < 9 or (13 < byte < 32)
-    )
-    if control_bytes / len(content) > 0.1:
-        return "# (binary file omitted from report)", True
-
-    return content.decode("utf-8", errors="replace"), False
-
-
 def resolve_commit(ref: str) -> str:
     """Resolve a commit ref to a full SHA."""
     cleaned = ref.strip()
     if not cleaned:
         raise SelectionParseError("Invalid commit token: empty ref")
     try:
-        sha = run_command(f"git rev-parse --verify {shlex.quote(cleaned)}")
+        sha = run_command(["git", "rev-parse", "--verify", cleaned])
     except subprocess.CalledProcessError as exc:
         raise SelectionParseError(
             f"Invalid commit token '{ref}': {exc}"
@@ -95,9 +113,7 @@ def resolve_commit(ref: str) -> str:
 
 def ensure_ancestor(start: str, end: str, original: str) -> None:
     """Ensure start is an ancestor of end."""
-    result = run_command_result(
-        f"git merge-base --is-ancestor {shlex.quote(start)} {shlex.quote(end)}"
-    )
+    result = run_argv(["git", "merge-base", "--is-ancestor", start, end], check=False)
     if result.returncode != 0:
         raise SelectionParseError(
             f"Invalid commit range '{original}': '{start}' is not an ancestor of '{end}'."
@@ -154,7 +170,7 @@ def parse_commit_selection(selection: str) -> List[str]:
                     seen.add(start)
                 continue
             range_commits = run_command(
-                f"git rev-list --reverse {shlex.quote(start)}..{shlex.quote(end)}"
+                ["git", "rev-list", "--reverse", f"{start}..{end}"]
             ).splitlines()
             for commit in [start] + range_commits:
                 if commit and commit not in seen:
@@ -221,7 +237,7 @@ def selection_header_lines(
 
 def check_current_branch(expected_branch: str) -> None:
     """Ensure we're starting from the expected base branch."""
-    current_branch = run_command("git branch --show-current")
+    current_branch = run_command(["git", "branch", "--show-current"])
     if current_branch != expected_branch:
         print(
             f"Error: Currently on branch '{current_branch}'. "
@@ -234,35 +250,63 @@ def check_current_branch(expected_branch: str) -> None:
 def checkout_base_branch(base_branch: str) -> None:
     """Checkout the base branch."""
     print(f"Checking out {base_branch} branch...")
-    run_command(f"git checkout {shlex.quote(base_branch)}")
+    run_command(["git", "checkout", base_branch])
     print(f"✓ Checked out {base_branch} branch")
 
 
 def fetch_remote_branches(remote: str) -> None:
     """Fetch latest remote branches."""
     print(f"Fetching remote branches from {remote}...")
-    run_command(f"git fetch {shlex.quote(remote)} --prune --tags")
+    run_command(["git", "fetch", remote, "--prune", "--tags"])
     print("✓ Fetched remote branches")
 
 
+# Optional pooled GitHub API client, set by configure_github_client. Without
+# one, every API call goes through the gh CLI.
+_GITHUB_CLIENT: GitHubClient | None = None
+
+
+def configure_github_client(client: GitHubClient | None) -> None:
+    """Route GitHub API calls through `client` (None restores the gh CLI)."""
+    global _GITHUB_CLIENT
+    _GITHUB_CLIENT = client
+
+
 def get_repo_url() -> str:
-    """Get the repository URL via gh, if available."""
+    """Get the repository URL via the API client or gh, if available."""
+    if _GITHUB_CLIENT is not None:
+        slug = repo_slug_from_git_remotes()
+        if slug:
+            try:
+                return _GITHUB_CLIENT.get_json(f"repos/{slug}").get("html_url") or ""
+            except GITHUB_REQUEST_ERRORS:
+                return ""
     try:
-        return run_command("gh repo view --json url -q .url")
+        return run_command(["gh", "repo", "view", "--json", "url", "-q", ".url"])
     except subprocess.CalledProcessError:
         return ""
 
 
 def get_repo_name_with_owner() -> str:
-    """Get repository name with owner via gh."""
-    return run_command("gh repo view --json nameWithOwner -q .nameWithOwner")
+    """Get repository name with owner from the git remotes or gh."""
+    if _GITHUB_CLIENT is not None:
+        slug = repo_slug_from_git_remotes()
+        if slug:
+            return slug
+    return run_command(["gh", "repo", "view", "--json", "nameWithOwner", "-q", ".nameWithOwner"])
 
 
 def get_commit_info(commit_sha: str, repo_url: str) -> Dict[str, str]:
     """Get metadata for a specific commit."""
     output = run_command(
-        "git show -s --format=%H%x00%h%x00%an%x00%ae%x00%ad%x00%s%x00%b "
-        f"--date=iso-strict {shlex.quote(commit_sha)}"
+        [
+            "git",
+            "show",
+            "-s",
+            "--format=%H%x00%h%x00%an%x00%ae%x00%ad%x00%s%x00%b",
+            "--date=iso-strict",
+            commit_sha,
+        ]
     )
     parts = output.split("\x00")
     if len(parts) < 7:
@@ -282,24 +326,50 @@ def get_commit_info(commit_sha: str, repo_url: str) -> Dict[str, str]:
 
 def get_commit_parents(commit_sha: str) -> List[str]:
     """Return parent SHAs for the given commit."""
-    output = run_command(
-        f"git rev-list --parents -n 1 {shlex.quote(commit_sha)}"
-    )
+    output = run_command(["git", "rev-list", "--parents", "-n", "1", commit_sha])
     parts = output.split()
     return parts[1:] if len(parts) > 1 else []
 
 
+def collect_commit_diff_stats(commit_sha: str, files: List[str]) -> Dict[str, FileStat]:
+    """Run the numstat/raw pre-pass for a commit's own changes; empty on failure."""
+    merge_flag = ["-m"] if len(get_commit_parents(commit_sha)) > 1 else []
+    try:
+        return collect_diff_stats(
+            [
+                "git", "diff-tree", *merge_flag, "--no-commit-id", "--raw", "--numstat", "-z",
+                "--no-renames", "--no-abbrev", "-r", "--root", commit_sha,
+            ],
+            files,
+        )
+    except subprocess.CalledProcessError as exc:
+        print(f"Warning: Could not collect diff stats for commit {commit_sha[:8]}: {exc}")
+        return {}
+
+
 def get_commit_changed_files(commit_sha: str) -> List[str]:
     """Get list of changed files for a specific commit."""
     parents = get_commit_parents(commit_sha)
-    merge_flag = "-m " if len(parents) > 1 else ""
+    merge_flag = ["-m"] if len(parents) > 1 else []
     output = run_command(
-        f"git diff-tree {merge_flag}--no-commit-id --name-only -r --root {shlex.quote(commit_sha)}"
+        ["git", "diff-tree", *merge_flag, "--no-commit-id", "--name-only", "-r", "--root", commit_sha]
     )
     files = [line for line in output.splitlines() if line.strip()]
     return list(dict.fromkeys(files))
 
 
+# Optional persistent cache for API results, set by configure_result_cache.
+_RESULT_CACHE: ResultCache | None = None
+_RESULT_CACHE_TTL: float = DEFAULT_CACHE_TTL
+
+
+def configure_result_cache(cache: ResultCache | None, ttl: float = DEFAULT_CACHE_TTL) -> None:
+    """Enable (or with None, disable) the persistent result cache."""
+    global _RESULT_CACHE, _RESULT_CACHE_TTL
+    _RESULT_CACHE = cache
+    _RESULT_CACHE_TTL = ttl
+
+
 def normalize_check_entry(check: Dict[str, str], check_type: str) -> Dict[str, str]:
     return {
         "type": check_type,
@@ -312,54 +382,170 @@ def normalize_check_entry(check: Dict[str, str], check_type: str) -> Dict[str, s
     }
 
 
-def get_commit_checks(commit_sha: str, repo: str) -> List[Dict[str, str]]:
-    """Get status check results for a specific commit."""
-    checks: List[Dict[str, str]] = []
+def normalize_commit_checks(check_runs: List[Any], statuses: List[Any]) -> List[Dict[str, str]]:
+    return [normalize_check_entry(check, "check-run") for check in check_runs or []] + [
+        normalize_check_entry(status, "status") for status in statuses or []
+    ]
+
+
+# Optional asyncio fetch engine, set by configure_fetch_engine, and the check
+# results prefetch_commit_checks gathered with it, keyed by commit SHA.
+_FETCH_ENGINE: AsyncFetchEngine | None = None
+_PREFETCHED_CHECKS: Dict[str, List[Dict[str, str]]] = {}
 
-    check_runs_json = run_command(
-        f"gh api repos/{shlex.quote(repo)}/commits/{shlex.quote(commit_sha)}/check-runs"
+
+def configure_fetch_engine(engine: AsyncFetchEngine | None) -> None:
+    """Prefetch commit checks on `engine` (None fetches them one commit at a time)."""
+    global _FETCH_ENGINE
+    _FETCH_ENGINE = engine
+    _PREFETCHED_CHECKS.clear()
+
+
+async def _fetch_commit_checks_async(
+    engine: AsyncFetchEngine, commit_sha: str, repo: str
+) -> List[Dict[str, str]]:
+    commit_path = f"repos/{repo}/commits/{commit_sha}"
+    if _GITHUB_CLIENT is not None:
+        check_runs, statuses = await asyncio.gather(
+            engine.call(_GITHUB_CLIENT.get_paginated, f"{commit_path}/check-runs", item_key="check_runs"),
+            engine.call(_GITHUB_CLIENT.get_paginated, f"{commit_path}/status", item_key="statuses"),
+        )
+        return normalize_commit_checks(check_runs, statuses)
+
+    check_runs_json, status_json = await asyncio.gather(
+        engine.gh(["api", f"{commit_path}/check-runs"]),
+        engine.gh(["api", f"{commit_path}/status"]),
+    )
+    return normalize_commit_checks(
+        json.loads(check_runs_json).get("check_runs", []),
+        json.loads(status_json).get("statuses", []),
     )
-    check_runs = json.loads(check_runs_json)
-    for check in check_runs.get("check_runs", []) or []:
-        checks.append(normalize_check_entry(check, "check-run"))
 
-    status_json = run_command(
-        f"gh api repos/{shlex.quote(repo)}/commits/{shlex.quote(commit_sha)}/status"
+
+def prefetch_commit_checks(commit_shas: List[str], repo: str) -> int:
+    """Fetch check results for every commit concurrently on the fetch engine.
+
+    Results are stored for get_commit_checks; a commit whose fetch fails is
+    left out so get_commit_checks retries it and reports the error in place.
+    Returns the number of commits resolved.
+    """
+    engine = _FETCH_ENGINE
+    if engine is None:
+        return 0
+
+    pending: List[Tuple[str, str | None]] = []
+    for commit_sha in dict.fromkeys(commit_shas):
+        if commit_sha in _PREFETCHED_CHECKS:
+            continue
+        cache_key = None
+        if _RESULT_CACHE is not None:
+            cache_key = ResultCache.make_key("commit-checks", repo, commit_sha)
+            cached = _RESULT_CACHE.get_json(cache_key)
+            if cached is not None:
+                _PREFETCHED_CHECKS[commit_sha] = cached
+                continue
+        pending.append((commit_sha, cache_key))
+
+    results = engine.gather(
+        [partial(_fetch_commit_checks_async, engine, commit_sha, repo) for commit_sha, _ in pending]
     )
-    status_data = json.loads(status_json)
-    for status in status_data.get("statuses", []) or []:
-        checks.append(normalize_check_entry(status, "status"))
+    for (commit_sha, cache_key), result in zip(pending, results):
+        if isinstance(result, BaseException):
+            continue
+        _PREFETCHED_CHECKS[commit_sha] = result
+        if cache_key is not None and _RESULT_CACHE is not None:
+            _RESULT_CACHE.put_json(cache_key, result, ttl=_RESULT_CACHE_TTL)
+
+    resolved = sum(1 for commit_sha in dict.fromkeys(commit_shas) if commit_sha in _PREFETCHED_CHECKS)
+    print(f"✓ Prefetched checks for {resolved} of {len(set(commit_shas))} commit(s)")
+    return resolved
+
+
+def get_commit_checks(commit_sha: str, repo: str) -> List[Dict[str, str]]:
+    """Get status check results for a specific commit."""
+    if commit_sha in _PREFETCHED_CHECKS:
+        return _PREFETCHED_CHECKS[commit_sha]
+
+    cache_key = None
+    if _RESULT_CACHE is not None:
+        cache_key = ResultCache.make_key("commit-checks", repo, commit_sha)
+        cached = _RESULT_CACHE.get_json(cache_key)
+        if cached is not None:
+            return cached
+
+    if _GITHUB_CLIENT is not None:
+        commit_path = f"repos/{repo}/commits/{commit_sha}"
+        checks = normalize_commit_checks(
+            _GITHUB_CLIENT.get_paginated(f"{commit_path}/check-runs", item_key="check_runs"),
+            _GITHUB_CLIENT.get_paginated(f"{commit_path}/status", item_key="statuses"),
+        )
+    else:
+        check_runs_json = run_command(["gh", "api", f"repos/{repo}/commits/{commit_sha}/check-runs"])
+        status_json = run_command(["gh", "api", f"repos/{repo}/commits/{commit_sha}/status"])
+        checks = normalize_commit_checks(
+            json.loads(check_runs_json).get("check_runs", []),
+            json.loads(status_json).get("statuses", []),
+        )
 
+    if cache_key is not None and _RESULT_CACHE is not None:
+        _RESULT_CACHE.put_json(cache_key, checks, ttl=_RESULT_CACHE_TTL)
     return checks
 
 
-def extract_actions_run_id(details_url: str | None) -> str | None:
-    """Extract the GitHub Actions run ID from a details URL."""
-    if not details_url:
-        return None
-    match = re.search(r"/actions/runs/(\d+)", details_url)
-    return match.group(1) if match else None
+# Shared failed-log fetcher, set by configure_log_fetcher. Without one, a
+# default fetcher is created on first use and closed when the process exits.
+_LOG_FETCHER: FailedLogFetcher | None = None
+_DEFAULT_LOG_FETCHER: FailedLogFetcher | None = None
+
+
+def configure_log_fetcher(fetcher: FailedLogFetcher | None) -> None:
+    """Use `fetcher` for failed-check logs (None restores the default)."""
+    global _LOG_FETCHER
+    _LOG_FETCHER = fetcher
+
+
+def _log_fetcher() -> FailedLogFetcher:
+    global _DEFAULT_LOG_FETCHER
+    if _LOG_FETCHER is not None:
+        return _LOG_FETCHER
+    if _DEFAULT_LOG_FETCHER is None:
+        _DEFAULT_LOG_FETCHER = FailedLogFetcher(cache=_RESULT_CACHE)
+    # Follow configure_result_cache changes made after the first use.
+    _DEFAULT_LOG_FETCHER.cache = _RESULT_CACHE
+    return _DEFAULT_LOG_FETCHER
+
+
+@atexit.register
+def _close_default_log_fetcher() -> None:
+    """Remove the default fetcher's log directory and stop its workers."""
+    global _DEFAULT_LOG_FETCHER
+    if _DEFAULT_LOG_FETCHER is not None:
+        _DEFAULT_LOG_FETCHER.close()
+        _DEFAULT_LOG_FETCHER = None
 
 
 def get_failed_check_logs(check: Dict[str, str]) -> str | None:
-    """Retrieve raw logs for failed GitHub Actions checks."""
-    conclusion = (check.get("conclusion") or "").lower()
-    if conclusion in {"success", "neutral", "skipped"}:
-        return None
+    """Retrieve the failed-job logs for a failed GitHub Actions check."""
+    return _log_fetcher().get_log(check)
 
-    run_id = extract_actions_run_id(check.get("detailsUrl") or "")
-    if not run_id:
-        return None
 
-    try:
-        print(
-            f"Fetching logs for failed check '{check.get('name', 'unknown check')}' "
-            f"(run {run_id})"
-        )
-        return run_command(f"gh run view {shlex.quote(run_id)} --log")
-    except subprocess.CalledProcessError as exc:
-        print(f"Warning: Failed to fetch logs for run {run_id}: {exc}")
-        return None
+def attach_failed_check_logs(checks: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Return copies of `checks` pointing at their failed-job logs on disk.
+
+    Every failed run is requested up front, so runs download in parallel and
+    checks from the same run share one download. Logs are not loaded; the
+    "logPath" and "logJob" keys let run_commit_big_picture stream them.
+    """
+    fetcher = _log_fetcher()
+    fetcher.prefetch(checks)
+    checks_with_logs: List[Dict[str, str]] = []
+    for check in checks:
+        check_copy = dict(check)
+        source = fetcher.log_source(check_copy)
+        if source:
+            check_copy.update(source)
+        checks_with_logs.append(check_copy)
+    return checks_with_logs
 
 
 def checks_all_green(checks: List[Dict[str, str]]) -> bool:
@@ -373,19 +559,34 @@ def checks_all_green(checks: List[Dict[str, str]]) -> bool:
     return True
 
 
-def filter_excluded_files(files: List[str]) -> Tuple[List[str], List[str]]:
-    """Filter files that should be excluded from documents."""
-    excluded_files: List[str] = []
-    included_files: List[str] = []
+_EXCLUSION_RULES = ExclusionRules()
+
+
+def configure_exclusion_rules(rules: ExclusionRules) -> None:
+    global _EXCLUSION_RULES
+    _EXCLUSION_RULES = rules
 
-    for file_path in files:
-        if Path(file_path).name == "package-lock.json":
-            excluded_files.append(file_path)
-        else:
-            included_files.append(file_path)
+
+def filter_excluded_files(
+    files: List[str],
+    diff_stats: Mapping[str, FileStat] | None = None,
+    revision: str | None = None,
+) -> Tuple[List[str], List[str]]:
+    """Filter files that should be excluded from documents.
+
+    `diff_stats` from the pre-pass enables the changed-line threshold;
+    `revision` selects whose gitattributes apply (default: the working tree).
+    """
+    changed_lines = changed_line_counts(diff_stats) if diff_stats else None
+    reasons = _EXCLUSION_RULES.classify(files, changed_lines, revision)
+    excluded_files = [file_path for file_path in files if file_path in reasons]
+    included_files = [file_path for file_path in files if file_path not in reasons]
 
     if excluded_files:
-        print(f"Skipping {len(excluded_files)} excluded file(s): {', '.join(excluded_files)}")
+        print(
+            f"Skipping {len(excluded_files)} excluded file(s): "
+            f"{format_exclusions(reasons, files)}"
+        )
 
     return included_files, excluded_files
 
@@ -396,8 +597,15 @@ def run_commit_big_picture(
     checks: List[Dict[str, str]],
     output_file: str,
     include_logs: bool = False,
+    log_window: LogWindow | None = None,
+    diff_stats: Mapping[str, FileStat] | None = None,
+    diff_budget_bytes: int = 0,
 ) -> bool:
-    """Generate a git diff compilation for a commit."""
+    """Generate a git diff compilation for a commit.
+
+    With `diff_stats` from the pre-pass, binary files and files beyond
+    `diff_budget_bytes` are listed in the header instead of diffed.
+    """
     commit_sha = commit_info["sha"]
     print(f"Creating diff compilation for commit {commit_info['short']}...")
 
@@ -405,9 +613,14 @@ def run_commit_big_picture(
         print(f"Warning: No files found for commit {commit_info['short']}")
         return False
 
-    files_arg = " ".join(shlex.quote(f) for f in files)
-    diff_output = run_command(
-        f"git show --pretty=format: {shlex.quote(commit_sha)} -- {files_arg}"
+    plan = plan_diff_budget(diff_stats or {}, files, diff_budget_bytes)
+    if plan.over_budget_paths:
+        print(
+            f"Leaving {len(plan.over_budget_paths)} file(s) out of the diff to fit "
+            f"{diff_budget_bytes} bytes: {', '.join(plan.over_budget_paths)}"
+        )
+    diff_output = run_batched(
+        ["git", "show", "--pretty=format:", commit_sha], sorted(plan.diff_paths)
     )
 
     body_text = " ".join(commit_info.get("body", "").split()) or "(no body provided)"
@@ -423,9 +636,18 @@ def run_commit_big_picture(
         diff_file.write(f"# Body: {body_text}\n")
         diff_file.write(f"# Checks green: {checks_green}\n")
         diff_file.write(f"# Changed files: {len(files)}\n")
-        diff_file.write(f"# Files: {', '.join(files)}\n\n")
+        diff_file.write(f"# Files: {', '.join(files)}\n")
+        if diff_stats:
+            for line in plan_header_lines(diff_stats, plan, diff_budget_bytes):
+                diff_file.write(f"{line}\n")
+        diff_file.write("\n")
         diff_file.write("=" * 80 + "\n")
-        diff_file.write(diff_output if diff_output else "# No differences found\n")
+        if diff_output:
+            diff_file.write(diff_output)
+        elif files and not plan.diff_paths:
+            diff_file.write(f"{empty_diff_line(plan)}\n")
+        else:
+            diff_file.write("# No differences found\n")
         diff_file.write("\n\n")
         diff_file.write("=" * 80 + "\n")
         diff_file.write(f"Checks ({len(checks)}):\n")
@@ -438,7 +660,6 @@ def run_commit_big_picture(
                 status = check.get("status") or "unknown"
                 conclusion = check.get("conclusion") or "unknown"
                 details_url = check.get("detailsUrl") or ""
-                log_output = check.get("logOutput") or ""
                 heading = f"- {name}: status={status}, conclusion={conclusion}"
                 if details_url:
                     heading += f" [{details_url}]"
@@ -448,10 +669,9 @@ def run_commit_big_picture(
                 if summary:
                     for line in summary.splitlines():
                         diff_file.write(f"    {line}\n")
-                if include_logs and log_output:
+                if include_logs and (check.get("logOutput") or check.get("logPath")):
                     diff_file.write("    Logs:\n")
-                    for line in log_output.splitlines():
-                        diff_file.write(f"    {line}\n")
+                    write_log_excerpt(iter_check_log_lines(check), diff_file, window=log_window)
 
         diff_file.write("\n")
 
@@ -494,7 +714,7 @@ def create_master_comparison(
             outf.write("=" * 80 + "\n\n")
 
             with open(commit_file, "r", encoding="utf-8") as inf:
-                outf.write(inf.read())
+                shutil.copyfileobj(inf, outf)
 
             outf.write("\n\n")
 
@@ -503,9 +723,7 @@ def create_master_comparison(
 
 
 def get_commit_parent(commit_sha: str) -> str | None:
-    output = run_command(
-        f"git rev-list --parents -n 1 {shlex.quote(commit_sha)}"
-    )
+    output = run_command(["git", "rev-list", "--parents", "-n", "1", commit_sha])
     parts = output.split()
     if len(parts) <= 1:
         return None
@@ -520,15 +738,24 @@ def create_touched_files_compilation(
     output_file: str,
     master_comparison_file: str | None = None,
     include_logs: bool = False,
+    diff_stats: Mapping[str, Mapping[str, FileStat]] | None = None,
+    included_files: Mapping[str, Sequence[str]] | None = None,
 ) -> bool:
-    """Create a compilation of touched files with before/after snapshots."""
+    """Create a compilation of touched files with before/after snapshots.
+
+    `diff_stats` maps commit SHAs to their pre-pass stats; paths flagged
+    binary there are only checked for existence, never read or diffed.
+    `included_files` maps commit SHAs to the files left after exclusions, as
+    main() already computed them; commits missing from it are skipped.
+    Without it, files are listed and filtered again per commit.
+    """
     print("Creating touched files compilation...")
 
     if not commits:
         print("Warning: No commits available for compilation")
         return False
 
-    with open(output_file, "w", encoding="utf-8") as outf:
+    with open(output_file, "w", encoding="utf-8") as outf, GitObjectReader() as snapshot_reader:
         log_note = " (with logs)" if include_logs else ""
         outf.write(f"# Touched Files{log_note} (commit snapshots)\n")
         for line in selection_header_lines(
@@ -543,11 +770,18 @@ def create_touched_files_compilation(
             commit_sha = commit_info["sha"]
             commit_short = commit_info["short"]
             subject = commit_info.get("subject", "")
-            parent = get_commit_parent(commit_sha)
-            files = get_commit_changed_files(commit_sha)
-            files, _excluded = filter_excluded_files(files)
+            if included_files is not None:
+                files = list(included_files.get(commit_sha) or [])
+                commit_stats = (diff_stats or {}).get(commit_sha) or {}
+            else:
+                files = get_commit_changed_files(commit_sha)
+                commit_stats = (diff_stats or {}).get(commit_sha) or collect_commit_diff_stats(
+                    commit_sha, files
+                )
+                files, _excluded = filter_excluded_files(files, commit_stats, commit_sha)
             if not files:
                 continue
+            parent = get_commit_parent(commit_sha)
 
             outf.write("=" * 80 + "\n")
             outf.write(f"# Commit {commit_short}: {subject}\n")
@@ -561,35 +795,43 @@ def create_touched_files_compilation(
                 outf.write(f"# File: {file_path}\n")
                 outf.write(f"# Commit: {commit_short}\n\n")
 
+                stat = commit_stats.get(file_path)
+                known_binary = stat is not None and stat.binary
+                read_snapshot = snapshot_reader.info if known_binary else snapshot_reader.read
+
                 before_binary = False
                 if parent:
-                    try:
-                        before_raw = run_command_bytes(
-                            f"git show {shlex.quote(parent)}:{shlex.quote(file_path)}"
-                        )
-                        before_contents, before_binary = decode_file_snapshot(before_raw)
-                    except subprocess.CalledProcessError:
+                    before = read_snapshot(f"{parent}:{file_path}")
+                    before_binary = known_binary or before.status == "binary"
+                    if not before.found:
                         before_contents = "# (file did not exist before commit)"
+                    elif before.status == "non-blob":
+                        before_contents = non_blob_placeholder(before)
+                    else:
+                        before_contents = BINARY_PLACEHOLDER if before_binary else before.content
                 else:
                     before_contents = "# (no parent commit)"
 
-                after_binary = False
-                try:
-                    after_raw = run_command_bytes(
-                        f"git show {shlex.quote(commit_sha)}:{shlex.quote(file_path)}"
-                    )
-                    after_contents, after_binary = decode_file_snapshot(after_raw)
-                except subprocess.CalledProcessError:
+                after = read_snapshot(f"{commit_sha}:{file_path}")
+                after_binary = known_binary or after.status == "binary"
+                if not after.found:
                     after_contents = "# (file removed in commit)"
+                elif after.status == "non-blob":
+                    after_contents = non_blob_placeholder(after)
+                else:
+                    after_contents = BINARY_PLACEHOLDER if after_binary else after.content
 
                 if before_binary or after_binary:
                     print(
                         f"Skipping binary file contents for {file_path} in commit {commit_short}"
                     )
 
-                diff_output = run_command(
-                    f"git show --pretty=format: {shlex.quote(commit_sha)} -- {shlex.quote(file_path)}"
-                )
+                if known_binary:
+                    diff_output = f"# (binary file; diff omitted: {stat.old_size} -> {stat.new_size} bytes)"
+                else:
+                    diff_output = run_command(
+                        ["git", "show", "--pretty=format:", commit_sha, "--", file_path]
+                    )
 
                 outf.write("# Before\n")
                 outf.write(before_contents)
@@ -607,7 +849,7 @@ def create_touched_files_compilation(
             outf.write("=" * 80 + "\n")
             outf.write("# Appended master comparison (diffs and summaries)\n\n")
             with open(master_comparison_file, "r", encoding="utf-8") as master_file:
-                outf.write(master_file.read())
+                shutil.copyfileobj(master_file, outf)
 
     print(f"✓ Created touched files compilation: {output_file}")
     return True
@@ -620,8 +862,14 @@ def create_summary_compilation(
     selected_commits: List[str],
     output_file: str,
     include_logs: bool = False,
+    diff_stats: Mapping[str, Mapping[str, FileStat]] | None = None,
 ) -> bool:
-    """Create a concise summary document for all processed commits."""
+    """Create a concise summary document for all processed commits.
+
+    `diff_stats` maps commit SHAs to their pre-pass stats; each commit then
+    gets a stats block and the document ends with the files most commits
+    touch.
+    """
     print("Creating summary compilation file...")
 
     if not commit_files:
@@ -651,21 +899,46 @@ def create_summary_compilation(
             outf.write(f"- Date: {commit_info.get('date', '')}\n")
             outf.write(f"- URL: {commit_info.get('url', '')}\n")
             outf.write(f"- Body: {body_text}\n")
+            if diff_stats is not None:
+                for line in stats_block_lines(diff_stats.get(commit_info["sha"], {})):
+                    outf.write(f"{line}\n")
             outf.write(f"- Detailed file: {commit_file}\n")
             outf.write("\n")
 
+        if diff_stats:
+            hot_files = hot_file_lines(
+                {
+                    commit_info["short"]: diff_stats.get(commit_info["sha"], {})
+                    for commit_info, _ in commit_files
+                },
+                item_name="commit",
+            )
+            if hot_files:
+                outf.write("## Hot files (touched by more than one commit)\n")
+                outf.writelines(f"{line}\n" for line in hot_files)
+                outf.write("\n")
+
     print(f"✓ Created summary compilation: {output_file}")
     return True
 
 
+ROUND_ROBIN_MODES = ("union", "overlap", "off")
+
+
 def create_round_robin_comparisons(
     processed_commits: List[Dict[str, object]],
     output_dir: str,
     selection_requested: str,
     selection_canonical: str,
     selected_commits: List[str],
+    mode: str = "union",
 ) -> List[str]:
-    """Create pairwise comparison files for every commit combination."""
+    """Create pairwise comparison files for every commit combination.
+
+    In "union" mode each pair compares every path either commit touches; in
+    "overlap" mode only paths both commits touch are compared and disjoint
+    pairs are skipped.
+    """
     print("Creating round-robin comparisons...")
 
     if len(processed_commits) < 2:
@@ -691,13 +964,21 @@ def create_round_robin_comparisons(
             output_dir, f"commit-{left_sha[:8]}-versus-{right_sha[:8]}.txt"
         )
 
-        combined_files = sorted(set(left_files) | set(right_files))
-        files_arg = " ".join(shlex.quote(f) for f in combined_files)
-        diff_cmd = f"git diff {shlex.quote(left_sha)} {shlex.quote(right_sha)}"
-        if files_arg:
-            diff_cmd += f" -- {files_arg}"
-
-        diff_output = run_command(diff_cmd)
+        if mode == "overlap":
+            combined_files = sorted(set(left_files) & set(right_files))
+            if not combined_files:
+                print(
+                    f"Skipping round-robin comparison for {left_sha[:8]} vs {right_sha[:8]} "
+                    "because they touch no files in common"
+                )
+                continue
+        else:
+            combined_files = sorted(set(left_files) | set(right_files))
+        diff_prefix = ["git", "diff", left_sha, right_sha]
+        if combined_files:
+            diff_output = run_batched(diff_prefix, combined_files)
+        else:
+            diff_output = run_command(diff_prefix)
 
         left_summary = " ".join(left_info.get("subject", "").split()) or "(no subject)"
         right_summary = " ".join(right_info.get("subject", "").split()) or "(no subject)"
@@ -720,6 +1001,8 @@ def create_round_robin_comparisons(
             outf.write(f"# Right URL: {right_info.get('url', '')}\n")
             outf.write(f"# Left summary: {left_summary}\n")
             outf.write(f"# Right summary: {right_summary}\n")
+            if mode == "overlap":
+                outf.write("# Round-robin mode: overlap (only paths touched by both commits)\n")
             outf.write(f"# Files compared: {len(combined_files)}\n")
             outf.write(f"# Files: {', '.join(combined_files)}\n\n")
             outf.write("=" * 80 + "\n")
@@ -735,6 +1018,24 @@ def create_round_robin_comparisons(
     return output_files
 
 
+def record_profile_counters(
+    github_client: GitHubClient | None,
+    result_cache: ResultCache | None,
+    log_fetcher: FailedLogFetcher,
+    rate_limits: RateLimitScheduler,
+) -> None:
+    """Copy the run's request and cache counters into PROFILE."""
+    api_requests = github_client.requests if github_client is not None else 0
+    if _FETCH_ENGINE is not None:
+        api_requests += _FETCH_ENGINE.requests
+    PROFILE.set_counter("apiRequests", api_requests)
+    PROFILE.set_counter("apiRetries", rate_limits.retries)
+    PROFILE.set_counter("logDownloads", log_fetcher.downloads)
+    if result_cache is not None:
+        PROFILE.set_counter("cacheHits", result_cache.hits)
+        PROFILE.set_counter("cacheMisses", result_cache.misses)
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(
         description="Automate diff generation for selected commits",
@@ -776,11 +1077,184 @@ def main() -> None:
         action="store_true",
         help="Don't return to the base branch at the end",
     )
+    parser.add_argument(
+        "--round-robin-mode",
+        choices=ROUND_ROBIN_MODES,
+        default="union",
+        help=(
+            "Paths compared for each commit pair: 'union' of both commits' files, "
+            "'overlap' for files both commits touch (disjoint pairs skipped), "
+            "or 'off' to skip round-robin comparisons (default: union)"
+        ),
+    )
+    parser.add_argument(
+        "--no-api-client",
+        action="store_true",
+        help=(
+            "Call the gh CLI for every GitHub request even when GH_TOKEN is set "
+            "(default: use a pooled HTTPS client when a token is available)"
+        ),
+    )
+    parser.add_argument(
+        "--api-retries",
+        type=int,
+        default=DEFAULT_MAX_RETRIES,
+        help=(
+            "Retries for a GitHub request that hits a rate limit or a 5xx error; "
+            f"requests are also paced to the remaining budget (default: {DEFAULT_MAX_RETRIES})"
+        ),
+    )
+    parser.add_argument(
+        "--log-jobs",
+        type=int,
+        default=DEFAULT_LOG_JOBS,
+        help=(
+            "Maximum concurrent failed-run log downloads; each run is fetched once "
+            f"with --log-failed (default: {DEFAULT_LOG_JOBS})"
+        ),
+    )
+    parser.add_argument(
+        "--fetch-concurrency",
+        type=int,
+        default=DEFAULT_FETCH_CONCURRENCY,
+        help=(
+            "Maximum check-result requests in flight at once on the asyncio fetch "
+            f"engine (default: {DEFAULT_FETCH_CONCURRENCY}; 1 fetches per commit as processed)"
+        ),
+    )
+    parser.add_argument(
+        "--log-head-lines",
+        type=int,
+        default=DEFAULT_LOG_HEAD_LINES,
+        help=f"Failed-check log lines always kept from the start (default: {DEFAULT_LOG_HEAD_LINES})",
+    )
+    parser.add_argument(
+        "--log-tail-lines",
+        type=int,
+        default=DEFAULT_LOG_TAIL_LINES,
+        help=f"Failed-check log lines always kept from the end (default: {DEFAULT_LOG_TAIL_LINES})",
+    )
+    parser.add_argument(
+        "--log-context-lines",
+        type=int,
+        default=DEFAULT_LOG_CONTEXT_LINES,
+        help=(
+            "Failed-check log lines kept before and after each error marker "
+            f"(default: {DEFAULT_LOG_CONTEXT_LINES})"
+        ),
+    )
+    parser.add_argument(
+        "--full-logs",
+        action="store_true",
+        help="Embed every failed-check log line instead of head/tail/error windows",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help=(
+            "Directory for a persistent cache of commit checks and failed-run "
+            "logs (default: no cache)"
+        ),
+    )
+    parser.add_argument(
+        "--cache-max-bytes",
+        type=int,
+        default=DEFAULT_CACHE_MAX_BYTES,
+        help=(
+            "Evict least recently used cache entries beyond this size "
+            f"(default: {DEFAULT_CACHE_MAX_BYTES})"
+        ),
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=DEFAULT_CACHE_TTL,
+        help=f"Seconds cached check results stay valid (default: {DEFAULT_CACHE_TTL})",
+    )
+    parser.add_argument(
+        "--diff-budget-bytes",
+        type=int,
+        default=0,
+        metavar="N",
+        help=(
+            "Plan each per-commit diff to fit N bytes, estimated from the numstat pre-pass; "
+            "the largest files are left out first and listed in the header "
+            "(default: 0, unlimited)"
+        ),
+    )
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        default=[],
+        metavar="PATTERN",
+        help=(
+            "Keep paths matching this .gitignore-style glob out of diff output "
+            "(repeatable; adds to the default lockfile/minified/snapshot patterns)"
+        ),
+    )
+    parser.add_argument(
+        "--exclude-from",
+        action="append",
+        default=[],
+        metavar="FILE",
+        help="Read additional exclusion patterns from FILE, one per line (repeatable)",
+    )
+    parser.add_argument(
+        "--no-default-excludes",
+        action="store_true",
+        help="Drop the built-in exclusion patterns and use only --exclude/--exclude-from",
+    )
+    parser.add_argument(
+        "--no-gitattributes-excludes",
+        action="store_true",
+        help="Do not exclude paths marked linguist-generated or -diff in gitattributes",
+    )
+    parser.add_argument(
+        "--exclude-max-lines",
+        type=int,
+        default=0,
+        metavar="N",
+        help=(
+            "Exclude files whose diff adds plus removes more than N lines "
+            "(default: 0, no limit)"
+        ),
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="PATH",
+        help=(
+            "Write per-phase timings, per-command timings and resource counters "
+            "to PATH as JSON"
+        ),
+    )
 
     args = parser.parse_args()
 
     if not args.commit_selection:
         parser.error("commit_selection is required (e.g. 'abc123,def456').")
+    if args.log_jobs < 1:
+        parser.error("--log-jobs must be at least 1.")
+    if args.fetch_concurrency < 1:
+        parser.error("--fetch-concurrency must be at least 1.")
+    if args.api_retries < 0:
+        parser.error("--api-retries must not be negative.")
+    if min(args.log_head_lines, args.log_tail_lines, args.log_context_lines) < 0:
+        parser.error("--log-head-lines, --log-tail-lines and --log-context-lines must not be negative.")
+    if args.diff_budget_bytes < 0:
+        parser.error("--diff-budget-bytes must not be negative.")
+    if args.exclude_max_lines < 0:
+        parser.error("--exclude-max-lines must not be negative.")
+    try:
+        configure_exclusion_rules(
+            build_exclusion_rules(
+                args.exclude,
+                args.exclude_from,
+                use_defaults=not args.no_default_excludes,
+                use_gitattributes=not args.no_gitattributes_excludes,
+                max_changed_lines=args.exclude_max_lines,
+            )
+        )
+    except OSError as exc:
+        parser.error(f"--exclude-from: {exc}")
 
     try:
         selected_commits = parse_commit_selection(args.commit_selection)
@@ -790,6 +1264,7 @@ def main() -> None:
     selection_requested = args.commit_selection
     selection_canonical = format_commit_selection(selected_commits)
     selection_tag = build_selection_tag(selected_commits, selection_canonical)
+    os.makedirs(args.output_dir, exist_ok=True)
 
     print(f"Requested commit selection: {selection_requested}")
     print(f"Canonical commit selection: {selection_canonical}")
@@ -802,8 +1277,35 @@ def main() -> None:
 
     check_current_branch(args.base_branch)
 
+    PROFILE.reset()
+    result_cache = None
+    if args.cache_dir:
+        result_cache = ResultCache(args.cache_dir, max_bytes=args.cache_max_bytes)
+        configure_result_cache(result_cache, ttl=args.cache_ttl)
+    rate_limits = RateLimitScheduler(max_retries=args.api_retries)
+    configure_rate_limits(rate_limits)
+    github_client = (
+        None if args.no_api_client else GitHubClient.from_environment(scheduler=rate_limits)
+    )
+    configure_github_client(github_client)
+    fetch_rate_limit_snapshot = (
+        (lambda: github_client.get_json("rate_limit")) if github_client is not None else None
+    )
+    rate_limits.refresh(fetch_rate_limit_snapshot)
+    if args.fetch_concurrency > 1:
+        configure_fetch_engine(AsyncFetchEngine(args.fetch_concurrency, scheduler=rate_limits))
+    log_fetcher = FailedLogFetcher(jobs=args.log_jobs, cache=result_cache, scheduler=rate_limits)
+    log_window = LogWindow(
+        head_lines=args.log_head_lines,
+        tail_lines=args.log_tail_lines,
+        context_lines=args.log_context_lines,
+        full=args.full_logs,
+    )
+    configure_log_fetcher(log_fetcher)
+
     try:
-        fetch_remote_branches(args.remote)
+        with PROFILE.phase("fetch"):
+            fetch_remote_branches(args.remote)
 
         repo_url = get_repo_url()
         repo_name = get_repo_name_with_owner()
@@ -812,35 +1314,48 @@ def main() -> None:
         commit_infos: List[Dict[str, str]] = []
         missing_commits: List[str] = []
 
-        for commit in selected_commits:
-            try:
-                commit_info = get_commit_info(commit, repo_url)
-                commit_infos.append(commit_info)
-                print(f"  {commit_info['short']}: {commit_info['subject']}")
-            except (subprocess.CalledProcessError, ValueError) as exc:
-                print(f"  {commit[:8]}: Not found or inaccessible ({exc})")
-                missing_commits.append(commit)
+        with PROFILE.phase("metadata"):
+            for commit in selected_commits:
+                try:
+                    commit_info = get_commit_info(commit, repo_url)
+                    commit_infos.append(commit_info)
+                    print(f"  {commit_info['short']}: {commit_info['subject']}")
+                except (subprocess.CalledProcessError, ValueError) as exc:
+                    print(f"  {commit[:8]}: Not found or inaccessible ({exc})")
+                    missing_commits.append(commit)
 
         if not commit_infos:
             print("Error: No valid commits found for the requested selection")
             sys.exit(1)
 
+        with PROFILE.phase("checks"):
+            prefetch_commit_checks([commit_info["sha"] for commit_info in commit_infos], repo_name)
+
         successful_commits: List[Tuple[Dict[str, str], str]] = []
         successful_commits_with_logs: List[Tuple[Dict[str, str], str]] = []
         processed_commits: List[Dict[str, object]] = []
         processed_commits_with_logs: List[Dict[str, object]] = []
+        commit_diff_stats: Dict[str, Dict[str, FileStat]] = {}
+        commit_included_files: Dict[str, List[str]] = {}
 
         for commit_info in commit_infos:
             print(f"\n--- Processing commit {commit_info['short']}: {commit_info['subject']} ---")
 
-            files = get_commit_changed_files(commit_info["sha"])
+            with PROFILE.phase("files"):
+                files = get_commit_changed_files(commit_info["sha"])
             if not files:
                 print(f"No changed files found for commit {commit_info['short']}")
                 continue
 
             print(f"Total changed files: {len(files)}")
 
-            included_files, _excluded_files = filter_excluded_files(files)
+            with PROFILE.phase("numstat"):
+                diff_stats = collect_commit_diff_stats(commit_info["sha"], files)
+            commit_diff_stats[commit_info["sha"]] = diff_stats
+            included_files, _excluded_files = filter_excluded_files(
+                files, diff_stats, commit_info["sha"]
+            )
+            commit_included_files[commit_info["sha"]] = included_files
             if not included_files:
                 print(
                     f"No files to process for commit {commit_info['short']} "
@@ -855,18 +1370,20 @@ def main() -> None:
 
             try:
                 checks_with_logs: List[Dict[str, str]] = []
-                checks = get_commit_checks(commit_info["sha"], repo_name)
-            except (subprocess.CalledProcessError, json.JSONDecodeError, KeyError) as exc:
+                with PROFILE.phase("checks"):
+                    checks = get_commit_checks(commit_info["sha"], repo_name)
+            except (
+                subprocess.CalledProcessError,
+                json.JSONDecodeError,
+                KeyError,
+                *GITHUB_REQUEST_ERRORS,
+            ) as exc:
                 print(f"Failed to retrieve checks for commit {commit_info['short']}: {exc}")
                 checks = []
                 checks_with_logs = []
             else:
-                for check in checks:
-                    check_copy = dict(check)
-                    logs = get_failed_check_logs(check_copy)
-                    if logs:
-                        check_copy["logOutput"] = logs
-                    checks_with_logs.append(check_copy)
+                with PROFILE.phase("logs"):
+                    checks_with_logs = attach_failed_check_logs(checks)
 
             output_file = os.path.join(
                 args.output_dir, f"commit-{commit_info['short']}-implementation.txt"
@@ -874,13 +1391,17 @@ def main() -> None:
             output_file_with_logs = os.path.join(
                 args.output_dir, f"commit-{commit_info['short']}-implementation-with-logs.txt"
             )
-            if run_commit_big_picture(
-                commit_info,
-                included_files,
-                checks,
-                output_file,
-                include_logs=False,
-            ):
+            with PROFILE.phase("diff"):
+                written = run_commit_big_picture(
+                    commit_info,
+                    included_files,
+                    checks,
+                    output_file,
+                    include_logs=False,
+                    diff_stats=diff_stats,
+                    diff_budget_bytes=args.diff_budget_bytes,
+                )
+            if written:
                 successful_commits.append((commit_info, output_file))
                 processed_commits.append(
                     {
@@ -889,13 +1410,18 @@ def main() -> None:
                         "files": included_files,
                     }
                 )
-            if run_commit_big_picture(
-                commit_info,
-                included_files,
-                checks_with_logs,
-                output_file_with_logs,
-                include_logs=True,
-            ):
+            with PROFILE.phase("diff"):
+                written = run_commit_big_picture(
+                    commit_info,
+                    included_files,
+                    checks_with_logs,
+                    output_file_with_logs,
+                    include_logs=True,
+                    log_window=log_window,
+                    diff_stats=diff_stats,
+                    diff_budget_bytes=args.diff_budget_bytes,
+                )
+            if written:
                 successful_commits_with_logs.append((commit_info, output_file_with_logs))
                 processed_commits_with_logs.append(
                     {
@@ -924,43 +1450,53 @@ def main() -> None:
             master_output = os.path.join(
                 args.output_dir, f"commit-comparison-{selection_tag}.txt"
             )
-            create_master_comparison(
-                successful_commits,
-                selection_requested,
-                selection_canonical,
-                selected_commits,
-                master_output,
-            )
+            with PROFILE.phase("master comparison"):
+                create_master_comparison(
+                    successful_commits,
+                    selection_requested,
+                    selection_canonical,
+                    selected_commits,
+                    master_output,
+                )
 
             summary_output = os.path.join(
                 args.output_dir, f"commit-summaries-{selection_tag}.txt"
             )
-            create_summary_compilation(
-                successful_commits,
-                selection_requested,
-                selection_canonical,
-                selected_commits,
-                summary_output,
-            )
+            with PROFILE.phase("summary compilation"):
+                create_summary_compilation(
+                    successful_commits,
+                    selection_requested,
+                    selection_canonical,
+                    selected_commits,
+                    summary_output,
+                    diff_stats=commit_diff_stats,
+                )
 
             touched_output = os.path.join(
                 args.output_dir, f"commit-touched-files-{selection_tag}.txt"
             )
-            create_touched_files_compilation(
-                commit_infos,
-                selection_requested,
-                selection_canonical,
-                selected_commits,
-                touched_output,
-                master_output,
-            )
-            round_robin_outputs = create_round_robin_comparisons(
-                processed_commits,
-                args.output_dir,
-                selection_requested,
-                selection_canonical,
-                selected_commits,
-            )
+            with PROFILE.phase("touched files compilation"):
+                create_touched_files_compilation(
+                    commit_infos,
+                    selection_requested,
+                    selection_canonical,
+                    selected_commits,
+                    touched_output,
+                    master_output,
+                    diff_stats=commit_diff_stats,
+                    included_files=commit_included_files,
+                )
+            round_robin_outputs: List[str] = []
+            if args.round_robin_mode != "off":
+                with PROFILE.phase("round-robin"):
+                    round_robin_outputs = create_round_robin_comparisons(
+                        processed_commits,
+                        args.output_dir,
+                        selection_requested,
+                        selection_canonical,
+                        selected_commits,
+                        mode=args.round_robin_mode,
+                    )
 
             print(f"\n✓ Successfully processed {len(successful_commits)} commit(s) (without logs)")
             print(f"✓ Individual files: {args.output_dir}/commit-{{sha}}-implementation.txt")
@@ -979,39 +1515,45 @@ def main() -> None:
             master_output_with_logs = os.path.join(
                 args.output_dir, f"commit-comparison-{selection_tag}-with-logs.txt"
             )
-            create_master_comparison(
-                successful_commits_with_logs,
-                selection_requested,
-                selection_canonical,
-                selected_commits,
-                master_output_with_logs,
-                include_logs=True,
-            )
+            with PROFILE.phase("master comparison"):
+                create_master_comparison(
+                    successful_commits_with_logs,
+                    selection_requested,
+                    selection_canonical,
+                    selected_commits,
+                    master_output_with_logs,
+                    include_logs=True,
+                )
 
             summary_output_with_logs = os.path.join(
                 args.output_dir, f"commit-summaries-{selection_tag}-with-logs.txt"
             )
-            create_summary_compilation(
-                successful_commits_with_logs,
-                selection_requested,
-                selection_canonical,
-                selected_commits,
-                summary_output_with_logs,
-                include_logs=True,
-            )
+            with PROFILE.phase("summary compilation"):
+                create_summary_compilation(
+                    successful_commits_with_logs,
+                    selection_requested,
+                    selection_canonical,
+                    selected_commits,
+                    summary_output_with_logs,
+                    include_logs=True,
+                    diff_stats=commit_diff_stats,
+                )
 
             touched_output_with_logs = os.path.join(
                 args.output_dir, f"commit-touched-files-{selection_tag}-with-logs.txt"
             )
-            create_touched_files_compilation(
-                commit_infos,
-                selection_requested,
-                selection_canonical,
-                selected_commits,
-                touched_output_with_logs,
-                master_output_with_logs,
-                include_logs=True,
-            )
+            with PROFILE.phase("touched files compilation"):
+                create_touched_files_compilation(
+                    commit_infos,
+                    selection_requested,
+                    selection_canonical,
+                    selected_commits,
+                    touched_output_with_logs,
+                    master_output_with_logs,
+                    include_logs=True,
+                    diff_stats=commit_diff_stats,
+                    included_files=commit_included_files,
+                )
 
             print(f"\n✓ Successfully processed {len(successful_commits_with_logs)} commit(s) (with logs)")
             print(
@@ -1026,6 +1568,36 @@ def main() -> None:
     except KeyboardInterrupt:
         print("\nInterrupted by user")
     finally:
+        log_fetcher.close()
+        if github_client is not None:
+            print(
+                f"GitHub API: {github_client.requests} request(s) over "
+                f"{github_client.connections_opened} connection(s)"
+            )
+        if rate_limits.throttled:
+            rate_limits.refresh(fetch_rate_limit_snapshot)
+        for line in rate_limits.report_lines():
+            print(line)
+        if github_client is not None:
+            github_client.close()
+        if result_cache is not None:
+            print(
+                f"Cache: {result_cache.hits} hit(s), {result_cache.misses} miss(es) "
+                f"in {args.cache_dir}"
+            )
+            result_cache.close()
+        record_profile_counters(
+            github_client=github_client,
+            result_cache=result_cache,
+            log_fetcher=log_fetcher,
+            rate_limits=rate_limits,
+        )
+        for line in PROFILE.summary_lines():
+            print(line)
+        if args.profile:
+            for line in TIMINGS.report_lines():
+                print(line)
+            print(f"Profile: {PROFILE.write_json(args.profile)}")
         if not args.no_cleanup:
             try:
                 checkout_base_branch(args.base_branch)
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+diff_stats - Per-path change statistics from one cheap pre-pass per item
+
+Before a PR or commit document is rendered, collect_diff_stats runs the
+item's diff once with `--raw --numstat -z` (split by command_batches only
+when the path list would overflow the command line) and one
+`git cat-file --batch-check` over the blob IDs it reports. The resulting
+table of added/removed lines, binary flags and blob sizes per path is then
+used without reading any blob:
+
+- binary paths are left out of the full diff and of snapshot reads
+- plan_diff_budget fits the remaining paths into a per-document byte
+  budget, leaving out the largest first
+- the line counts feed the exclusion line threshold, the summary's per-item
+  stats block and its hot-file table
+
+Diff sizes are estimates: added and deleted files cost their blob size,
+modified files their changed lines at ESTIMATED_LINE_BYTES each (never more
+than both blobs together). Streaming limits such as --max-diff-bytes still
+apply to what is actually written.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Mapping, Sequence, Tuple
+
+from command_runner import command_batches, run_argv
+
+
+# Typical source line plus the diff's +/- prefix and newline.
+ESTIMATED_LINE_BYTES = 48
+# `diff --git`, index, ---/+++ and one hunk header per file.
+DIFF_HEADER_BYTES = 160
+STATS_BLOCK_LARGEST = 3
+HOT_FILES_LIMIT = 10
+
+
+@dataclass
+class FileStat:
+    """Pre-pass statistics for one changed path; `added`/`deleted` are None for binaries."""
+
+    path: str
+    status: str = "M"
+    added: int | None = 0
+    deleted: int | None = 0
+    old_size: int = 0
+    new_size: int = 0
+    old_id: str = ""
+    new_id: str = ""
+
+    @property
+    def binary(self) -> bool:
+        return self.added is None or self.deleted is None
+
+    @property
+    def changed_lines(self) -> int | None:
+        if self.added is None or self.deleted is None:
+            return None
+        return self.added + self.deleted
+
+    def estimated_diff_bytes(self) -> int:
+        """Estimate the size of this path's section in a full diff."""
+        header = DIFF_HEADER_BYTES + 2 * len(self.path.encode("utf-8"))
+        lines = self.changed_lines
+        if lines is None:
+            return header
+        whole = self.old_size + self.new_size + lines
+        if self.status in {"A", "D"}:
+            return header + whole
+        return header + min(whole, lines * ESTIMATED_LINE_BYTES)
+
+
+@dataclass
+class DiffPlan:
+    """Which paths get a full diff, and why the others do not."""
+
+    diff_paths: List[str] = field(default_factory=list)
+    binary_paths: List[str] = field(default_factory=list)
+    over_budget_paths: List[str] = field(default_factory=list)
+    estimated_bytes: int = 0
+
+
+def _is_null_id(object_id: str) -> bool:
+    return not object_id or not object_id.strip("0")
+
+
+def parse_raw_numstat(output: str) -> Dict[str, FileStat]:
+    """Parse `--raw --numstat -z` output into FileStats keyed by path.
+
+    Raw records are `:<modes> <old> <new> <status>` followed by the path;
+    numstat records are `<added>\\t<deleted>\\t<path>` with `-` for
+    binaries. Merge commits diffed with -m report paths once per parent;
+    the largest line count wins.
+    """
+    stats: Dict[str, FileStat] = {}
+    tokens = output.split("\0")
+    index = 0
+    while index < len(tokens):
+        token = tokens[index].lstrip("\n")
+        index += 1
+        if token.startswith(":"):
+            if index >= len(tokens):
+                break
+            path = tokens[index]
+            index += 1
+            fields = token[1:].split()
+            if len(fields) < 5:
+                continue
+            stat = stats.setdefault(path, FileStat(path))
+            stat.old_id, stat.new_id, stat.status = fields[2], fields[3], fields[4][:1]
+            continue
+        fields = token.split("\t", 2)
+        if len(fields) != 3 or not fields[2]:
+            continue
+        added, deleted, path = fields
+        stat = stats.setdefault(path, FileStat(path))
+        if added == "-" or deleted == "-":
+            stat.added = stat.deleted = None
+        elif not stat.binary and int(added) + int(deleted) >= (stat.changed_lines or 0):
+            stat.added, stat.deleted = int(added), int(deleted)
+    return stats
+
+
+def blob_sizes(object_ids: Iterable[str]) -> Dict[str, int]:
+    """Look up object sizes with one `git cat-file --batch-check` call."""
+    wanted = sorted({object_id for object_id in object_ids if not _is_null_id(object_id)})
+    if not wanted:
+        return {}
+    output = run_argv(
+        ["git", "cat-file", "--batch-check=%(objectname) %(objectsize)"],
+        input="\n".join(wanted) + "\n",
+    ).stdout
+    sizes: Dict[str, int] = {}
+    for line in output.splitlines():
+        object_id, _, size = line.partition(" ")
+        if size.isdigit():
+            sizes[object_id] = int(size)
+    return sizes
+
+
+def collect_diff_stats(diff_prefix: Sequence[str], paths: Sequence[str]) -> Dict[str, FileStat]:
+    """Run the pre-pass for `paths` of one item.
+
+    `diff_prefix` is the item's `git diff` (or `git diff-tree`) command with
+    `--raw --numstat -z --no-renames --no-abbrev` and its revisions, without
+    paths. Raises CalledProcessError when git fails.
+    """
+    stats: Dict[str, FileStat] = {}
+    for command in command_batches(diff_prefix, sorted(paths)):
+        stats.update(parse_raw_numstat(run_argv(command).stdout))
+    sizes = blob_sizes(
+        object_id for stat in stats.values() for object_id in (stat.old_id, stat.new_id)
+    )
+    for stat in stats.values():
+        stat.old_size = sizes.get(stat.old_id, 0)
+        stat.new_size = sizes.get(stat.new_id, 0)
+    return stats
+
+
+def changed_line_counts(stats: Mapping[str, FileStat]) -> Dict[str, int | None]:
+    return {path: stat.changed_lines for path, stat in stats.items()}
+
+
+def plan_diff_budget(
+    stats: Mapping[str, FileStat], paths: Sequence[str], budget_bytes: int = 0
+) -> DiffPlan:
+    """Split `paths` into diffed, binary and over-budget paths.
+
+    Binaries are never diffed. With a budget, the largest estimated diffs
+    are left out first until the rest fit. Paths missing from `stats` are
+    diffed and count as zero bytes.
+    """
+    plan = DiffPlan()
+    candidates: List[Tuple[int, str]] = []
+    for path in paths:
+        stat = stats.get(path)
+        if stat is not None and stat.binary:
+            plan.binary_paths.append(path)
+            continue
+        candidates.append((stat.estimated_diff_bytes() if stat else 0, path))
+    total = sum(size for size, _ in candidates)
+    dropped = set()
+    if budget_bytes > 0:
+        for size, path in sorted(candidates, key=lambda item: (-item[0], item[1])):
+            if total <= budget_bytes:
+                break
+            dropped.add(path)
+            total -= size
+    plan.diff_paths = [path for _, path in candidates if path not in dropped]
+    plan.over_budget_paths = [path for _, path in candidates if path in dropped]
+    plan.estimated_bytes = total
+    return plan
+
+
+def format_file_stat(stat: FileStat) -> str:
+    if stat.binary:
+        return f"{stat.path} (binary, {stat.old_size} -> {stat.new_size} bytes)"
+    return f"{stat.path} (+{stat.added} -{stat.deleted})"
+
+
+def plan_header_lines(stats: Mapping[str, FileStat], plan: DiffPlan, budget_bytes: int) -> List[str]:
+    """Describe the pre-pass and the paths left out of a document's diff."""
+    lines = [
+        f"# Diff stats: {stats_totals(stats.values())}",
+        f"# Estimated diff size: ~{plan.estimated_bytes} bytes for {len(plan.diff_paths)} file(s)",
+    ]
+    if plan.binary_paths:
+        binaries = [format_file_stat(stats[path]) for path in plan.binary_paths]
+        lines.append(f"# Binary files (not diffed): {', '.join(binaries)}")
+    if plan.over_budget_paths:
+        omitted = [
+            f"{path} (~{stats[path].estimated_diff_bytes()} bytes)"
+            for path in plan.over_budget_paths
+        ]
+        lines.append(
+            f"# Over diff budget of {budget_bytes} bytes (not diffed, largest first): "
+            f"{', '.join(omitted)}"
+        )
+    return lines
+
+
+def empty_diff_line(plan: DiffPlan) -> str:
+    """Explain a diff body left empty because every path was binary or over budget."""
+    reasons = []
+    if plan.binary_paths:
+        reasons.append(f"{len(plan.binary_paths)} binary")
+    if plan.over_budget_paths:
+        reasons.append(f"{len(plan.over_budget_paths)} over the diff budget")
+    return (
+        "# No diff written: every included file was left out "
+        f"({', '.join(reasons) or 'no diffable files'}); see the header above"
+    )
+
+
+def stats_totals(stats: Iterable[FileStat]) -> str:
+    """Summarize files, added/removed lines and binaries as one phrase."""
+    files = added = deleted = binaries = 0
+    for stat in stats:
+        files += 1
+        if stat.binary:
+            binaries += 1
+        else:
+            added += stat.added or 0
+            deleted += stat.deleted or 0
+    return f"{files} file(s), +{added} -{deleted}, {binaries} binary"
+
+
+def stats_block_lines(
+    stats: Mapping[str, FileStat], limit: int = STATS_BLOCK_LARGEST
+) -> List[str]:
+    """Render one item's stats as summary bullet lines."""
+    if not stats:
+        return ["- Diff stats: (unavailable)"]
+    lines = [f"- Diff stats: {stats_totals(stats.values())}"]
+    ranked = sorted(
+        (stat for stat in stats.values() if not stat.binary),
+        key=lambda stat: (-(stat.changed_lines or 0), stat.path),
+    )
+    if ranked:
+        lines.append(
+            f"- Largest changes: {', '.join(format_file_stat(stat) for stat in ranked[:limit])}"
+        )
+    return lines
+
+
+def hot_file_lines(
+    item_stats: Mapping[str, Mapping[str, FileStat]],
+    item_name: str = "item",
+    limit: int = HOT_FILES_LIMIT,
+) -> List[str]:
+    """Rank paths by how many items touch them, then by total changed lines.
+
+    `item_stats` maps an item label (e.g. "#123") to that item's stats.
+    Paths touched by a single item are not listed.
+    """
+    touched: Dict[str, List[str]] = {}
+    lines_changed: Dict[str, int] = {}
+    for label, stats in item_stats.items():
+        for path, stat in stats.items():
+            touched.setdefault(path, []).append(label)
+            lines_changed[path] = lines_changed.get(path, 0) + (stat.changed_lines or 0)
+    ranked = sorted(
+        (path for path, labels in touched.items() if len(labels) > 1),
+        key=lambda path: (-len(touched[path]), -lines_changed[path], path),
+    )
+    return [
+        f"- {path}: {len(touched[path])} {item_name}(s), {lines_changed[path]} changed line(s) "
+        f"({', '.join(touched[path])})"
+        for path in ranked[:limit]
+    ]
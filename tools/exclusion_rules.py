@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+exclusion_rules - Which changed files the batch tools keep out of diff output
+
+A path is excluded when it matches one of the configured glob patterns, when
+gitattributes mark it `linguist-generated` or `-diff` (which includes the
+`binary` macro), or when its changed line count from the diff_stats
+pre-pass exceeds a threshold. Excluded paths keep the metadata-only
+treatment the tools have always given `package-lock.json`: they are listed
+in headers and touched-file sections but their diffs are not written.
+
+Patterns follow .gitignore conventions: a pattern without a slash matches the
+file or directory name at any depth, one with a slash is anchored at the
+repository root, a trailing slash matches directories only, `*` and `?` stop
+at slashes and `**` crosses them. A leading `!` re-includes paths matched by
+earlier patterns and the last matching pattern wins (`\\!` matches a literal
+`!`); unlike .gitignore, a negation can also re-include a file beneath an
+excluded directory. Consecutive patterns of the same kind are compiled once
+into a single regular expression, so without negations matching costs one
+regex search per path however many patterns are configured.
+"""
+
+import re
+import subprocess
+from typing import Dict, Iterable, List, Mapping, Pattern, Sequence, Tuple
+
+from command_runner import run_argv
+
+
+DEFAULT_EXCLUDE_PATTERNS: Tuple[str, ...] = (
+    "package-lock.json",
+    "npm-shrinkwrap.json",
+    "yarn.lock",
+    "pnpm-lock.yaml",
+    "Cargo.lock",
+    "poetry.lock",
+    "Pipfile.lock",
+    "composer.lock",
+    "Gemfile.lock",
+    "*.min.js",
+    "*.min.css",
+    "__snapshots__/",
+    "node_modules/",
+)
+
+# gitattributes consulted per path; `binary` is a macro for `-diff -merge -text`.
+EXCLUDE_ATTRIBUTES = ("linguist-generated", "diff")
+
+
+def glob_to_regex(pattern: str) -> str:
+    """Translate one .gitignore-style glob into an unanchored regex fragment."""
+    directory_only = pattern.endswith("/")
+    body = pattern.strip("/") if directory_only else pattern.lstrip("/")
+    anchored = pattern.startswith("/") or "/" in body
+    parts: List[str] = []
+    index = 0
+    while index < len(body):
+        char = body[index]
+        if body.startswith("**/", index):
+            parts.append("(?:.*/)?")
+            index += 3
+            continue
+        if body.startswith("**", index):
+            parts.append(".*")
+            index += 2
+            continue
+        if char == "*":
+            parts.append("[^/]*")
+        elif char == "?":
+            parts.append("[^/]")
+        elif char == "[":
+            end = body.find("]", index + 2)
+            if end == -1:
+                parts.append(re.escape(char))
+            else:
+                members = body[index + 1:end]
+                if members.startswith("!"):
+                    members = "^" + members[1:]
+                parts.append(f"[{members}]")
+                index = end
+        else:
+            parts.append(re.escape(char))
+        index += 1
+    prefix = "^" if anchored else "(?:^|/)"
+    # A directory match excludes everything beneath it; a file match may also
+    # name a directory, as in .gitignore.
+    suffix = "/" if directory_only else "(?:/|$)"
+    return f"{prefix}{''.join(parts)}{suffix}"
+
+
+def compile_patterns(patterns: Iterable[str]) -> Pattern[str] | None:
+    """Compile every pattern into one alternation, or None when there are none."""
+    fragments = [f"(?:{glob_to_regex(pattern)})" for pattern in patterns]
+    return re.compile("|".join(fragments)) if fragments else None
+
+
+def compile_pattern_runs(patterns: Iterable[str]) -> List[Tuple[bool, Pattern[str]]]:
+    """Compile patterns into (excludes, matcher) runs of consecutive same-kind patterns.
+
+    `!pattern` starts or extends a re-including run; `\\!` and `\\#` escape a
+    literal leading `!` or `#`.
+    """
+    runs: List[Tuple[bool, List[str]]] = []
+    for pattern in patterns:
+        excludes = not pattern.startswith("!")
+        body = pattern if excludes else pattern[1:]
+        if body[:2] in ("\\!", "\\#"):
+            body = body[1:]
+        if not body:
+            continue
+        if runs and runs[-1][0] == excludes:
+            runs[-1][1].append(body)
+        else:
+            runs.append((excludes, [body]))
+    compiled: List[Tuple[bool, Pattern[str]]] = []
+    for excludes, bodies in runs:
+        matcher = compile_patterns(bodies)
+        if matcher is not None:
+            compiled.append((excludes, matcher))
+    return compiled
+
+
+def load_exclude_patterns(path: str) -> List[str]:
+    """Read patterns from a file: one per line, blank lines and `#` comments ignored."""
+    with open(path, encoding="utf-8") as pattern_file:
+        return [
+            line.strip()
+            for line in pattern_file
+            if line.strip() and not line.lstrip().startswith("#")
+        ]
+
+
+def build_exclusion_rules(
+    extra_patterns: Sequence[str] = (),
+    pattern_files: Sequence[str] = (),
+    use_defaults: bool = True,
+    use_gitattributes: bool = True,
+    max_changed_lines: int = 0,
+) -> "ExclusionRules":
+    """Assemble rules from command-line options; unreadable pattern files raise OSError."""
+    patterns = list(DEFAULT_EXCLUDE_PATTERNS) if use_defaults else []
+    patterns.extend(extra_patterns)
+    for path in pattern_files:
+        patterns.extend(load_exclude_patterns(path))
+    return ExclusionRules(
+        patterns, use_gitattributes=use_gitattributes, max_changed_lines=max_changed_lines
+    )
+
+
+class ExclusionRules:
+    """Compiled exclusion patterns plus the gitattributes and line-count checks."""
+
+    def __init__(
+        self,
+        patterns: Sequence[str] = DEFAULT_EXCLUDE_PATTERNS,
+        use_gitattributes: bool = True,
+        max_changed_lines: int = 0,
+    ) -> None:
+        self.patterns = tuple(patterns)
+        self.use_gitattributes = use_gitattributes
+        self.max_changed_lines = max_changed_lines
+        self._runs = compile_pattern_runs(self.patterns)
+        # Cleared once git rejects `check-attr --source` (before git 2.40).
+        self._source_supported = True
+
+    def matches_pattern(self, path: str) -> bool:
+        """Return whether the last pattern matching `path` excludes it."""
+        for excludes, matcher in reversed(self._runs):
+            if matcher.search(path) is not None:
+                return excludes
+        return False
+
+    def attribute_exclusions(
+        self, paths: Sequence[str], revision: str | None = None
+    ) -> Dict[str, str]:
+        """Return paths that gitattributes mark as generated or not diffable.
+
+        With `revision`, attributes are read from that revision's tree
+        (`git check-attr --source`), so an item's own .gitattributes apply
+        whatever is checked out. Git before 2.40 has no --source; there, and
+        without `revision`, the working tree and index are used. A failure
+        (e.g. outside a repository) excludes nothing.
+        """
+        if not self.use_gitattributes or not paths:
+            return {}
+        command = ["git", "check-attr", "--stdin", "-z", *EXCLUDE_ATTRIBUTES]
+        stdin = "\0".join(paths) + "\0"
+        output = None
+        if revision and self._source_supported:
+            result = run_argv(
+                ["git", "check-attr", f"--source={revision}", *command[2:]],
+                check=False,
+                input=stdin,
+            )
+            if result.returncode == 0:
+                output = result.stdout
+            elif result.returncode == 129:
+                # Usage error: this git does not know --source.
+                self._source_supported = False
+        if output is None:
+            try:
+                output = run_argv(command, input=stdin).stdout
+            except subprocess.CalledProcessError:
+                return {}
+        reasons: Dict[str, str] = {}
+        fields = output.split("\0")
+        for index in range(0, len(fields) - 2, 3):
+            path, attribute, value = fields[index:index + 3]
+            if attribute == "linguist-generated" and value in {"set", "true"}:
+                reasons.setdefault(path, "linguist-generated")
+            elif attribute == "diff" and value == "unset":
+                reasons.setdefault(path, "-diff")
+        return reasons
+
+    def size_exclusions(self, changed_lines: Mapping[str, int | None]) -> Dict[str, str]:
+        """Return paths whose changed line count exceeds max_changed_lines."""
+        if self.max_changed_lines <= 0:
+            return {}
+        return {
+            path: f"{lines} changed lines"
+            for path, lines in changed_lines.items()
+            if lines is not None and lines > self.max_changed_lines
+        }
+
+    def classify(
+        self,
+        files: Sequence[str],
+        changed_lines: Mapping[str, int | None] | None = None,
+        revision: str | None = None,
+    ) -> Dict[str, str]:
+        """Map each excluded path in `files` to the reason it is excluded.
+
+        `changed_lines` maps paths to added+deleted lines (None for binaries),
+        usually from the diff_stats pre-pass; the line threshold is skipped
+        without it. `revision` is the item's own revision, whose
+        gitattributes apply.
+        """
+        reasons = {path: "pattern" for path in files if self.matches_pattern(path)}
+        remaining = [path for path in files if path not in reasons]
+        for path, reason in self.attribute_exclusions(remaining, revision).items():
+            reasons[path] = reason
+        remaining = [path for path in remaining if path not in reasons]
+        if changed_lines:
+            reasons.update(
+                self.size_exclusions({path: changed_lines.get(path) for path in remaining})
+            )
+        return reasons
+
+
+def format_exclusions(reasons: Dict[str, str], files: Sequence[str]) -> str:
+    """Render excluded paths in `files` order with their reasons."""
+    return ", ".join(f"{path} ({reasons[path]})" for path in files if path in reasons)
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+git_object_reader - Long-lived git cat-file readers for the batch big-picture tools
+
+Reading a file snapshot with `git show <rev>:<path>` costs a process spawn
+per path. GitObjectReader keeps a `git cat-file --batch` process open and
+streams blob contents by `<rev>:<path>` in one round trip per path,
+reporting missing paths, binary blobs, oversized blobs, and non-blob entries
+(directories, submodule commits) without decoding them. Metadata-only
+lookups go through a separate `git cat-file --batch-check` process.
+Each lookup is timed into command_runner.TIMINGS.
+"""
+
+import subprocess
+import time
+from dataclasses import dataclass
+from typing import IO, Dict, Set, Tuple
+
+from command_runner import TIMINGS, run_argv
+
+
+BINARY_PLACEHOLDER = "# (binary file omitted from report)"
+
+# ls-tree mode of a gitlink; the commit lives in the submodule, not this repository.
+SUBMODULE_MODE = "160000"
+
+# Read size used to skip over object bodies that are not returned.
+DRAIN_CHUNK_SIZE = 1 << 16
+
+
+@dataclass
+class GitBlob:
+    """Result of reading one `<rev>:<path>` object spec."""
+
+    spec: str
+    status: str
+    object_type: str = ""
+    size: int = 0
+    content: str = ""
+    object_id: str = ""
+
+    @property
+    def found(self) -> bool:
+        return self.status != "missing"
+
+
+def non_blob_placeholder(blob: GitBlob) -> str:
+    """Describe a `non-blob` entry in place of file contents."""
+    if blob.object_type == "commit":
+        return f"# (submodule at commit {blob.object_id or 'unknown'}; no file contents)"
+    return f"# ({blob.object_type or 'non-file'} entry; no file contents)"
+
+
+def looks_binary(content: bytes) -> bool:
+    """Flag probable binary content: any NUL byte, or over 10% control bytes."""
+    if not content:
+        return False
+    if b"\0" in content:
+        return True
+    control_bytes = sum(1 for byte in content if byte < 9 or (13 < byte < 32))
+    return control_bytes / len(content) > 0.1
+
+
+class GitObjectReader:
+    """Stream blob contents through persistent `git cat-file` co-processes.
+
+    `max_blob_bytes` (0 for unlimited) is checked against the object size in
+    the --batch header, so oversized blobs are skipped without being decoded
+    or buffered. Use info() when only the type and size are needed.
+    """
+
+    def __init__(self, max_blob_bytes: int = 0, cwd: str | None = None) -> None:
+        self.max_blob_bytes = max_blob_bytes
+        self.cwd = cwd
+        self._check: subprocess.Popen | None = None
+        self._batch: subprocess.Popen | None = None
+        self.requests = 0
+        self._submodules: Dict[str, Set[str]] = {}
+
+    def __enter__(self) -> "GitObjectReader":
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        self.close()
+
+    def _start(self, mode: str) -> subprocess.Popen:
+        return subprocess.Popen(
+            ["git", "cat-file", mode],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            cwd=self.cwd,
+        )
+
+    @staticmethod
+    def _send(process: subprocess.Popen, spec: str) -> IO[bytes]:
+        assert process.stdin is not None and process.stdout is not None
+        process.stdin.write(spec.encode("utf-8") + b"\n")
+        process.stdin.flush()
+        return process.stdout
+
+    def _submodule_paths(self, revision: str) -> Set[str]:
+        """Return the submodule paths declared in a revision's .gitmodules (cached)."""
+        if revision not in self._submodules:
+            self._submodules[revision] = set()
+            gitmodules = self.read(f"{revision}:.gitmodules", max_blob_bytes=0)
+            self._submodules[revision] = {
+                value.strip()
+                for key, _, value in (line.partition("=") for line in gitmodules.content.splitlines())
+                if key.strip() == "path" and value.strip()
+            }
+        return self._submodules[revision]
+
+    def _gitlink(self, spec: str) -> GitBlob | None:
+        """Recognize `<rev>:<path>` naming a submodule, which cat-file reports as missing.
+
+        Only paths declared in .gitmodules are confirmed with `git ls-tree`,
+        so repositories without submodules pay no extra command.
+        """
+        revision, separator, path = spec.partition(":")
+        if not separator or path in {"", ".gitmodules"}:
+            return None
+        if path not in self._submodule_paths(revision):
+            return None
+        try:
+            listing = run_argv(["git", "ls-tree", "-z", revision, "--", path], cwd=self.cwd).stdout
+        except subprocess.CalledProcessError:
+            return None
+        meta, _, listed_path = listing.rstrip("\0").partition("\t")
+        fields = meta.split()
+        if listed_path != path or len(fields) != 3 or fields[0] != SUBMODULE_MODE:
+            return None
+        return GitBlob(spec, "non-blob", fields[1], 0, object_id=fields[2])
+
+    @staticmethod
+    def _parse_header(header: bytes) -> Tuple[str, str, int]:
+        """Return (status, object type, size) for a cat-file header line."""
+        fields = header.decode("utf-8", errors="replace").rstrip("\n").rsplit(" ", 2)
+        if len(fields) != 3 or fields[2] in {"missing", "ambiguous"} or not fields[2].isdigit():
+            return "missing", "", 0
+        return "ok", fields[1], int(fields[2])
+
+    def _describe(self, spec: str, header: bytes, limit: int) -> GitBlob:
+        """Classify a cat-file header as missing, non-blob, oversized, or ok."""
+        status, object_type, size = self._parse_header(header)
+        if status == "missing":
+            return self._gitlink(spec) or GitBlob(spec, "missing")
+        if object_type != "blob":
+            object_id = header.decode("utf-8", errors="replace").split(" ", 1)[0]
+            return GitBlob(spec, "non-blob", object_type, size, object_id=object_id)
+        if limit and size > limit:
+            return GitBlob(spec, "oversized", object_type, size)
+        return GitBlob(spec, "ok", object_type, size)
+
+    def info(self, spec: str, max_blob_bytes: int | None = None) -> GitBlob:
+        """Return type and size for an object spec without reading its contents.
+
+        `max_blob_bytes` overrides the reader's limit for this lookup.
+        """
+        limit = self.max_blob_bytes if max_blob_bytes is None else max_blob_bytes
+        if self._check is None:
+            self._check = self._start("--batch-check")
+        self.requests += 1
+        started = time.perf_counter()
+        header = self._send(self._check, spec).readline()
+        TIMINGS.record(["git", "cat-file", "--batch-check"], time.perf_counter() - started)
+        return self._describe(spec, header, limit)
+
+    def read(self, spec: str, max_blob_bytes: int | None = None) -> GitBlob:
+        """Read a blob by `<rev>:<path>`, decoding it only when it is text.
+
+        One --batch round trip answers both the type/size lookup and the
+        read; bodies of non-blob and oversized objects are drained unread.
+        """
+        limit = self.max_blob_bytes if max_blob_bytes is None else max_blob_bytes
+        if self._batch is None:
+            self._batch = self._start("--batch")
+        self.requests += 1
+        started = time.perf_counter()
+        stdout = self._send(self._batch, spec)
+        header = stdout.readline()
+        status, object_type, size = self._parse_header(header)
+        raw = b""
+        if status == "ok":
+            if object_type == "blob" and not (limit and size > limit):
+                raw = stdout.read(size)
+                stdout.read(1)
+            else:
+                self._drain(stdout, size + 1)
+        TIMINGS.record(["git", "cat-file", "--batch"], time.perf_counter() - started)
+
+        blob = self._describe(spec, header, limit)
+        if blob.status != "ok":
+            return blob
+        if looks_binary(raw):
+            return GitBlob(spec, "binary", blob.object_type, size)
+        blob.content = raw.decode("utf-8", errors="replace")
+        return blob
+
+    @staticmethod
+    def _drain(stdout: IO[bytes], size: int) -> None:
+        """Discard `size` bytes of a response without holding them in memory."""
+        while size > 0:
+            chunk = stdout.read(min(size, DRAIN_CHUNK_SIZE))
+            if not chunk:
+                break
+            size -= len(chunk)
+
+    def close(self) -> None:
+        for process in (self._check, self._batch):
+            if process is None:
+                continue
+            if process.stdin is not None:
+                process.stdin.close()
+            if process.stdout is not None:
+                process.stdout.close()
+            process.wait()
+        self._check = None
+        self._batch = None
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+github_client - Small pooled GitHub API client shared by the repo tools
+
+Spawning `gh api` for every request costs a process start, an auth lookup
+and a fresh TLS handshake per call. GitHubClient keeps a pool of keep-alive
+HTTP connections, authenticates with GH_TOKEN (or GITHUB_TOKEN), follows
+`Link: rel="next"` pagination and speaks GraphQL. Every request is paced
+and, on rate limits or server errors, retried through a RateLimitScheduler.
+It uses only the standard library. When no token is available, from_environment() returns None and
+callers keep using the `gh` CLI.
+"""
+
+import http.client
+import json
+import os
+import queue
+import re
+import subprocess
+import threading
+import urllib.parse
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
+
+from rate_limit import RateLimitScheduler, api_resource
+
+DEFAULT_API_URL = "https://api.github.com"
+DEFAULT_POOL_SIZE = 8
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_PAGE_SIZE = 100
+API_VERSION = "2022-11-28"
+
+LINK_NEXT = re.compile(r'<([^>]+)>\s*;\s*rel="next"')
+# Errors that mean a pooled keep-alive connection went stale; retried once on a fresh one.
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    http.client.BadStatusLine,
+    BrokenPipeError,
+    ConnectionResetError,
+)
+
+
+class GitHubAPIError(RuntimeError):
+    """Raised when the GitHub API answers with an error status."""
+
+    def __init__(self, status: int, message: str, headers: Dict[str, str] | None = None) -> None:
+        super().__init__(f"GitHub API error {status}: {message}")
+        self.status = status
+        self.headers = headers or {}
+
+
+# Everything a GitHubClient request can raise besides programming errors.
+GITHUB_REQUEST_ERRORS = (GitHubAPIError, OSError, http.client.HTTPException)
+
+
+@dataclass
+class GitHubResponse:
+    """Decoded response; header names are lower-cased."""
+
+    status: int
+    headers: Dict[str, str] = field(default_factory=dict)
+    data: Any = None
+
+
+def repo_slug_from_url(url: str) -> str | None:
+    """Return "owner/name" for a GitHub https or ssh remote URL."""
+    match = re.search(r"github\.com[:/]+([^/\s]+)/([^/\s]+?)(?:\.git)?/?$", url.strip())
+    if not match:
+        return None
+    return f"{match.group(1)}/{match.group(2)}"
+
+
+def repo_slug_from_git_remotes(cwd: str | None = None) -> str | None:
+    """Resolve "owner/name" from GH_REPO or the git remotes, in the order gh prefers them."""
+    if os.environ.get("GH_REPO"):
+        return os.environ["GH_REPO"]
+    listing = subprocess.run(
+        ["git", "remote"], capture_output=True, text=True, cwd=cwd, check=False
+    ).stdout.split()
+    preferred = [name for name in ("upstream", "github", "origin") if name in listing]
+    for name in preferred + [name for name in listing if name not in preferred]:
+        url = subprocess.run(
+            ["git", "remote", "get-url", name], capture_output=True, text=True, cwd=cwd, check=False
+        ).stdout
+        slug = repo_slug_from_url(url)
+        if slug:
+            return slug
+    return None
+
+
+class GitHubClient:
+    """Thread-safe GitHub REST/GraphQL client over pooled keep-alive connections.
+
+    At most `pool_size` requests are in flight at once, so at most that many
+    connections are ever opened. Pass a shared `scheduler` so several
+    clients and `gh` callers draw on one view of the rate-limit budgets.
+    """
+
+    def __init__(
+        self,
+        token: str | None = None,
+        api_url: str = DEFAULT_API_URL,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        timeout: float = DEFAULT_TIMEOUT,
+        scheduler: RateLimitScheduler | None = None,
+    ) -> None:
+        parsed = urllib.parse.urlsplit(api_url)
+        if parsed.scheme not in {"http", "https"} or not parsed.netloc:
+            raise ValueError(f"Unsupported GitHub API URL: {api_url}")
+        self.token = token
+        self.timeout = timeout
+        self.scheduler = scheduler or RateLimitScheduler()
+        self._scheme = parsed.scheme
+        self._netloc = parsed.netloc
+        self._base_path = parsed.path.rstrip("/")
+        self._pool: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max(1, pool_size))
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections_opened = 0
+
+    @classmethod
+    def from_environment(cls, **kwargs: Any) -> "GitHubClient | None":
+        """Build a client from GH_TOKEN/GITHUB_TOKEN and GITHUB_API_URL, or None without a token."""
+        token = os.environ.get("GH_TOKEN") or os.environ.get("GITHUB_TOKEN")
+        if not token:
+            return None
+        kwargs.setdefault("api_url", os.environ.get("GITHUB_API_URL") or DEFAULT_API_URL)
+        return cls(token=token, **kwargs)
+
+    def __enter__(self) -> "GitHubClient":
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        self.close()
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        with self._lock:
+            self.connections_opened += 1
+        if self._scheme == "https":
+            return http.client.HTTPSConnection(self._netloc, timeout=self.timeout)
+        return http.client.HTTPConnection(self._netloc, timeout=self.timeout)
+
+    def _target(self, path: str, params: Dict[str, Any] | None) -> str:
+        if path.startswith(("http://", "https://")):
+            parsed = urllib.parse.urlsplit(path)
+            if parsed.netloc != self._netloc:
+                raise ValueError(f"Refusing to follow a link to another host: {path}")
+            target = parsed.path + (f"?{parsed.query}" if parsed.query else "")
+        else:
+            target = f"{self._base_path}/{path.lstrip('/')}"
+        if params:
+            separator = "&" if "?" in target else "?"
+            target += separator + urllib.parse.urlencode(params)
+        return target
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        params: Dict[str, Any] | None = None,
+        body: Any = None,
+    ) -> GitHubResponse:
+        """Send one request, reusing a pooled connection, and decode its JSON body."""
+        target = self._target(path, params)
+        headers = {
+            "Accept": "application/vnd.github+json",
+            "User-Agent": "techofourown-batch-tools",
+            "X-GitHub-Api-Version": API_VERSION,
+        }
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+
+        resource = api_resource(target)
+        attempt = 0
+        while True:
+            self.scheduler.acquire(resource)
+            status, reason, response_headers, raw = self._send(method, target, payload, headers)
+            with self._lock:
+                self.requests += 1
+            self.scheduler.observe(response_headers, resource)
+
+            data: Any = None
+            if raw:
+                try:
+                    data = json.loads(raw.decode("utf-8"))
+                except (UnicodeDecodeError, json.JSONDecodeError):
+                    data = raw.decode("utf-8", errors="replace")
+            if status < 400:
+                return GitHubResponse(status, response_headers, data)
+
+            message = data.get("message") if isinstance(data, dict) else str(data or "")
+            delay = self.scheduler.retry_delay(attempt, status, response_headers, message or "")
+            if delay is None:
+                raise GitHubAPIError(status, message or reason, response_headers)
+            self.scheduler.sleep(delay)
+            attempt += 1
+
+    def _send(
+        self, method: str, target: str, payload: bytes | None, headers: Dict[str, str]
+    ) -> Tuple[int, str, Dict[str, str], bytes]:
+        with self._slots:
+            try:
+                connection = self._pool.get_nowait()
+            except queue.Empty:
+                connection = self._new_connection()
+            try:
+                try:
+                    connection.request(method, target, body=payload, headers=headers)
+                    response = connection.getresponse()
+                except STALE_CONNECTION_ERRORS:
+                    connection.close()
+                    connection = self._new_connection()
+                    connection.request(method, target, body=payload, headers=headers)
+                    response = connection.getresponse()
+                raw = response.read()
+            except BaseException:
+                connection.close()
+                raise
+            if response.will_close:
+                connection.close()
+            else:
+                self._pool.put(connection)
+        response_headers = {name.lower(): value for name, value in response.getheaders()}
+        return response.status, response.reason, response_headers, raw
+
+    def get_json(self, path: str, params: Dict[str, Any] | None = None) -> Any:
+        return self.request("GET", path, params).data
+
+    def get_paginated(
+        self,
+        path: str,
+        params: Dict[str, Any] | None = None,
+        item_key: str | None = None,
+    ) -> List[Any]:
+        """Collect every page of a list endpoint by following Link rel="next".
+
+        `item_key` names the list inside object responses such as
+        {"total_count": ..., "check_runs": [...]}.
+        """
+        page_params = {"per_page": DEFAULT_PAGE_SIZE, **(params or {})}
+        items: List[Any] = []
+        next_path: str | None = path
+        while next_path:
+            response = self.request("GET", next_path, page_params)
+            page = response.data
+            if item_key is not None:
+                page = (page or {}).get(item_key) if isinstance(page, dict) else None
+            items.extend(page or [])
+            match = LINK_NEXT.search(response.headers.get("link", ""))
+            next_path = match.group(1) if match else None
+            page_params = None
+        return items
+
+    def graphql(self, query: str, variables: Dict[str, Any] | None = None) -> Dict[str, Any]:
+        """Run a GraphQL query and return the full payload (data and any errors)."""
+        path = "graphql"
+        if self._base_path.endswith("/v3"):
+            # GitHub Enterprise serves REST under /api/v3 and GraphQL at /api/graphql.
+            path = f"{self._scheme}://{self._netloc}{self._base_path[: -len('/v3')]}/graphql"
+        data = self.request("POST", path, body={"query": query, "variables": variables or {}}).data
+        return data if isinstance(data, dict) else {}
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
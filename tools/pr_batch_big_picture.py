@@ -8,40 +8,333 @@ all comments made on the pull requests.
 """
 
 import argparse
+import asyncio
+import atexit
+import codecs
 import hashlib
 import json
+import math
 import os
 import re
-import shlex
 import subprocess
 import sys
+from bisect import bisect_right
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-from functools import lru_cache
+from functools import lru_cache, partial
 from itertools import combinations
 from pathlib import Path
-from typing import Any, Dict, List, Set, Tuple
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Sequence,
+    Set,
+    TextIO,
+    Tuple,
+    TypeVar,
+)
+
+from async_fetch import DEFAULT_FETCH_CONCURRENCY, AsyncFetchEngine
+from batch_cache import DEFAULT_CACHE_MAX_BYTES, DEFAULT_CACHE_TTL, ResultCache
+from check_logs import (
+    DEFAULT_LOG_CONTEXT_LINES,
+    DEFAULT_LOG_HEAD_LINES,
+    DEFAULT_LOG_JOBS,
+    DEFAULT_LOG_TAIL_LINES,
+    FailedLogFetcher,
+    LogWindow,
+    iter_check_log_lines,
+    write_log_excerpt,
+)
+from command_runner import (
+    TIMINGS,
+    argument_batches,
+    command_batches,
+    run_argv,
+    run_batched,
+    stream_command_output,
+)
+from diff_stats import (
+    FileStat,
+    changed_line_counts,
+    collect_diff_stats,
+    empty_diff_line,
+    hot_file_lines,
+    plan_diff_budget,
+    plan_header_lines,
+    stats_block_lines,
+)
+from exclusion_rules import ExclusionRules, build_exclusion_rules, format_exclusions
+from git_object_reader import BINARY_PLACEHOLDER, GitBlob, GitObjectReader, non_blob_placeholder
+from github_client import (
+    GITHUB_REQUEST_ERRORS,
+    GitHubClient,
+    repo_slug_from_git_remotes,
+)
+from rate_limit import DEFAULT_MAX_RETRIES, RateLimitScheduler, gh_resource
+from run_profile import PROFILE
+
+
+# Default number of PRs fetched and rendered concurrently (--jobs).
+DEFAULT_JOBS = 4
+
+T = TypeVar("T")
+R = TypeVar("R")
 
 
 class SelectionParseError(ValueError):
     """Raised when a PR selection string cannot be parsed."""
 
 
-def run_command(cmd: str, check: bool = True, capture_output: bool = True) -> str:
-    """Run a shell command and return the result."""
-    result = subprocess.run(
-        cmd,
-        shell=True,
-        check=check,
-        capture_output=capture_output,
-        text=True,
-    )
+# Optional rate-limit scheduler for gh commands, set by configure_rate_limits.
+_RATE_LIMITS: RateLimitScheduler | None = None
+
+
+def configure_rate_limits(scheduler: RateLimitScheduler | None) -> None:
+    """Pace and retry gh commands through `scheduler` (None runs them once, unpaced)."""
+    global _RATE_LIMITS
+    _RATE_LIMITS = scheduler
+
+
+def run_command(args: Sequence[str], check: bool = True, capture_output: bool = True) -> str:
+    """Run an argv command without a shell and return its stripped stdout.
+
+    With a rate-limit scheduler configured, gh commands wait for their budget
+    and are retried when they fail on a rate limit or server error.
+    """
+    scheduler = _RATE_LIMITS if args and args[0] == "gh" else None
+    attempt = 0
+    while True:
+        if scheduler is not None:
+            scheduler.acquire(gh_resource(args))
+        result = run_argv(args, check=False, capture_output=capture_output)
+        if result.returncode == 0 or scheduler is None or not capture_output:
+            break
+        delay = scheduler.retry_delay_for_gh(attempt, result.stderr)
+        if delay is None:
+            break
+        scheduler.sleep(delay)
+        attempt += 1
+    if check and result.returncode != 0:
+        raise subprocess.CalledProcessError(result.returncode, list(args), result.stdout, result.stderr)
     return result.stdout.strip() if capture_output else ""
 
 
+DIFF_STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def stream_diff_output(
+    commands: List[List[str]],
+    handles: List[TextIO],
+    max_bytes: int = 0,
+    max_file_bytes: int = 0,
+) -> int:
+    """Stream git diff output into every handle without buffering it whole.
+
+    `commands` are argv lists (usually command_batches of one diff) whose
+    output is streamed back to back. Leading and trailing whitespace is
+    dropped to match run_command. When max_file_bytes is set, each file
+    section beyond that size is replaced by a truncation marker; when
+    max_bytes is set, output stops early enough that it stays within that
+    size including the omitted-files marker. Returns the number of diff
+    bytes written (0 means no differences).
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    omitted = (
+        f"\n# [truncated: diff output exceeded {max_bytes} bytes; "
+        "remaining files omitted]\n"
+    )
+    # Room left for diff text once the omitted-files marker is reserved.
+    budget = max_bytes - len(omitted)
+
+    written = 0
+    pending = ""
+    file_bytes = 0
+    file_path = "this file"
+    file_truncated = False
+    at_line_start = True
+
+    def write(text: str) -> None:
+        nonlocal pending, written
+        content = pending + text
+        stripped = content.rstrip()
+        if not written:
+            stripped = stripped.lstrip()
+        pending = content[len(content.rstrip()):]
+        if stripped:
+            for handle in handles:
+                handle.write(stripped)
+            written += len(stripped.encode("utf-8"))
+
+    def emit(text: str) -> bool:
+        """Write `text`, or the omitted-files marker once max_bytes would be exceeded."""
+        if max_bytes and written + len((pending + text).encode("utf-8")) > budget:
+            if budget >= 0:
+                write(omitted)
+            return False
+        write(text)
+        return True
+
+    with stream_command_output(commands) as stream:
+        while True:
+            chunk = stream.readline(DIFF_STREAM_CHUNK_SIZE)
+            if not chunk:
+                emit(decoder.decode(b"", final=True))
+                break
+            starts_line = at_line_start
+            at_line_start = chunk.endswith(b"\n")
+
+            if starts_line and chunk.startswith(b"diff --git "):
+                file_header = decoder.decode(chunk).rstrip("\n")
+                file_path = file_header[len("diff --git "):]
+                file_bytes = 0
+                file_truncated = False
+                if not emit(f"{file_header}\n"):
+                    break
+                continue
+
+            if file_truncated:
+                continue
+
+            file_bytes += len(chunk)
+            if max_file_bytes and file_bytes > max_file_bytes:
+                file_truncated = True
+                if not emit(
+                    f"# [truncated: diff section exceeded {max_file_bytes} bytes "
+                    f"for {file_path}]\n"
+                ):
+                    break
+                continue
+
+            if not emit(decoder.decode(chunk)):
+                break
+
+    return written
+
+
+FILE_COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def copy_file_into(outf: TextIO, source_path: str) -> int:
+    """Append a file's bytes to an open output file without reading it into memory.
+
+    Uses kernel-side copies (copy_file_range, then sendfile) when available and
+    falls back to a chunked read/write loop. Returns the number of bytes copied.
+    """
+    outf.flush()
+    out_fd = outf.fileno()
+    copied = 0
+    with open(source_path, "rb") as source:
+        in_fd = source.fileno()
+        remaining = os.fstat(in_fd).st_size
+
+        for kernel_copy in ("copy_file_range", "sendfile"):
+            copy_func = getattr(os, kernel_copy, None)
+            if copy_func is None or remaining <= 0:
+                continue
+            try:
+                while remaining > 0:
+                    if kernel_copy == "sendfile":
+                        sent = copy_func(out_fd, in_fd, None, remaining)
+                    else:
+                        sent = copy_func(in_fd, out_fd, remaining)
+                    if sent == 0:
+                        break
+                    copied += sent
+                    remaining -= sent
+            except OSError:
+                if copied:
+                    raise
+                continue
+            break
+
+        while True:
+            chunk = os.read(in_fd, FILE_COPY_CHUNK_SIZE)
+            if not chunk:
+                break
+            view = memoryview(chunk)
+            while view:
+                view = view[os.write(out_fd, view):]
+            copied += len(chunk)
+    return copied
+
+
+def resolve_commit_shas(revisions: List[str]) -> List[str]:
+    """Resolve revisions to commit SHAs with one git rev-parse."""
+    return run_command(["git", "rev-parse", *(f"{revision}^{{commit}}" for revision in revisions)]).split()
+
+
+def stream_cached_diff(
+    commands: List[List[str]],
+    cache_parts: List[Any] | None,
+    handles: List[TextIO],
+    max_bytes: int = 0,
+    max_file_bytes: int = 0,
+) -> int:
+    """Stream a diff like stream_diff_output, reusing a cached copy when available.
+
+    `cache_parts` must identify the diff by immutable inputs (commit SHAs and
+    paths); pass None to bypass the cache.
+    """
+    if _RESULT_CACHE is None or cache_parts is None:
+        return stream_diff_output(
+            commands, handles, max_bytes=max_bytes, max_file_bytes=max_file_bytes
+        )
+
+    key = ResultCache.make_key("diff", *cache_parts, max_bytes, max_file_bytes)
+    cached_path = _RESULT_CACHE.get_path(key)
+    if cached_path is not None:
+        for handle in handles:
+            copy_file_into(handle, cached_path)
+        return os.path.getsize(cached_path)
+
+    temp_path = _RESULT_CACHE.new_temp_path()
+    try:
+        with open(temp_path, "w", encoding="utf-8") as temp_file:
+            written = stream_diff_output(
+                commands,
+                handles + [temp_file],
+                max_bytes=max_bytes,
+                max_file_bytes=max_file_bytes,
+            )
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    _RESULT_CACHE.put_file(key, temp_path)
+    return written
+
+
+# Optional pooled GitHub API client, set by configure_github_client. Without
+# one, every API call goes through the gh CLI.
+_GITHUB_CLIENT: GitHubClient | None = None
+
+# Errors a GitHub lookup can raise through either gh or the API client.
+API_ERRORS = (subprocess.CalledProcessError, json.JSONDecodeError, KeyError, *GITHUB_REQUEST_ERRORS)
+
+
+def configure_github_client(client: GitHubClient | None) -> None:
+    """Route GitHub API calls through `client` (None restores the gh CLI)."""
+    global _GITHUB_CLIENT
+    _GITHUB_CLIENT = client
+    get_repo_slug.cache_clear()
+
+
 @lru_cache(maxsize=1)
 def get_repo_slug() -> str:
     """Return the current GitHub repository slug."""
-    repo_info = run_command("gh repo view --json nameWithOwner")
+    if _GITHUB_CLIENT is not None:
+        slug = repo_slug_from_git_remotes()
+        if slug:
+            return slug
+    repo_info = run_command(["gh", "repo", "view", "--json", "nameWithOwner"])
     data = json.loads(repo_info)
     name_with_owner = data.get("nameWithOwner") or ""
     if not name_with_owner:
@@ -49,8 +342,107 @@ def get_repo_slug() -> str:
     return name_with_owner
 
 
-def parse_pr_selection(selection: str) -> List[int]:
-    """Parse a selection string into a sorted list of unique PR numbers."""
+class PRSelection(Sequence[int]):
+    """Sorted, de-duplicated PR numbers stored as merged inclusive ranges.
+
+    Iteration yields numbers in ascending order without materializing them;
+    len(), indexing, membership and ranges() cost O(log ranges) or
+    O(ranges), so a sweep like '1-200000' stays as cheap as '1-3'. Slices
+    return plain lists.
+    """
+
+    __slots__ = ("_starts", "_ends", "_offsets")
+
+    def __init__(self, ranges: Iterable[Tuple[int, int]] = ()) -> None:
+        merged: List[List[int]] = []
+        for start, end in sorted(ranges):
+            if start > end:
+                raise ValueError(f"Invalid PR range {start}-{end}: start must be <= end")
+            if merged and start <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        self._starts = [start for start, _end in merged]
+        self._ends = [end for _start, end in merged]
+        # _offsets[i] is the position of _starts[i] in the expanded sequence.
+        self._offsets = [0]
+        for start, end in merged:
+            self._offsets.append(self._offsets[-1] + end - start + 1)
+
+    @classmethod
+    def from_numbers(cls, numbers: Iterable[int]) -> "PRSelection":
+        """Build a selection from arbitrary numbers (returned as-is if already a selection)."""
+        if isinstance(numbers, PRSelection):
+            return numbers
+        return cls((number, number) for number in set(numbers))
+
+    def ranges(self) -> List[Tuple[int, int]]:
+        return list(zip(self._starts, self._ends))
+
+    def window(self, low: int, high: int) -> "PRSelection":
+        """Return the part of the selection within [low, high], in O(ranges)."""
+        return PRSelection(
+            (max(start, low), min(end, high))
+            for start, end in zip(self._starts, self._ends)
+            if start <= high and end >= low
+        )
+
+    def difference(self, numbers: Iterable[int]) -> "PRSelection":
+        """Return the selection without `numbers`, in O(ranges + len(numbers) log len(numbers))."""
+        removed = sorted({number for number in numbers if number in self})
+        remaining: List[Tuple[int, int]] = []
+        position = 0
+        for start, end in zip(self._starts, self._ends):
+            cursor = start
+            while position < len(removed) and removed[position] <= end:
+                if removed[position] > cursor:
+                    remaining.append((cursor, removed[position] - 1))
+                cursor = removed[position] + 1
+                position += 1
+            if cursor <= end:
+                remaining.append((cursor, end))
+        return PRSelection(remaining)
+
+    def __len__(self) -> int:
+        return self._offsets[-1]
+
+    def __iter__(self) -> Iterator[int]:
+        for start, end in zip(self._starts, self._ends):
+            yield from range(start, end + 1)
+
+    def __reversed__(self) -> Iterator[int]:
+        for start, end in zip(reversed(self._starts), reversed(self._ends)):
+            yield from range(end, start - 1, -1)
+
+    def __contains__(self, number: object) -> bool:
+        if not isinstance(number, int):
+            return False
+        index = bisect_right(self._starts, number) - 1
+        return index >= 0 and number <= self._ends[index]
+
+    def __getitem__(self, index):  # type: ignore[override]
+        if isinstance(index, slice):
+            return [self[position] for position in range(len(self))[index]]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("PR selection index out of range")
+        interval = bisect_right(self._offsets, index) - 1
+        return self._starts[interval] + index - self._offsets[interval]
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, PRSelection):
+            return self.ranges() == other.ranges()
+        if isinstance(other, (list, tuple)):
+            return len(other) == len(self) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"PRSelection({format_pr_selection(self)!r})"
+
+
+def parse_pr_selection(selection: str) -> PRSelection:
+    """Parse a selection string into sorted, unique PR numbers held as merged ranges."""
     original = selection
     trimmed = selection.strip()
     if not trimmed:
@@ -66,7 +458,7 @@ def parse_pr_selection(selection: str) -> List[int]:
             "Expected format like '123-130,135,140-142'."
         )
 
-    selected: Set[int] = set()
+    selected: List[Tuple[int, int]] = []
     for segment in segments:
         cleaned = re.sub(r"\s+", "", segment)
         if not cleaned:
@@ -78,7 +470,7 @@ def parse_pr_selection(selection: str) -> List[int]:
         parts = cleaned.split("-")
         if len(parts) == 1:
             number = _parse_pr_token(parts[0], original)
-            selected.add(number)
+            selected.append((number, number))
         elif len(parts) == 2:
             start = _parse_pr_token(parts[0], original)
             end = _parse_pr_token(parts[1], original)
@@ -87,8 +479,7 @@ def parse_pr_selection(selection: str) -> List[int]:
                     f"Invalid PR range '{segment}' in '{original}': start must be <= end. "
                     "Expected format like '123-130,135,140-142'."
                 )
-            for number in range(start, end + 1):
-                selected.add(number)
+            selected.append((start, end))
         else:
             raise SelectionParseError(
                 f"Invalid PR selection segment '{segment}' in '{original}'. "
@@ -101,7 +492,7 @@ def parse_pr_selection(selection: str) -> List[int]:
             "Expected format like '123-130,135,140-142'."
         )
 
-    return sorted(selected)
+    return PRSelection(selected)
 
 
 def _parse_pr_token(token: str, original: str) -> int:
@@ -123,27 +514,10 @@ def _parse_pr_token(token: str, original: str) -> int:
     return number
 
 
-def format_pr_selection(prs: List[int]) -> str:
-    """Format a sorted list of PR numbers into a canonical selection string."""
-    if not prs:
-        return ""
-
-    normalized = sorted(set(prs))
-    ranges: List[Tuple[int, int]] = []
-    start = normalized[0]
-    prev = normalized[0]
-
-    for number in normalized[1:]:
-        if number == prev + 1:
-            prev = number
-            continue
-        ranges.append((start, prev))
-        start = number
-        prev = number
-    ranges.append((start, prev))
-
+def format_pr_selection(prs: Iterable[int]) -> str:
+    """Format PR numbers (a selection or any iterable) into a canonical selection string."""
     parts: List[str] = []
-    for range_start, range_end in ranges:
+    for range_start, range_end in PRSelection.from_numbers(prs).ranges():
         if range_start == range_end:
             parts.append(str(range_start))
         else:
@@ -151,16 +525,15 @@ def format_pr_selection(prs: List[int]) -> str:
     return ",".join(parts)
 
 
-def build_selection_tag(selected_prs: List[int], selection_canonical: str) -> str:
+def build_selection_tag(selected_prs: Iterable[int], selection_canonical: str) -> str:
     selection_hash = hashlib.sha1(selection_canonical.encode("utf-8")).hexdigest()[:8]
-    if not selected_prs:
+    selection = PRSelection.from_numbers(selected_prs)
+    if not selection:
         return f"0prs-{selection_hash}"
-    min_pr = min(selected_prs)
-    max_pr = max(selected_prs)
-    return f"{min_pr}-{max_pr}-{len(selected_prs)}prs-{selection_hash}"
+    return f"{selection[0]}-{selection[-1]}-{len(selection)}prs-{selection_hash}"
 
 
-def format_pr_list_preview(prs: List[int], max_items: int = 20, edge_items: int = 5) -> str:
+def format_pr_list_preview(prs: Sequence[int], max_items: int = 20, edge_items: int = 5) -> str:
     if len(prs) <= max_items:
         return ", ".join(str(pr) for pr in prs)
     head = ", ".join(str(pr) for pr in prs[:edge_items])
@@ -169,21 +542,22 @@ def format_pr_list_preview(prs: List[int], max_items: int = 20, edge_items: int
 
 
 def selection_header_lines(
-    selection_requested: str, selection_canonical: str, selected_prs: List[int]
+    selection_requested: str, selection_canonical: str, selected_prs: Iterable[int]
 ) -> List[str]:
     lines = [
         f"# PR selection (requested): {selection_requested}",
         f"# PR selection (canonical): {selection_canonical}",
     ]
-    if selected_prs:
-        if len(selected_prs) <= 20:
-            expanded = ", ".join(str(pr) for pr in selected_prs)
-            lines.append(f"# Expanded PRs (count={len(selected_prs)}): {expanded}")
+    selection = PRSelection.from_numbers(selected_prs)
+    if selection:
+        if len(selection) <= 20:
+            expanded = ", ".join(str(pr) for pr in selection)
+            lines.append(f"# Expanded PRs (count={len(selection)}): {expanded}")
         else:
-            preview = format_pr_list_preview(selected_prs)
+            preview = format_pr_list_preview(selection)
             lines.append(
-                f"# Expanded PRs: count={len(selected_prs)} min={min(selected_prs)} "
-                f"max={max(selected_prs)} preview={preview}"
+                f"# Expanded PRs: count={len(selection)} min={selection[0]} "
+                f"max={selection[-1]} preview={preview}"
             )
     else:
         lines.append("# Expanded PRs: count=0")
@@ -192,7 +566,7 @@ def selection_header_lines(
 
 def check_current_branch(expected_branch: str) -> None:
     """Ensure we're starting from the expected base branch."""
-    current_branch = run_command("git branch --show-current")
+    current_branch = run_command(["git", "branch", "--show-current"])
     if current_branch != expected_branch:
         print(
             f"Error: Currently on branch '{current_branch}'. "
@@ -205,25 +579,561 @@ def check_current_branch(expected_branch: str) -> None:
 def checkout_base_branch(base_branch: str) -> None:
     """Checkout the base branch."""
     print(f"Checking out {base_branch} branch...")
-    run_command(f"git checkout {shlex.quote(base_branch)}")
+    run_command(["git", "checkout", base_branch])
     print(f"✓ Checked out {base_branch} branch")
 
 
 def fetch_remote_branches(remote: str) -> None:
     """Fetch latest remote branches."""
     print(f"Fetching remote branches from {remote}...")
-    run_command(f"git fetch {shlex.quote(remote)} --prune --tags")
+    run_command(["git", "fetch", remote, "--prune", "--tags"])
     print("✓ Fetched remote branches")
 
 
+PR_GRAPHQL_CHUNK_SIZE = 10
+PR_GRAPHQL_PAGE_SIZE = 100
+
+PR_GRAPHQL_FIELDS = f"""
+    number
+    title
+    body
+    url
+    state
+    createdAt
+    updatedAt
+    author {{ login }}
+    labels(first: {PR_GRAPHQL_PAGE_SIZE}) {{ nodes {{ name }} }}
+    headRefName
+    headRefOid
+    baseRefName
+    baseRefOid
+    files(first: {PR_GRAPHQL_PAGE_SIZE}) {{
+      pageInfo {{ hasNextPage }}
+      nodes {{ path }}
+    }}
+    comments(first: {PR_GRAPHQL_PAGE_SIZE}) {{
+      pageInfo {{ hasNextPage }}
+      nodes {{ author {{ login }} createdAt body url }}
+    }}
+    reviews(first: {PR_GRAPHQL_PAGE_SIZE}) {{
+      pageInfo {{ hasNextPage }}
+      nodes {{ author {{ login }} submittedAt body state url }}
+    }}
+    reviewThreads(first: {PR_GRAPHQL_PAGE_SIZE}) {{
+      pageInfo {{ hasNextPage }}
+      nodes {{
+        diffSide
+        comments(first: {PR_GRAPHQL_PAGE_SIZE}) {{
+          pageInfo {{ hasNextPage }}
+          nodes {{
+            author {{ login }}
+            createdAt
+            body
+            url
+            path
+            line
+            replyTo {{ databaseId }}
+          }}
+        }}
+      }}
+    }}
+    commits(last: 1) {{
+      nodes {{
+        commit {{
+          statusCheckRollup {{
+            contexts(first: {PR_GRAPHQL_PAGE_SIZE}) {{
+              pageInfo {{ hasNextPage }}
+              nodes {{
+                __typename
+                ... on CheckRun {{
+                  name
+                  status
+                  conclusion
+                  detailsUrl
+                  title
+                  summary
+                  text
+                }}
+                ... on StatusContext {{
+                  context
+                  state
+                  targetUrl
+                }}
+              }}
+            }}
+          }}
+        }}
+      }}
+    }}
+"""
+
+PR_GRAPHQL_STAMP_FIELDS = """
+    updatedAt
+    headRefOid
+"""
+
+PR_LISTING_PAGE_SIZE = 100
+PR_SEARCH_PAGE_SIZE = 100
+# GitHub search stops paginating after this many results.
+PR_SEARCH_RESULT_LIMIT = 1000
+# GraphQL pullRequests states for each --state choice; None lists every state.
+PR_LISTING_STATES: Dict[str, List[str] | None] = {
+    "all": None,
+    "open": ["OPEN"],
+    "closed": ["CLOSED"],
+    "merged": ["MERGED"],
+}
+
+# Optional persistent cache for API and git results, set by configure_result_cache.
+_RESULT_CACHE: ResultCache | None = None
+_RESULT_CACHE_TTL: float = DEFAULT_CACHE_TTL
+
+
+def configure_result_cache(cache: ResultCache | None, ttl: float = DEFAULT_CACHE_TTL) -> None:
+    """Enable (or with None, disable) the persistent result cache."""
+    global _RESULT_CACHE, _RESULT_CACHE_TTL
+    _RESULT_CACHE = cache
+    _RESULT_CACHE_TTL = ttl
+
+
+# Optional asyncio fetch engine for the bulk metadata phase, set by
+# configure_fetch_engine. Without one, prefetch chunks run one at a time.
+_FETCH_ENGINE: AsyncFetchEngine | None = None
+
+
+def configure_fetch_engine(engine: AsyncFetchEngine | None) -> None:
+    """Run bulk metadata fetches on `engine` (None runs them sequentially)."""
+    global _FETCH_ENGINE
+    _FETCH_ENGINE = engine
+
+
+# Prefetched PR payloads keyed by PR number. A value of None records a number
+# that GraphQL could not resolve to a pull request.
+_PREFETCHED_PRS: Dict[int, Dict[str, Any] | None] = {}
+
+
+def clear_prefetched_pr_data() -> None:
+    """Forget all PR metadata gathered by prefetch_pr_metadata."""
+    _PREFETCHED_PRS.clear()
+
+
+def build_pr_batch_query(pr_numbers: List[int], fields: str = PR_GRAPHQL_FIELDS) -> str:
+    """Build one aliased GraphQL query covering every PR in the chunk."""
+    aliases = "\n".join(
+        f"  pr{number}: pullRequest(number: {number}) {{{fields}  }}"
+        for number in pr_numbers
+    )
+    return (
+        "query($owner: String!, $name: String!) {\n"
+        "  repository(owner: $owner, name: $name) {\n"
+        f"{aliases}\n"
+        "  }\n"
+        "}\n"
+    )
+
+
+def _repository_from_payload(payload: Any) -> Dict[str, Any] | None:
+    repository = ((payload or {}).get("data") or {}).get("repository")
+    return repository if isinstance(repository, dict) else None
+
+
+def _run_graphql(query: str, variables: Dict[str, str]) -> Dict[str, Any] | None:
+    """Run a GraphQL query with string variables, returning its payload or None on failure."""
+    if _GITHUB_CLIENT is not None:
+        try:
+            return _GITHUB_CLIENT.graphql(query, variables)
+        except GITHUB_REQUEST_ERRORS:
+            return None
+
+    fields = [arg for key, value in variables.items() for arg in ("-f", f"{key}={value}")]
+    output = run_command(["gh", "api", "graphql", "-f", f"query={query}", *fields], check=False)
+    try:
+        return json.loads(output) if output else None
+    except json.JSONDecodeError:
+        return None
+
+
+def _run_repository_query(query: str, owner: str, name: str) -> Dict[str, Any] | None:
+    """Run a repository GraphQL query, returning the repository object or None on failure."""
+    return _repository_from_payload(_run_graphql(query, {"owner": owner, "name": name}))
+
+
+async def _run_repository_query_async(
+    engine: AsyncFetchEngine, query: str, owner: str, name: str
+) -> Dict[str, Any] | None:
+    """Async counterpart of _run_repository_query, run on a fetch engine."""
+    if _GITHUB_CLIENT is not None:
+        try:
+            return _repository_from_payload(
+                await engine.call(_GITHUB_CLIENT.graphql, query, {"owner": owner, "name": name})
+            )
+        except GITHUB_REQUEST_ERRORS:
+            return None
+
+    output = await engine.gh(
+        ["api", "graphql", "-f", f"query={query}", "-f", f"owner={owner}", "-f", f"name={name}"],
+        check=False,
+    )
+    try:
+        payload = json.loads(output) if output else {}
+    except json.JSONDecodeError:
+        payload = {}
+    return _repository_from_payload(payload)
+
+
+async def _prefetch_chunk(
+    chunk: List[int],
+    slug: str,
+    run_query: Callable[[str], Awaitable[Dict[str, Any] | None]],
+) -> int:
+    """Prefetch one chunk of PRs into _PREFETCHED_PRS, returning how many resolved."""
+    resolved = 0
+    to_fetch = chunk
+    cache_keys: Dict[int, str] = {}
+
+    if _RESULT_CACHE is not None:
+        stamps = await run_query(build_pr_batch_query(chunk, PR_GRAPHQL_STAMP_FIELDS))
+        if stamps is not None:
+            to_fetch = []
+            for number in chunk:
+                stamp = stamps.get(f"pr{number}")
+                if not isinstance(stamp, dict):
+                    _PREFETCHED_PRS[number] = None
+                    continue
+                # The field list is part of the key so a new field is never
+                # read from payloads cached before it was queried.
+                key = ResultCache.make_key(
+                    "pr-node",
+                    slug,
+                    number,
+                    stamp.get("updatedAt"),
+                    stamp.get("headRefOid"),
+                    PR_GRAPHQL_FIELDS,
+                )
+                cached = _RESULT_CACHE.get_json(key)
+                if isinstance(cached, dict):
+                    _PREFETCHED_PRS[number] = cached
+                    resolved += 1
+                else:
+                    cache_keys[number] = key
+                    to_fetch.append(number)
+
+    if not to_fetch:
+        return resolved
+
+    repository = await run_query(build_pr_batch_query(to_fetch))
+    if repository is None:
+        print(
+            f"Warning: Bulk metadata fetch failed for PRs {format_pr_selection(to_fetch)}; "
+            "falling back to per-PR lookups"
+        )
+        return resolved
+
+    for number in to_fetch:
+        node = repository.get(f"pr{number}")
+        _PREFETCHED_PRS[number] = node if isinstance(node, dict) else None
+        if isinstance(node, dict):
+            resolved += 1
+            if _RESULT_CACHE is not None and number in cache_keys:
+                _RESULT_CACHE.put_json(cache_keys[number], node, ttl=_RESULT_CACHE_TTL)
+    return resolved
+
+
+def build_pr_listing_query(
+    after: str | None = None,
+    state: str = "all",
+    base: str | None = None,
+    labels: Sequence[str] = (),
+) -> str:
+    """Build one page of a newest-first pull request listing with server-side filters."""
+    arguments = [
+        f"first: {PR_LISTING_PAGE_SIZE}",
+        "orderBy: {field: CREATED_AT, direction: DESC}",
+    ]
+    if after:
+        arguments.append(f"after: {json.dumps(after)}")
+    states = PR_LISTING_STATES[state]
+    if states:
+        arguments.append(f"states: [{', '.join(states)}]")
+    if base:
+        arguments.append(f"baseRefName: {json.dumps(base)}")
+    if labels:
+        arguments.append(f"labels: {json.dumps(list(labels))}")
+    return (
+        "query($owner: String!, $name: String!) {\n"
+        "  repository(owner: $owner, name: $name) {\n"
+        f"    pullRequests({', '.join(arguments)}) {{\n"
+        "      pageInfo { hasNextPage endCursor }\n"
+        "      nodes { number author { login } }\n"
+        "    }\n"
+        "  }\n"
+        "}\n"
+    )
+
+
+def list_selection_prs(
+    selection: PRSelection,
+    state: str = "all",
+    base: str | None = None,
+    author: str | None = None,
+    labels: Sequence[str] = (),
+    max_pages: int | None = None,
+) -> Tuple[PRSelection, int] | None:
+    """List which selected numbers are pull requests matching the filters.
+
+    Pull requests are paged newest first, and numbers follow creation
+    order, so paging stops at the first PR below the selection. With
+    max_pages, paging also stops as soon as the numbers covered per page so
+    far project that reaching the bottom of the selection would take more
+    than max_pages pages, so a window far below the newest PR costs one
+    page instead of max_pages. Returns (matching PRs, floor): every
+    selected number >= floor was checked, and the numbers below it are
+    unchecked. Returns None when the listing fails.
+    """
+    if not selection:
+        return PRSelection(), 1
+
+    slug = get_repo_slug()
+    owner, name = slug.split("/", 1)
+    low, high = selection[0], selection[-1]
+    matching: List[int] = []
+    floor = high + 1
+    # Highest and lowest numbers listed so far, for the cost projection.
+    top, bottom = 0, None
+    cursor: str | None = None
+    pages = 0
+    while max_pages is None or pages < max_pages:
+        repository = _run_repository_query(
+            build_pr_listing_query(cursor, state, base, labels), owner, name
+        )
+        connection = (repository or {}).get("pullRequests")
+        if not isinstance(connection, dict):
+            return None
+        pages += 1
+        for node in connection.get("nodes") or []:
+            number = (node or {}).get("number")
+            if not isinstance(number, int):
+                continue
+            floor = min(floor, number)
+            top = max(top, number)
+            bottom = number if bottom is None else min(bottom, number)
+            login = ((node.get("author") or {}).get("login")) or ""
+            if number in selection and (author is None or login == author):
+                matching.append(number)
+        page_info = connection.get("pageInfo") or {}
+        if not page_info.get("hasNextPage"):
+            return PRSelection.from_numbers(matching), 1
+        if floor <= low:
+            return PRSelection.from_numbers(matching), floor
+        if max_pages is not None and bottom is not None:
+            numbers_per_page = (top - bottom + 1) / pages
+            if pages + math.ceil((bottom - low) / numbers_per_page) > max_pages:
+                break
+        cursor = page_info.get("endCursor")
+    return PRSelection.from_numbers(matching), floor
+
+
+def prefilter_pr_selection(
+    selection: PRSelection,
+    state: str = "all",
+    base: str | None = None,
+    author: str | None = None,
+    labels: Sequence[str] = (),
+    max_pages: int | None = None,
+) -> Tuple[PRSelection, PRSelection] | None:
+    """Drop selected numbers that are not pull requests matching the filters.
+
+    Returns (candidates, dropped). Numbers below the listing's floor (when
+    paging stopped early) stay candidates for the per-PR lookups to resolve,
+    and for pr_matches_filters to check; dropped numbers are printed.
+    Returns None when the listing fails.
+    """
+    try:
+        listed = list_selection_prs(selection, state, base, author, labels, max_pages)
+    except API_ERRORS as exc:
+        print(f"Warning: PR listing failed ({exc})")
+        return None
+    if listed is None:
+        print("Warning: PR listing failed")
+        return None
+
+    matching, floor = listed
+    unchecked = selection.window(1, floor - 1)
+    candidates = PRSelection(matching.ranges() + unchecked.ranges())
+    dropped = selection.window(floor, selection[-1] if selection else 0).difference(matching)
+    print(
+        f"✓ Listing found {len(matching)} matching PR(s) among {len(selection) - len(unchecked)} "
+        f"selected number(s); skipping {len(dropped)}"
+    )
+    if dropped:
+        filtered = state != "all" or base or author or labels
+        reason = "not pull requests or not matching the filters" if filtered else "not pull requests"
+        print(f"  Skipped ({reason}): {format_pr_selection(dropped)}")
+    if unchecked:
+        print(
+            f"  Numbers below #{floor} would take more than {max_pages} listing page(s) "
+            "and are looked up individually"
+        )
+    return candidates, dropped
+
+
+def build_pr_search_query(after: str | None = None) -> str:
+    """Build one page of a GraphQL issue search that returns pull request numbers."""
+    after_argument = f", after: {json.dumps(after)}" if after else ""
+    return (
+        "query($q: String!) {\n"
+        f"  search(query: $q, type: ISSUE, first: {PR_SEARCH_PAGE_SIZE}{after_argument}) {{\n"
+        "    issueCount\n"
+        "    pageInfo { hasNextPage endCursor }\n"
+        "    nodes { ... on PullRequest { number } }\n"
+        "  }\n"
+        "}\n"
+    )
+
+
+def search_pr_numbers(query: str) -> PRSelection:
+    """Resolve a GitHub search query to the pull request numbers it matches.
+
+    The query is scoped to this repository and to pull requests, so
+    `is:merged base:main label:release` is enough. One search call returns
+    up to PR_SEARCH_PAGE_SIZE results; GitHub serves at most
+    PR_SEARCH_RESULT_LIMIT in total, and a warning is printed when the query
+    matches more. Raises ValueError when the search fails.
+    """
+    terms = query.split()
+    if not any(term.startswith("repo:") for term in terms):
+        terms.insert(0, f"repo:{get_repo_slug()}")
+    if not any(term in ("is:pr", "type:pr") for term in terms):
+        terms.insert(1, "is:pr")
+    search = " ".join(terms)
+
+    numbers: List[int] = []
+    cursor: str | None = None
+    while True:
+        payload = _run_graphql(build_pr_search_query(cursor), {"q": search})
+        connection = ((payload or {}).get("data") or {}).get("search")
+        if not isinstance(connection, dict):
+            raise ValueError(f"PR search failed for '{search}'")
+        numbers.extend(
+            node["number"]
+            for node in connection.get("nodes") or []
+            if isinstance((node or {}).get("number"), int)
+        )
+        page_info = connection.get("pageInfo") or {}
+        if not page_info.get("hasNextPage") or not page_info.get("endCursor"):
+            break
+        cursor = page_info["endCursor"]
+
+    total = connection.get("issueCount")
+    if isinstance(total, int) and total > len(numbers):
+        print(
+            f"Warning: Search matched {total} PRs but GitHub returns at most "
+            f"{PR_SEARCH_RESULT_LIMIT}; narrow the query (e.g. with created: or updated: ranges)"
+        )
+    return PRSelection.from_numbers(numbers)
+
+
+def prefetch_pr_metadata(
+    pr_numbers: Sequence[int], chunk_size: int = PR_GRAPHQL_CHUNK_SIZE
+) -> int:
+    """Fetch metadata, files, comments and checks for many PRs in bulk.
+
+    Results are stored for get_pr_info, get_pr_changed_files, get_pr_comments
+    and get_pr_checks. Chunks that fail entirely are left out so those
+    functions fall back to their per-PR gh calls. With a result cache
+    configured, a light query first reads each PR's updatedAt and head SHA,
+    and only PRs without a fresh cached payload for that stamp are fetched in
+    full. With a fetch engine configured, all chunks are in flight at once.
+    Returns the number of PRs resolved.
+    """
+    if not pr_numbers or chunk_size <= 0:
+        return 0
+
+    slug = get_repo_slug()
+    owner, name = slug.split("/", 1)
+    chunks = [pr_numbers[start : start + chunk_size] for start in range(0, len(pr_numbers), chunk_size)]
+
+    results: List[int | BaseException]
+    engine = _FETCH_ENGINE
+    if engine is None:
+
+        async def run_query(query: str) -> Dict[str, Any] | None:
+            return _run_repository_query(query, owner, name)
+
+        async def run_sequentially() -> List[int | BaseException]:
+            return [await _prefetch_chunk(chunk, slug, run_query) for chunk in chunks]
+
+        results = asyncio.run(run_sequentially())
+    else:
+
+        async def run_query(query: str) -> Dict[str, Any] | None:
+            return await _run_repository_query_async(engine, query, owner, name)
+
+        results = engine.gather([partial(_prefetch_chunk, chunk, slug, run_query) for chunk in chunks])
+
+    resolved = 0
+    for chunk, result in zip(chunks, results):
+        if isinstance(result, BaseException):
+            print(
+                f"Warning: Bulk metadata fetch failed for PRs {format_pr_selection(chunk)} "
+                f"({result}); falling back to per-PR lookups"
+            )
+            continue
+        resolved += result
+
+    print(f"✓ Prefetched metadata for {resolved} of {len(pr_numbers)} PR(s)")
+    return resolved
+
+
+def _prefetched_pr(pr_number: int) -> Dict[str, Any] | None:
+    """Return the prefetched payload for a PR, raising KeyError if it is known missing."""
+    if pr_number not in _PREFETCHED_PRS:
+        return None
+    node = _PREFETCHED_PRS[pr_number]
+    if node is None:
+        raise KeyError(f"PR #{pr_number} could not be resolved as a pull request")
+    return node
+
+
+def _connection_nodes(connection: Dict[str, Any] | None) -> List[Dict[str, Any]] | None:
+    """Return connection nodes, or None when the connection was truncated."""
+    if not isinstance(connection, dict):
+        return []
+    if (connection.get("pageInfo") or {}).get("hasNextPage"):
+        return None
+    return [node for node in connection.get("nodes") or [] if isinstance(node, dict)]
+
+
 def get_pr_info(pr_number: int) -> Dict[str, str]:
     """Get branch name, title, and metadata for a specific PR."""
-    pr_info = run_command(
-        "gh pr view "
-        f"{pr_number} "
-        "--json headRefName,title,baseRefName,body,author,createdAt,url"
-    )
-    data = json.loads(pr_info)
+    prefetched = _prefetched_pr(pr_number)
+    if prefetched is not None:
+        data = prefetched
+    elif _GITHUB_CLIENT is not None:
+        pull = _GITHUB_CLIENT.get_json(f"repos/{get_repo_slug()}/pulls/{pr_number}")
+        data = {
+            "headRefName": pull["head"]["ref"],
+            "title": pull["title"],
+            "baseRefName": pull["base"]["ref"],
+            "body": pull.get("body"),
+            "author": pull.get("user"),
+            "createdAt": pull.get("created_at"),
+            "url": pull.get("html_url"),
+            "state": "MERGED" if pull.get("merged_at") else (pull.get("state") or "").upper(),
+            "labels": pull.get("labels"),
+        }
+    else:
+        pr_info = run_command(
+            [
+                "gh",
+                "pr",
+                "view",
+                str(pr_number),
+                "--json",
+                "headRefName,title,baseRefName,body,author,createdAt,url,state,labels",
+            ]
+        )
+        data = json.loads(pr_info)
 
     return {
         "number": pr_number,
@@ -234,12 +1144,54 @@ def get_pr_info(pr_number: int) -> Dict[str, str]:
         "author": (data.get("author") or {}).get("login") or "unknown",
         "createdAt": data.get("createdAt") or "",
         "url": data.get("url") or "",
+        "state": data.get("state") or "",
+        "labels": _label_names(data.get("labels")),
     }
 
 
+def _label_names(labels: Any) -> List[str]:
+    """Return label names from a GraphQL connection or a REST/gh label list."""
+    nodes = labels.get("nodes") if isinstance(labels, dict) else labels
+    return [
+        node["name"] for node in nodes or [] if isinstance(node, dict) and node.get("name")
+    ]
+
+
+def pr_matches_filters(
+    pr_info: Mapping[str, Any],
+    state: str = "all",
+    base: str | None = None,
+    author: str | None = None,
+    labels: Sequence[str] = (),
+) -> bool:
+    """Apply --state and --filter-* to looked-up PR metadata, as the listing does server-side."""
+    states = PR_LISTING_STATES[state]
+    if states and pr_info.get("state") not in states:
+        return False
+    if base is not None and pr_info.get("base") != base:
+        return False
+    if author is not None and pr_info.get("author") != author:
+        return False
+    return not labels or bool(set(labels) & set(pr_info.get("labels") or ()))
+
+
 def get_pr_changed_files(pr_number: int) -> List[str]:
     """Get list of changed files for a specific PR."""
-    files_json = run_command(f"gh pr view {pr_number} --json files")
+    prefetched = _prefetched_pr(pr_number)
+    if prefetched is not None:
+        nodes = _connection_nodes(prefetched.get("files"))
+        if nodes is not None:
+            return [node["path"] for node in nodes]
+
+    if _GITHUB_CLIENT is not None:
+        return [
+            file_info["filename"]
+            for file_info in _GITHUB_CLIENT.get_paginated(
+                f"repos/{get_repo_slug()}/pulls/{pr_number}/files"
+            )
+        ]
+
+    files_json = run_command(["gh", "pr", "view", str(pr_number), "--json", "files"])
     data = json.loads(files_json)
     return [file_info["path"] for file_info in data.get("files", [])]
 
@@ -256,6 +1208,7 @@ def normalize_comment_entry(comment: Dict[str, Any], comment_type: str) -> Dict[
             comment.get("createdAt")
             or comment.get("submittedAt")
             or comment.get("created_at")
+            or comment.get("submitted_at")
             or ""
         ),
         "url": comment.get("html_url") or comment.get("url") or "",
@@ -285,23 +1238,75 @@ def should_include_review_entry(review: Dict[str, Any]) -> bool:
     return review_state in {"APPROVED", "CHANGES_REQUESTED"}
 
 
+def _review_thread_comments(
+    connection: Dict[str, Any] | None,
+) -> List[Dict[str, Any]] | None:
+    """Flatten GraphQL review threads into REST-shaped review comments."""
+    threads = _connection_nodes(connection)
+    if threads is None:
+        return None
+
+    review_comments: List[Dict[str, Any]] = []
+    for thread in threads:
+        comments = _connection_nodes(thread.get("comments"))
+        if comments is None:
+            return None
+        for comment in comments:
+            reply_to = comment.get("replyTo") or {}
+            review_comments.append(
+                {
+                    "user": comment.get("author") or {},
+                    "created_at": comment.get("createdAt") or "",
+                    "body": comment.get("body") or "",
+                    "html_url": comment.get("url") or "",
+                    "path": comment.get("path") or "",
+                    "line": comment.get("line"),
+                    "side": thread.get("diffSide") or "",
+                    "in_reply_to_id": reply_to.get("databaseId"),
+                }
+            )
+    return review_comments
+
+
 def get_pr_comments(pr_number: int) -> List[Dict[str, str]]:
     """Get issue comments, review summaries, inline review comments, and replies."""
-    comments_json = run_command(f"gh pr view {pr_number} --json comments,reviews")
-    data = json.loads(comments_json)
+    prefetched = _prefetched_pr(pr_number)
+    issue_comments: List[Dict[str, Any]] | None = None
+    reviews: List[Dict[str, Any]] | None = None
+    review_comments: List[Dict[str, Any]] | None = None
+    if prefetched is not None:
+        issue_comments = _connection_nodes(prefetched.get("comments"))
+        reviews = _connection_nodes(prefetched.get("reviews"))
+        review_comments = _review_thread_comments(prefetched.get("reviewThreads"))
+
+    if (issue_comments is None or reviews is None) and _GITHUB_CLIENT is not None:
+        slug = get_repo_slug()
+        issue_comments = _GITHUB_CLIENT.get_paginated(f"repos/{slug}/issues/{pr_number}/comments")
+        reviews = _GITHUB_CLIENT.get_paginated(f"repos/{slug}/pulls/{pr_number}/reviews")
+    elif issue_comments is None or reviews is None:
+        comments_json = run_command(["gh", "pr", "view", str(pr_number), "--json", "comments,reviews"])
+        data = json.loads(comments_json)
+        issue_comments = data.get("comments", [])
+        reviews = data.get("reviews", [])
 
     normalized: List[Dict[str, str]] = []
-    for comment in data.get("comments", []):
+    for comment in issue_comments:
         normalized.append(normalize_comment_entry(comment, "issue"))
 
-    for review in data.get("reviews", []):
+    for review in reviews:
         if should_include_review_entry(review):
             normalized.append(normalize_comment_entry(review, "review"))
 
-    review_comments_json = run_command(
-        f"gh api repos/{shlex.quote(get_repo_slug())}/pulls/{pr_number}/comments --paginate"
-    )
-    for review_comment in json.loads(review_comments_json):
+    if review_comments is None and _GITHUB_CLIENT is not None:
+        review_comments = _GITHUB_CLIENT.get_paginated(
+            f"repos/{get_repo_slug()}/pulls/{pr_number}/comments"
+        )
+    elif review_comments is None:
+        review_comments_json = run_command(
+            ["gh", "api", f"repos/{get_repo_slug()}/pulls/{pr_number}/comments", "--paginate"]
+        )
+        review_comments = json.loads(review_comments_json)
+    for review_comment in review_comments:
         comment_type = (
             "review-reply"
             if review_comment.get("in_reply_to_id") is not None
@@ -313,15 +1318,68 @@ def get_pr_comments(pr_number: int) -> List[Dict[str, str]]:
     return normalized
 
 
+def _prefetched_check_rollup(prefetched: Dict[str, Any]) -> List[Dict[str, Any]] | None:
+    """Return the head commit's check rollup contexts from a prefetched PR."""
+    commits = (prefetched.get("commits") or {}).get("nodes") or []
+    if not commits:
+        return []
+    rollup = ((commits[-1] or {}).get("commit") or {}).get("statusCheckRollup")
+    if not rollup:
+        return []
+    return _connection_nodes(rollup.get("contexts"))
+
+
+def _rest_check_rollup(pr_number: int) -> List[Dict[str, Any]]:
+    """Build statusCheckRollup-shaped contexts for a PR head from the REST API."""
+    assert _GITHUB_CLIENT is not None
+    slug = get_repo_slug()
+    head_sha = _GITHUB_CLIENT.get_json(f"repos/{slug}/pulls/{pr_number}")["head"]["sha"]
+    rollup: List[Dict[str, Any]] = []
+    for run in _GITHUB_CLIENT.get_paginated(
+        f"repos/{slug}/commits/{head_sha}/check-runs", item_key="check_runs"
+    ):
+        output = run.get("output") or {}
+        rollup.append(
+            {
+                "name": run.get("name"),
+                "status": (run.get("status") or "").upper(),
+                "conclusion": (run.get("conclusion") or "").upper(),
+                "detailsUrl": run.get("details_url") or run.get("html_url"),
+                "title": output.get("title"),
+                "summary": output.get("summary"),
+            }
+        )
+    for status in _GITHUB_CLIENT.get_paginated(
+        f"repos/{slug}/commits/{head_sha}/status", item_key="statuses"
+    ):
+        rollup.append(
+            {
+                "context": status.get("context"),
+                "state": (status.get("state") or "").upper(),
+                "targetUrl": status.get("target_url"),
+            }
+        )
+    return rollup
+
+
 def get_pr_checks(pr_number: int) -> List[Dict[str, str]]:
     """Get status check results for a specific PR."""
-    checks_json = run_command(
-        f"gh pr view {pr_number} --json statusCheckRollup"
-    )
-    data = json.loads(checks_json)
+    prefetched = _prefetched_pr(pr_number)
+    rollup: List[Dict[str, Any]] | None = None
+    if prefetched is not None:
+        rollup = _prefetched_check_rollup(prefetched)
+
+    if rollup is None and _GITHUB_CLIENT is not None:
+        rollup = _rest_check_rollup(pr_number)
+    elif rollup is None:
+        checks_json = run_command(
+            ["gh", "pr", "view", str(pr_number), "--json", "statusCheckRollup"]
+        )
+        data = json.loads(checks_json)
+        rollup = data.get("statusCheckRollup") or []
 
     checks: List[Dict[str, str]] = []
-    for check in data.get("statusCheckRollup") or []:
+    for check in rollup:
         checks.append(
             {
                 "name": check.get("name")
@@ -345,33 +1403,60 @@ def get_pr_checks(pr_number: int) -> List[Dict[str, str]]:
     return checks
 
 
-def extract_actions_run_id(details_url: str | None) -> str | None:
-    """Extract the GitHub Actions run ID from a details URL."""
-    if not details_url:
-        return None
-    match = re.search(r"/actions/runs/(\d+)", details_url)
-    return match.group(1) if match else None
+# Shared failed-log fetcher, set by configure_log_fetcher. Without one, a
+# default fetcher is created on first use and closed when the process exits.
+_LOG_FETCHER: FailedLogFetcher | None = None
+_DEFAULT_LOG_FETCHER: FailedLogFetcher | None = None
+
+
+def configure_log_fetcher(fetcher: FailedLogFetcher | None) -> None:
+    """Use `fetcher` for failed-check logs (None restores the default)."""
+    global _LOG_FETCHER
+    _LOG_FETCHER = fetcher
+
+
+def _log_fetcher() -> FailedLogFetcher:
+    global _DEFAULT_LOG_FETCHER
+    if _LOG_FETCHER is not None:
+        return _LOG_FETCHER
+    if _DEFAULT_LOG_FETCHER is None:
+        _DEFAULT_LOG_FETCHER = FailedLogFetcher(cache=_RESULT_CACHE)
+    # Follow configure_result_cache changes made after the first use.
+    _DEFAULT_LOG_FETCHER.cache = _RESULT_CACHE
+    return _DEFAULT_LOG_FETCHER
+
+
+@atexit.register
+def _close_default_log_fetcher() -> None:
+    """Remove the default fetcher's log directory and stop its workers."""
+    global _DEFAULT_LOG_FETCHER
+    if _DEFAULT_LOG_FETCHER is not None:
+        _DEFAULT_LOG_FETCHER.close()
+        _DEFAULT_LOG_FETCHER = None
 
 
 def get_failed_check_logs(check: Dict[str, str]) -> str | None:
-    """Retrieve raw logs for failed GitHub Actions checks."""
-    conclusion = (check.get("conclusion") or "").lower()
-    if conclusion in {"success", "neutral", "skipped"}:
-        return None
+    """Retrieve the failed-job logs for a failed GitHub Actions check."""
+    return _log_fetcher().get_log(check)
 
-    run_id = extract_actions_run_id(check.get("detailsUrl") or "")
-    if not run_id:
-        return None
 
-    try:
-        print(
-            f"Fetching logs for failed check '{check.get('name', 'unknown check')}' "
-            f"(run {run_id})"
-        )
-        return run_command(f"gh run view {shlex.quote(run_id)} --log")
-    except subprocess.CalledProcessError as exc:
-        print(f"Warning: Failed to fetch logs for run {run_id}: {exc}")
-        return None
+def attach_failed_check_logs(checks: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Return copies of `checks` pointing at their failed-job logs on disk.
+
+    Every failed run is requested up front, so runs download in parallel and
+    checks from the same run share one download. Logs are not loaded; the
+    "logPath", "logJob" and "logDigest" keys let the writers stream them.
+    """
+    fetcher = _log_fetcher()
+    fetcher.prefetch(checks)
+    checks_with_logs: List[Dict[str, str]] = []
+    for check in checks:
+        check_copy = dict(check)
+        source = fetcher.log_source(check_copy)
+        if source:
+            check_copy.update(source)
+        checks_with_logs.append(check_copy)
+    return checks_with_logs
 
 
 def report_missing_files_on_checked_out_branch(files: List[str]) -> List[str]:
@@ -392,24 +1477,58 @@ def report_missing_files_on_checked_out_branch(files: List[str]) -> List[str]:
     return missing_files
 
 
-def filter_excluded_files(files: List[str]) -> Tuple[List[str], List[str]]:
-    """Filter files that should be excluded from documents."""
-    excluded_files: List[str] = []
-    included_files: List[str] = []
+_EXCLUSION_RULES = ExclusionRules()
+
+
+def configure_exclusion_rules(rules: ExclusionRules) -> None:
+    global _EXCLUSION_RULES
+    _EXCLUSION_RULES = rules
 
-    for file_path in files:
-        if Path(file_path).name == "package-lock.json":
-            excluded_files.append(file_path)
-        else:
-            included_files.append(file_path)
+
+def filter_excluded_files(
+    files: List[str],
+    diff_stats: Mapping[str, FileStat] | None = None,
+    revision: str | None = None,
+) -> Tuple[List[str], List[str]]:
+    """Filter files that should be excluded from documents.
+
+    `diff_stats` from the pre-pass enables the changed-line threshold;
+    `revision` selects whose gitattributes apply (default: the working tree).
+    """
+    changed_lines = changed_line_counts(diff_stats) if diff_stats else None
+    reasons = _EXCLUSION_RULES.classify(files, changed_lines, revision)
+    excluded_files = [file_path for file_path in files if file_path in reasons]
+    included_files = [file_path for file_path in files if file_path not in reasons]
 
     if excluded_files:
-        print(f"Skipping {len(excluded_files)} excluded file(s): {', '.join(excluded_files)}")
+        print(
+            f"Skipping {len(excluded_files)} excluded file(s): "
+            f"{format_exclusions(reasons, files)}"
+        )
 
     return included_files, excluded_files
 
 
-def checkout_pr_branch(pr_info: Dict[str, str], remote: str) -> str:
+def collect_pr_diff_stats(
+    base_branch: str, local_branch: str, files: List[str]
+) -> Dict[str, FileStat]:
+    """Run the numstat/raw pre-pass for a PR's three-dot diff; empty on failure."""
+    try:
+        return collect_diff_stats(
+            [
+                "git", "diff", "--raw", "--numstat", "-z", "--no-renames", "--no-abbrev",
+                f"{base_branch}...{local_branch}",
+            ],
+            files,
+        )
+    except subprocess.CalledProcessError as exc:
+        print(f"Warning: Could not collect diff stats for {local_branch}: {exc}")
+        return {}
+
+
+def checkout_pr_branch(
+    pr_info: Dict[str, str], remote: str, pinned_heads: Set[int] | None = None
+) -> str:
     """Checkout the requested PR by PR ref, not by an existing local branch name."""
     branch_name = pr_info["branch"]
     pr_number = pr_info["number"]
@@ -419,11 +1538,14 @@ def checkout_pr_branch(pr_info: Dict[str, str], remote: str) -> str:
         f"(head ref: {branch_name})..."
     )
 
+    if pinned_heads and pr_number in pinned_heads:
+        run_command(["git", "checkout", "-B", fallback_branch, pr_head_ref(pr_number)])
+        print(f"✓ Checked out prefetched PR ref as {fallback_branch}")
+        return fallback_branch
+
     try:
-        run_command(f"git fetch {shlex.quote(remote)} pull/{pr_number}/head")
-        run_command(
-            f"git checkout -B {shlex.quote(fallback_branch)} FETCH_HEAD"
-        )
+        run_command(["git", "fetch", remote, f"pull/{pr_number}/head"])
+        run_command(["git", "checkout", "-B", fallback_branch, "FETCH_HEAD"])
         print(f"✓ Checked out PR ref as {fallback_branch}")
         return fallback_branch
     except subprocess.CalledProcessError:
@@ -434,11 +1556,8 @@ def checkout_pr_branch(pr_info: Dict[str, str], remote: str) -> str:
 
     remote_branch = f"{remote}/{branch_name}"
     try:
-        run_command(f"git fetch {shlex.quote(remote)} {shlex.quote(branch_name)}")
-        run_command(
-            f"git checkout -B {shlex.quote(fallback_branch)} "
-            f"{shlex.quote(remote_branch)}"
-        )
+        run_command(["git", "fetch", remote, branch_name])
+        run_command(["git", "checkout", "-B", fallback_branch, remote_branch])
         print(f"✓ Checked out remote branch as {fallback_branch}")
         return fallback_branch
     except subprocess.CalledProcessError as exc:
@@ -446,6 +1565,152 @@ def checkout_pr_branch(pr_info: Dict[str, str], remote: str) -> str:
         raise exc
 
 
+PR_REF_NAMESPACE = "refs/pr-batch"
+
+
+def pr_head_ref(pr_number: int) -> str:
+    """Return the dedicated local ref that pins a PR head without a checkout."""
+    return f"{PR_REF_NAMESPACE}/{pr_number}"
+
+
+def pr_head_refspec(pr_number: int) -> str:
+    """Return the fetch refspec that pins a PR head into the pr-batch namespace."""
+    return f"+pull/{pr_number}/head:{pr_head_ref(pr_number)}"
+
+
+def _fetch_pr_head_batches(pr_numbers: Sequence[int], remote: str) -> Tuple[Set[int], List[int]]:
+    """Fetch PR heads in argument_batches; return the fetched PRs and the ones whose batch failed."""
+    prefix = ["git", "fetch", "--no-tags", remote]
+    numbers = {pr_head_refspec(number): number for number in pr_numbers}
+    fetched: Set[int] = set()
+    failed: List[int] = []
+    for command in argument_batches(prefix, list(numbers)):
+        batch = [numbers[refspec] for refspec in command[len(prefix):]]
+        try:
+            run_command(command)
+            fetched.update(batch)
+        except subprocess.CalledProcessError:
+            failed.extend(batch)
+    return fetched, failed
+
+
+def fetch_pr_head_refs(pr_numbers: List[int], remote: str) -> Set[int]:
+    """Fetch every PR head in as few git fetches as fit on a command line.
+
+    Refspecs are split by argument_batches. git fetch fails as a whole when
+    any refspec is missing, so for a failed batch the remote is asked which
+    pull/<num>/head refs exist and only those are fetched again. PRs left
+    out fall back to the per-PR fetch path; the returned set holds the PR
+    numbers that were pinned.
+    """
+    if not pr_numbers:
+        return set()
+
+    print(f"Fetching {len(pr_numbers)} PR head ref(s) from {remote} in bulk...")
+    fetched, failed = _fetch_pr_head_batches(pr_numbers, remote)
+    if not failed:
+        print(f"✓ Fetched {len(fetched)} PR head ref(s)")
+        return fetched
+
+    patterns = [f"refs/pull/{number}/head" for number in failed]
+    try:
+        listing = "\n".join(
+            run_command(command)
+            for command in argument_batches(["git", "ls-remote", remote], patterns)
+        )
+    except subprocess.CalledProcessError:
+        print("Warning: Could not list PR head refs; falling back to per-PR fetches")
+        return fetched
+
+    available: Set[int] = set()
+    for line in listing.splitlines():
+        match = re.search(r"\trefs/pull/(\d+)/head$", line)
+        if match:
+            available.add(int(match.group(1)))
+    found = [number for number in failed if number in available]
+    if not found and not fetched:
+        print("Warning: No PR head refs were advertised; falling back to per-PR fetches")
+        return set()
+
+    refetched, refetch_failed = _fetch_pr_head_batches(found, remote)
+    if refetch_failed:
+        print(
+            "Warning: Bulk PR head fetch failed for "
+            f"{', '.join(map(str, refetch_failed))}; falling back to per-PR fetches"
+        )
+    fetched |= refetched
+
+    unavailable = [number for number in pr_numbers if number not in fetched]
+    print(f"✓ Fetched {len(fetched)} PR head ref(s)")
+    if unavailable:
+        print(
+            "PR head refs unavailable, will fall back per PR: "
+            f"{', '.join(map(str, unavailable))}"
+        )
+    return fetched
+
+
+def check_base_revision(base_branch: str) -> None:
+    """Ensure the base branch resolves locally without requiring it to be checked out."""
+    try:
+        run_command(["git", "rev-parse", "--verify", "--quiet", f"{base_branch}^{{commit}}"])
+    except subprocess.CalledProcessError:
+        print(f"Error: Base branch '{base_branch}' does not resolve to a local commit.")
+        sys.exit(1)
+    print(f"✓ Using {base_branch} as the base revision (working tree left untouched)")
+
+
+def resolve_pr_head_ref(
+    pr_info: Dict[str, str], remote: str, pinned_heads: Set[int] | None = None
+) -> str:
+    """Pin the requested PR head into refs/pr-batch/<num> without touching the working tree."""
+    branch_name = pr_info["branch"]
+    pr_number = pr_info["number"]
+    head_ref = pr_head_ref(pr_number)
+    if pinned_heads and pr_number in pinned_heads:
+        print(f"✓ Using prefetched PR ref {head_ref}")
+        return head_ref
+
+    print(f"Resolving PR #{pr_number} into {head_ref} (head ref: {branch_name})...")
+
+    try:
+        run_command(["git", "fetch", remote, f"+pull/{pr_number}/head:{head_ref}"])
+        print(f"✓ Pinned PR ref as {head_ref}")
+        return head_ref
+    except subprocess.CalledProcessError:
+        print(
+            f"PR ref for PR #{pr_number} was unavailable, "
+            f"falling back to remote branch {branch_name}..."
+        )
+
+    try:
+        run_command(["git", "fetch", remote, f"+refs/heads/{branch_name}:{head_ref}"])
+        print(f"✓ Pinned remote branch as {head_ref}")
+        return head_ref
+    except subprocess.CalledProcessError as exc:
+        print(f"Error: Could not resolve head for PR #{pr_number}")
+        raise exc
+
+
+def report_missing_files_at_revision(files: List[str], revision: str) -> List[str]:
+    """Report changed paths that are absent from a revision's tree."""
+    if not files:
+        return []
+
+    listing = run_batched(["git", "ls-tree", "-r", "--name-only", revision], sorted(files))
+    present = set(listing.splitlines())
+    missing_files = [file_path for file_path in files if file_path not in present]
+
+    if missing_files:
+        print(
+            "Including "
+            f"{len(missing_files)} path(s) that are absent on {revision}: "
+            f"{', '.join(missing_files)}"
+        )
+
+    return missing_files
+
+
 def generate_file_descriptions(files: List[str]) -> List[str]:
     """Generate descriptive names for files in the big_picture compilation."""
     file_args: List[str] = []
@@ -484,126 +1749,362 @@ def generate_file_descriptions(files: List[str]) -> List[str]:
     return file_args
 
 
-def run_big_picture(
+def build_pr_document(
     pr_info: Dict[str, str],
     files: List[str],
     excluded_files: List[str],
     all_files: List[str],
     comments: List[Dict[str, str]],
-    checks: List[Dict[str, str]],
-    output_file: str,
-    include_logs: bool = False,
     base_branch: str = "main",
     local_branch: str | None = None,
-) -> bool:
-    """Generate a git diff for the PR instead of full files."""
+    max_diff_bytes: int = 0,
+    max_file_diff_bytes: int = 0,
+    diff_stats: Mapping[str, FileStat] | None = None,
+    diff_budget_bytes: int = 0,
+) -> Dict[str, Any]:
+    """Build the variant-independent parts of a PR document.
+
+    The diff itself is not captured; write_pr_documents streams it once into
+    every variant. With `diff_stats` from the pre-pass, binary files and
+    files beyond `diff_budget_bytes` are listed in the header instead of
+    diffed.
+    """
     branch_for_diff = local_branch or pr_info["branch"]
     print(f"Creating diff compilation for PR #{pr_info['number']}...")
 
-    files_arg = " ".join(shlex.quote(f) for f in files)
-    if files_arg:
-        cmd = f"git diff {shlex.quote(base_branch)}...{shlex.quote(branch_for_diff)} -- {files_arg}"
-        diff_output = run_command(cmd)
-    else:
-        diff_output = ""
+    plan = plan_diff_budget(diff_stats or {}, files, diff_budget_bytes)
+    if plan.over_budget_paths:
+        print(
+            f"Leaving {len(plan.over_budget_paths)} file(s) out of the diff to fit "
+            f"{diff_budget_bytes} bytes: {', '.join(plan.over_budget_paths)}"
+        )
+
+    diff_commands: List[List[str]] = []
+    diff_cache_parts: List[Any] | None = None
+    if plan.diff_paths:
+        diff_commands = command_batches(
+            ["git", "diff", f"{base_branch}...{branch_for_diff}"], sorted(plan.diff_paths)
+        )
+        if _RESULT_CACHE is not None:
+            try:
+                diff_cache_parts = [
+                    "three-dot",
+                    *resolve_commit_shas([base_branch, branch_for_diff]),
+                    plan.diff_paths,
+                ]
+            except subprocess.CalledProcessError:
+                diff_cache_parts = None
 
     summary_text = " ".join(pr_info.get("body", "").split()) or "(no summary provided)"
 
-    with open(output_file, "w", encoding="utf-8") as diff_file:
-        diff_file.write(f"# PR #{pr_info['number']}: {pr_info['title']}\n")
-        diff_file.write(f"# PR Number: {pr_info['number']}\n")
-        diff_file.write(f"# Branch: {branch_for_diff}\n")
-        diff_file.write(f"# Base: {base_branch}\n")
-        diff_file.write(f"# Author: {pr_info.get('author', 'unknown')}\n")
-        diff_file.write(f"# Created: {pr_info.get('createdAt', '')}\n")
-        diff_file.write(f"# URL: {pr_info.get('url', '')}\n")
-        diff_file.write(f"# Summary: {summary_text}\n")
-        diff_file.write(f"# Changed files (total): {len(all_files)}\n")
-        diff_file.write(f"# Included files: {len(files)}\n")
-        diff_file.write(f"# Excluded files: {len(excluded_files)}\n")
-        diff_file.write(f"# All files: {', '.join(all_files) if all_files else '(none)'}\n")
-        diff_file.write(
-            f"# Included file list: {', '.join(files) if files else '(none)'}\n"
+    header_lines = [
+        f"# PR #{pr_info['number']}: {pr_info['title']}\n",
+        f"# PR Number: {pr_info['number']}\n",
+        f"# Branch: {branch_for_diff}\n",
+        f"# Base: {base_branch}\n",
+        f"# Author: {pr_info.get('author', 'unknown')}\n",
+        f"# Created: {pr_info.get('createdAt', '')}\n",
+        f"# URL: {pr_info.get('url', '')}\n",
+        f"# Summary: {summary_text}\n",
+        f"# Changed files (total): {len(all_files)}\n",
+        f"# Included files: {len(files)}\n",
+        f"# Excluded files: {len(excluded_files)}\n",
+        f"# All files: {', '.join(all_files) if all_files else '(none)'}\n",
+        f"# Included file list: {', '.join(files) if files else '(none)'}\n",
+        f"# Excluded file list: {', '.join(excluded_files) if excluded_files else '(none)'}\n",
+    ]
+    if diff_stats:
+        header_lines.extend(
+            f"{line}\n" for line in plan_header_lines(diff_stats, plan, diff_budget_bytes)
         )
-        diff_file.write(
-            f"# Excluded file list: {', '.join(excluded_files) if excluded_files else '(none)'}\n\n"
+    header_lines.extend(["\n", "=" * 80 + "\n"])
+    if not files:
+        header_lines.append(
+            "# No included files for diff generation.\n"
+            "# All changed files for this PR were excluded from diff output.\n"
         )
-        diff_file.write("=" * 80 + "\n")
-        if files:
-            diff_file.write(diff_output if diff_output else "# No differences found\n")
-        else:
-            diff_file.write(
-                "# No included files for diff generation.\n"
-                "# All changed files for this PR were excluded from diff output.\n"
+    elif not plan.diff_paths:
+        header_lines.append(f"{empty_diff_line(plan)}\n")
+
+    return {
+        "head": "".join(header_lines),
+        "diffCommands": diff_commands,
+        "diffCacheParts": diff_cache_parts,
+        "maxDiffBytes": max_diff_bytes,
+        "maxFileDiffBytes": max_file_diff_bytes,
+        "tail": "\n\n" + "=" * 80 + "\n",
+        "comments": format_comments_section(comments),
+    }
+
+
+def write_checks_section(
+    outf: TextIO,
+    checks: List[Dict[str, str]],
+    include_logs: bool = False,
+    log_window: LogWindow | None = None,
+) -> None:
+    """Write the checks section of a PR document, streaming any failed-check logs."""
+    outf.write(f"Checks ({len(checks)}):\n")
+
+    if not checks:
+        outf.write("# No checks found\n")
+    else:
+        for check in checks:
+            name = check.get("name") or "unknown check"
+            status = check.get("status") or "unknown"
+            conclusion = check.get("conclusion") or "unknown"
+            details_url = check.get("detailsUrl") or ""
+            heading = f"- {name}: status={status}, conclusion={conclusion}"
+            if details_url:
+                heading += f" [{details_url}]"
+            outf.write(heading + "\n")
+
+            summary_text = check.get("summary") or check.get("title") or ""
+            if summary_text:
+                for line in summary_text.splitlines():
+                    outf.write(f"    {line}\n")
+            if include_logs and (check.get("logOutput") or check.get("logPath")):
+                outf.write("    Logs:\n")
+                write_log_excerpt(iter_check_log_lines(check), outf, window=log_window)
+
+    outf.write("\n")
+    outf.write("=" * 80 + "\n")
+
+
+def format_comments_section(comments: List[Dict[str, str]]) -> str:
+    """Format the comments section of a PR document."""
+    lines = [f"Comments ({len(comments)}):\n"]
+
+    if not comments:
+        lines.append("# No comments found\n")
+    else:
+        for comment in comments:
+            timestamp = comment.get("createdAt") or "unknown time"
+            author = comment.get("author") or "unknown author"
+            comment_type = comment.get("type") or "comment"
+            url = comment.get("url") or ""
+            state = comment.get("state") or ""
+            heading = f"- [{timestamp}] {author} ({comment_type}"
+            if state:
+                heading += f", state={state}"
+            heading += ")"
+            if comment.get("path"):
+                heading += f" on {comment['path']}"
+                if comment.get("line"):
+                    heading += f":{comment['line']}"
+            if comment.get("inReplyToId"):
+                heading += f" reply-to={comment['inReplyToId']}"
+            if url:
+                heading += f" [{url}]"
+            lines.append(heading + "\n")
+            body = comment.get("body") or ""
+            for line in body.splitlines() or ["(no content)"]:
+                lines.append(f"    {line}\n")
+            lines.append("\n")
+
+    return "".join(lines)
+
+
+def write_pr_documents(
+    document: Dict[str, Any],
+    variants: List[Tuple[str, List[Dict[str, str]], bool]],
+    log_window: LogWindow | None = None,
+) -> None:
+    """Write every (output_file, checks, include_logs) variant of a PR document in one pass."""
+    handles = [open(output_file, "w", encoding="utf-8") for output_file, _, _ in variants]
+    try:
+        for handle in handles:
+            handle.write(document["head"])
+        if document["diffCommands"]:
+            written = stream_cached_diff(
+                document["diffCommands"],
+                document.get("diffCacheParts"),
+                handles,
+                max_bytes=document.get("maxDiffBytes") or 0,
+                max_file_bytes=document.get("maxFileDiffBytes") or 0,
             )
-        diff_file.write("\n\n")
-        diff_file.write("=" * 80 + "\n")
-        diff_file.write(f"Checks ({len(checks)}):\n")
+            if not written:
+                for handle in handles:
+                    handle.write("# No differences found\n")
+        for handle in handles:
+            handle.write(document["tail"])
+        for handle, (_, checks, include_logs) in zip(handles, variants):
+            write_checks_section(handle, checks, include_logs, log_window)
+        for handle in handles:
+            handle.write(document["comments"])
+    finally:
+        for handle in handles:
+            handle.close()
 
-        if not checks:
-            diff_file.write("# No checks found\n")
-        else:
-            for check in checks:
-                name = check.get("name") or "unknown check"
-                status = check.get("status") or "unknown"
-                conclusion = check.get("conclusion") or "unknown"
-                details_url = check.get("detailsUrl") or ""
-                log_output = check.get("logOutput") or ""
-                heading = f"- {name}: status={status}, conclusion={conclusion}"
-                if details_url:
-                    heading += f" [{details_url}]"
-                diff_file.write(heading + "\n")
-
-                summary_text = check.get("summary") or check.get("title") or ""
-                if summary_text:
-                    for line in summary_text.splitlines():
-                        diff_file.write(f"    {line}\n")
-                if include_logs and log_output:
-                    diff_file.write("    Logs:\n")
-                    for line in log_output.splitlines():
-                        diff_file.write(f"    {line}\n")
-
-        diff_file.write("\n")
-        diff_file.write("=" * 80 + "\n")
-        diff_file.write(f"Comments ({len(comments)}):\n")
-
-        if not comments:
-            diff_file.write("# No comments found\n")
-        else:
-            for comment in comments:
-                timestamp = comment.get("createdAt") or "unknown time"
-                author = comment.get("author") or "unknown author"
-                comment_type = comment.get("type") or "comment"
-                url = comment.get("url") or ""
-                state = comment.get("state") or ""
-                heading = f"- [{timestamp}] {author} ({comment_type}"
-                if state:
-                    heading += f", state={state}"
-                heading += ")"
-                if comment.get("path"):
-                    heading += f" on {comment['path']}"
-                    if comment.get("line"):
-                        heading += f":{comment['line']}"
-                if comment.get("inReplyToId"):
-                    heading += f" reply-to={comment['inReplyToId']}"
-                if url:
-                    heading += f" [{url}]"
-                diff_file.write(heading + "\n")
-                body = comment.get("body") or ""
-                lines = body.splitlines() or ["(no content)"]
-                for line in lines:
-                    diff_file.write(f"    {line}\n")
-                diff_file.write("\n")
-
-    print(f"✓ Created diff: {output_file}")
+    for output_file, _, _ in variants:
+        print(f"✓ Created diff: {output_file}")
+
+
+def run_big_picture(
+    pr_info: Dict[str, str],
+    files: List[str],
+    excluded_files: List[str],
+    all_files: List[str],
+    comments: List[Dict[str, str]],
+    checks: List[Dict[str, str]],
+    output_file: str,
+    include_logs: bool = False,
+    base_branch: str = "main",
+    local_branch: str | None = None,
+    max_diff_bytes: int = 0,
+    max_file_diff_bytes: int = 0,
+    log_window: LogWindow | None = None,
+    diff_stats: Mapping[str, FileStat] | None = None,
+    diff_budget_bytes: int = 0,
+) -> bool:
+    """Generate a git diff for the PR instead of full files."""
+    document = build_pr_document(
+        pr_info,
+        files,
+        excluded_files,
+        all_files,
+        comments,
+        base_branch,
+        local_branch,
+        max_diff_bytes,
+        max_file_diff_bytes,
+        diff_stats,
+        diff_budget_bytes,
+    )
+    write_pr_documents(document, [(output_file, checks, include_logs)], log_window)
+    return True
+
+
+MANIFEST_FILENAME = "pr-batch-manifest.json"
+# Bump whenever artifact rendering changes so stale manifests stop matching.
+MANIFEST_VERSION = 2
+
+
+def fingerprint(value: Any) -> str:
+    """Return a stable sha256 fingerprint of a JSON-serializable value."""
+    encoded = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def file_sha256(path: str) -> str | None:
+    """Return the sha256 of a file's contents, or None if it cannot be read."""
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as source:
+            for chunk in iter(lambda: source.read(FILE_COPY_CHUNK_SIZE), b""):
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+def load_manifest(output_dir: str) -> Dict[str, Any]:
+    """Load the artifact manifest from a previous run, or start an empty one."""
+    manifest: Dict[str, Any] = {"version": MANIFEST_VERSION, "artifacts": {}}
+    try:
+        with open(os.path.join(output_dir, MANIFEST_FILENAME), encoding="utf-8") as source:
+            data = json.load(source)
+    except (OSError, json.JSONDecodeError):
+        return manifest
+    if (
+        isinstance(data, dict)
+        and data.get("version") == MANIFEST_VERSION
+        and isinstance(data.get("artifacts"), dict)
+    ):
+        manifest["artifacts"] = data["artifacts"]
+    return manifest
+
+
+def write_manifest(output_dir: str, manifest: Dict[str, Any]) -> str:
+    """Write the artifact manifest next to the outputs."""
+    manifest_path = os.path.join(output_dir, MANIFEST_FILENAME)
+    temp_path = manifest_path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as outf:
+        json.dump(manifest, outf, indent=2, sort_keys=True)
+        outf.write("\n")
+    os.replace(temp_path, manifest_path)
+    return manifest_path
+
+
+def artifact_is_current(
+    manifest: Dict[str, Any], output_files: List[str], inputs: Dict[str, Any]
+) -> bool:
+    """Return True if every output was recorded with these inputs and is unchanged on disk."""
+    artifacts = manifest.get("artifacts") or {}
+    for output_file in output_files:
+        entry = artifacts.get(os.path.basename(output_file))
+        if not isinstance(entry, dict) or entry.get("inputs") != inputs:
+            return False
+        if file_sha256(output_file) != entry.get("sha256"):
+            return False
     return True
 
 
+def record_artifact(
+    manifest: Dict[str, Any], output_files: List[str], inputs: Dict[str, Any]
+) -> None:
+    """Record the inputs and output hash of freshly written (or reused) artifacts."""
+    artifacts = manifest.setdefault("artifacts", {})
+    for output_file in output_files:
+        artifacts[os.path.basename(output_file)] = {
+            "inputs": inputs,
+            "sha256": file_sha256(output_file),
+        }
+
+
+def pr_artifact_inputs(
+    pr_info: Dict[str, str],
+    base_branch: str,
+    local_branch: str,
+    included_files: List[str],
+    excluded_files: List[str],
+    all_files: List[str],
+    comments: List[Dict[str, str]],
+    checks: List[Dict[str, str]],
+    checks_with_logs: List[Dict[str, str]],
+    max_diff_bytes: int = 0,
+    max_file_diff_bytes: int = 0,
+    log_window: LogWindow | None = None,
+    diff_budget_bytes: int = 0,
+) -> Dict[str, Any]:
+    """Describe everything a per-PR document is rendered from.
+
+    Checks are fingerprinted by log digest rather than by the temporary file
+    each run downloads logs into.
+    """
+    base_sha, head_sha = resolve_commit_shas([base_branch, local_branch])
+    logged_checks = [
+        {key: value for key, value in check.items() if key != "logPath"}
+        for check in checks_with_logs
+    ]
+    return {
+        "headSha": head_sha,
+        "baseSha": base_sha,
+        "commentsFingerprint": fingerprint(comments),
+        "checksFingerprint": fingerprint([checks, logged_checks]),
+        "documentFingerprint": fingerprint(
+            [
+                MANIFEST_VERSION,
+                pr_info,
+                base_branch,
+                local_branch,
+                included_files,
+                excluded_files,
+                all_files,
+                max_diff_bytes,
+                max_file_diff_bytes,
+                log_window or LogWindow(),
+                diff_budget_bytes,
+            ]
+        ),
+    }
+
+
 def create_master_comparison(
     pr_files: List[Tuple[Dict[str, str], str]],
     selection_requested: str,
     selection_canonical: str,
-    selected_prs: List[int],
+    selected_prs: Sequence[int],
     output_file: str,
     include_logs: bool = False,
 ) -> bool:
@@ -630,8 +2131,7 @@ def create_master_comparison(
             outf.write(f"# PR {idx}/{len(pr_files)} - #{pr_info['number']}: {pr_info['title']}\n")
             outf.write("=" * 80 + "\n\n")
 
-            with open(pr_file, "r", encoding="utf-8") as inf:
-                outf.write(inf.read())
+            copy_file_into(outf, pr_file)
 
             outf.write("\n\n")
 
@@ -645,12 +2145,20 @@ def create_touched_files_compilation(
     base_branch: str,
     selection_requested: str,
     selection_canonical: str,
-    selected_prs: List[int],
+    selected_prs: Sequence[int],
     output_file: str,
     master_comparison_file: str | None = None,
     include_logs: bool = False,
+    append_master: bool = True,
+    reader: GitObjectReader | None = None,
+    binary_files: Set[str] | None = None,
 ) -> bool:
-    """Create a compilation of unique touched files from the base branch."""
+    """Create a compilation of unique touched files from the base branch.
+
+    File snapshots are streamed through `reader` (a fresh GitObjectReader
+    when omitted) rather than one `git show` per path. Paths the pre-pass
+    flagged in `binary_files` are only checked for existence, never read.
+    """
     print("Creating touched files compilation...")
 
     if not touched_files:
@@ -658,54 +2166,82 @@ def create_touched_files_compilation(
         return False
 
     sorted_files = sorted(touched_files)
+    owns_reader = reader is None
+    if reader is None:
+        reader = GitObjectReader()
 
-    with open(output_file, "w", encoding="utf-8") as outf:
-        log_note = " (with logs)" if include_logs else ""
-        outf.write(f"# Touched Files{log_note} (base branch)\n")
-        for line in selection_header_lines(
-            selection_requested, selection_canonical, selected_prs
-        ):
-            outf.write(f"{line}\n")
-        outf.write(f"# Total unique files: {len(sorted_files)}\n")
-        outf.write(f"# Source branch: {base_branch}\n")
-        outf.write(
-            "# Includes all changed paths from the selected PRs, including deleted "
-            "or otherwise excluded diff paths when they exist on the base branch.\n"
-        )
-        outf.write(f"# Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        outf.write("=" * 80 + "\n\n")
-
-        for file_path in sorted_files:
-            ref_path = f"{base_branch}:{file_path}"
-            try:
-                file_contents = run_command(f"git show {shlex.quote(ref_path)}")
-            except subprocess.CalledProcessError:
-                print(
-                    f"Skipping {file_path} because it does not exist on {base_branch}"
-                )
-                continue
-
-            outf.write("=" * 80 + "\n")
-            outf.write(f"# File: {file_path}\n")
-            outf.write(f"# Source: {base_branch}\n")
-            file_prs = sorted(touched_file_prs.get(file_path, set()))
-            if file_prs:
-                outf.write(f"# Touched by PRs: {', '.join(str(pr) for pr in file_prs)}\n")
-            else:
-                outf.write("# Touched by PRs: (unknown)\n")
-            outf.write("\n")
-            outf.write(file_contents)
-            if not file_contents.endswith("\n"):
-                outf.write("\n")
-            outf.write("\n\n")
-
-        if master_comparison_file and os.path.exists(master_comparison_file):
-            outf.write("=" * 80 + "\n")
+    try:
+        with open(output_file, "w", encoding="utf-8") as outf:
+            log_note = " (with logs)" if include_logs else ""
+            outf.write(f"# Touched Files{log_note} (base branch)\n")
+            for line in selection_header_lines(
+                selection_requested, selection_canonical, selected_prs
+            ):
+                outf.write(f"{line}\n")
+            outf.write(f"# Total unique files: {len(sorted_files)}\n")
+            outf.write(f"# Source branch: {base_branch}\n")
             outf.write(
-                "# Appended master comparison (diffs and summaries)\n\n"
+                "# Includes all changed paths from the selected PRs, including deleted "
+                "or otherwise excluded diff paths when they exist on the base branch.\n"
             )
-            with open(master_comparison_file, "r", encoding="utf-8") as master_file:
-                outf.write(master_file.read())
+            outf.write(f"# Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+            outf.write("=" * 80 + "\n\n")
+
+            for file_path in sorted_files:
+                spec = f"{base_branch}:{file_path}"
+                if binary_files and file_path in binary_files:
+                    blob = reader.info(spec)
+                    if blob.status == "ok":
+                        blob = GitBlob(spec, "binary", blob.object_type, blob.size)
+                else:
+                    blob = reader.read(spec)
+                if not blob.found:
+                    print(
+                        f"Skipping {file_path} because it does not exist on {base_branch}"
+                    )
+                    continue
+
+                if blob.status == "non-blob":
+                    print(f"Skipping {file_path} because it is a {blob.object_type}, not a file")
+                    file_contents = non_blob_placeholder(blob)
+                elif blob.status == "binary":
+                    print(f"Skipping binary file contents for {file_path}")
+                    file_contents = BINARY_PLACEHOLDER
+                elif blob.status == "oversized":
+                    print(f"Skipping oversized file contents for {file_path} ({blob.size} bytes)")
+                    file_contents = f"# (file omitted from report: {blob.size} bytes exceeds limit)"
+                else:
+                    file_contents = blob.content.strip()
+
+                outf.write("=" * 80 + "\n")
+                outf.write(f"# File: {file_path}\n")
+                outf.write(f"# Source: {base_branch}\n")
+                file_prs = sorted(touched_file_prs.get(file_path, set()))
+                if file_prs:
+                    outf.write(f"# Touched by PRs: {', '.join(str(pr) for pr in file_prs)}\n")
+                else:
+                    outf.write("# Touched by PRs: (unknown)\n")
+                outf.write("\n")
+                outf.write(file_contents)
+                if not file_contents.endswith("\n"):
+                    outf.write("\n")
+                outf.write("\n\n")
+
+            if master_comparison_file and os.path.exists(master_comparison_file):
+                outf.write("=" * 80 + "\n")
+                if append_master:
+                    outf.write(
+                        "# Appended master comparison (diffs and summaries)\n\n"
+                    )
+                    copy_file_into(outf, master_comparison_file)
+                else:
+                    outf.write(
+                        "# Master comparison (diffs and summaries): "
+                        f"{os.path.basename(master_comparison_file)}\n"
+                    )
+    finally:
+        if owns_reader:
+            reader.close()
 
     print(f"✓ Created touched files compilation: {output_file}")
     return True
@@ -715,11 +2251,16 @@ def create_summary_compilation(
     pr_files: List[Tuple[Dict[str, str], str]],
     selection_requested: str,
     selection_canonical: str,
-    selected_prs: List[int],
+    selected_prs: Sequence[int],
     output_file: str,
     include_logs: bool = False,
+    diff_stats: Mapping[int, Mapping[str, FileStat]] | None = None,
 ) -> bool:
-    """Create a concise summary document for all processed PRs."""
+    """Create a concise summary document for all processed PRs.
+
+    `diff_stats` maps PR numbers to their pre-pass stats; each PR then gets
+    a stats block and the document ends with the files most PRs touch.
+    """
     print("Creating summary compilation file...")
 
     if not pr_files:
@@ -745,29 +2286,101 @@ def create_summary_compilation(
             outf.write(f"- Created: {pr_info.get('createdAt', '')}\n")
             outf.write(f"- URL: {pr_info.get('url', '')}\n")
             outf.write(f"- Summary: {summary_text}\n")
+            if diff_stats is not None:
+                for line in stats_block_lines(diff_stats.get(pr_info["number"], {})):
+                    outf.write(f"{line}\n")
             outf.write(f"- Detailed file: {pr_file}\n")
             outf.write("\n")
 
+        if diff_stats:
+            hot_files = hot_file_lines(
+                {
+                    f"#{pr_info['number']}": diff_stats.get(pr_info["number"], {})
+                    for pr_info, _ in pr_files
+                },
+                item_name="PR",
+            )
+            if hot_files:
+                outf.write("## Hot files (touched by more than one PR)\n")
+                outf.writelines(f"{line}\n" for line in hot_files)
+                outf.write("\n")
+
     print(f"✓ Created summary compilation: {output_file}")
     return True
 
 
+ROUND_ROBIN_MODES = ("union", "overlap", "off")
+
+
+def get_tree_entries(revision: str, files: List[str]) -> Dict[str, Tuple[str, str]]:
+    """Return {path: (mode, object id)} for the given paths at a revision.
+
+    Paths absent from the revision are left out of the result.
+    """
+    if not files:
+        return {}
+
+    output = run_batched(["git", "ls-tree", "-r", "-z", revision], sorted(files), separator="\0")
+    entries: Dict[str, Tuple[str, str]] = {}
+    for record in output.split("\0"):
+        if not record:
+            continue
+        meta, _, path = record.partition("\t")
+        fields = meta.split()
+        if len(fields) == 3:
+            entries[path] = (fields[0], fields[2])
+    return entries
+
+
 def create_round_robin_comparisons(
     processed_prs: List[Dict[str, object]],
     output_dir: str,
     selection_requested: str,
     selection_canonical: str,
-    selected_prs: List[int],
+    selected_prs: Sequence[int],
+    max_diff_bytes: int = 0,
+    max_file_diff_bytes: int = 0,
+    jobs: int = 1,
+    mode: str = "union",
+    manifest: Dict[str, Any] | None = None,
+    reuse: bool = False,
 ) -> List[str]:
-    """Create pairwise comparison files for every PR combination."""
+    """Create pairwise comparison files for every PR combination.
+
+    In "union" mode each pair compares every path either PR includes; in
+    "overlap" mode only paths both PRs include are compared and disjoint
+    pairs are skipped.
+
+    A pre-pass records the blob of every included path on each PR head, so
+    files whose blobs match on both sides are listed as identical instead of
+    diffed, and pairs with no differing files never spawn git diff. The
+    remaining pair diffs run on up to `jobs` threads.
+
+    With a manifest, each pair's inputs are recorded; with `reuse` as well,
+    pairs whose inputs and output file are unchanged are not rewritten.
+    """
     print("Creating round-robin comparisons...")
 
     if len(processed_prs) < 2:
         print("Warning: Not enough PRs for round-robin comparisons")
         return []
 
-    output_files: List[str] = []
-
+    all_included: Set[str] = set()
+    for processed in processed_prs:
+        if isinstance(processed.get("files"), list):
+            all_included.update(processed["files"])
+    sorted_included = sorted(all_included)
+
+    tree_entries: Dict[str, Dict[str, Tuple[str, str]]] = {}
+    head_shas: Dict[str, str] = {}
+    for processed in processed_prs:
+        branch = processed.get("local_branch")
+        if isinstance(branch, str) and branch not in tree_entries:
+            tree_entries[branch] = get_tree_entries(branch, sorted_included)
+            if _RESULT_CACHE is not None or manifest is not None:
+                head_shas[branch] = resolve_commit_shas([branch])[0]
+
+    pairs: List[Dict[str, Any]] = []
     for left, right in combinations(processed_prs, 2):
         left_info = left["info"]
         right_info = right["info"]
@@ -788,62 +2401,279 @@ def create_round_robin_comparisons(
         if left_number is None or right_number is None:
             continue
 
-        output_file = os.path.join(
-            output_dir, f"pr-{left_number}-versus-{right_number}.txt"
-        )
-
-        combined_files = sorted(set(left_files) | set(right_files))
+        if mode == "overlap":
+            combined_files = sorted(set(left_files) & set(right_files))
+        else:
+            combined_files = sorted(set(left_files) | set(right_files))
         if not combined_files:
+            reason = (
+                "because they include no files in common"
+                if mode == "overlap"
+                else "because there are no included files to compare"
+            )
             print(
                 f"Skipping round-robin comparison for PR #{left_number} vs PR #{right_number} "
-                "because there are no included files to compare"
+                f"{reason}"
             )
             continue
 
-        files_arg = " ".join(shlex.quote(f) for f in combined_files)
-        diff_cmd = (
-            f"git diff {shlex.quote(left_branch)} {shlex.quote(right_branch)}"
+        left_entries = tree_entries.get(left_branch, {})
+        right_entries = tree_entries.get(right_branch, {})
+        differing_files = [
+            path
+            for path in combined_files
+            if left_entries.get(path) != right_entries.get(path)
+        ]
+        differing_set = set(differing_files)
+        identical_files = [path for path in combined_files if path not in differing_set]
+
+        pairs.append(
+            {
+                "left_info": left_info,
+                "right_info": right_info,
+                "left_branch": left_branch,
+                "right_branch": right_branch,
+                "combined_files": combined_files,
+                "differing_files": differing_files,
+                "identical_files": identical_files,
+                "mode": mode,
+                "cache_parts": (
+                    ["two-dot", head_shas[left_branch], head_shas[right_branch], differing_files]
+                    if left_branch in head_shas and right_branch in head_shas
+                    else None
+                ),
+                "output_file": os.path.join(
+                    output_dir, f"pr-{left_number}-versus-{right_number}.txt"
+                ),
+            }
         )
-        diff_cmd += f" -- {files_arg}"
-
-        diff_output = run_command(diff_cmd)
-
-        left_summary = " ".join(left_info.get("body", "").split()) or "(no summary provided)"
-        right_summary = " ".join(right_info.get("body", "").split()) or "(no summary provided)"
 
-        with open(output_file, "w", encoding="utf-8") as outf:
-            outf.write(
-                f"# PR #{left_number} vs PR #{right_number}: "
-                f"{left_info.get('title', '')} ↔ {right_info.get('title', '')}\n"
+    reused_pairs = 0
+    if manifest is not None:
+        # The canonical string determines the selection; hashing it instead of
+        # the expanded numbers keeps fingerprints O(ranges).
+        selection = [selection_requested, selection_canonical]
+        for pair in pairs:
+            pair["inputs"] = {
+                "leftSha": head_shas.get(pair["left_branch"]),
+                "rightSha": head_shas.get(pair["right_branch"]),
+                "pairFingerprint": fingerprint(
+                    [
+                        MANIFEST_VERSION,
+                        selection,
+                        pair["left_info"],
+                        pair["right_info"],
+                        pair["left_branch"],
+                        pair["right_branch"],
+                        pair["combined_files"],
+                        pair["identical_files"],
+                        mode,
+                        max_diff_bytes,
+                        max_file_diff_bytes,
+                    ]
+                ),
+            }
+            pair["reused"] = reuse and artifact_is_current(
+                manifest, [pair["output_file"]], pair["inputs"]
             )
-            for line in selection_header_lines(
-                selection_requested, selection_canonical, selected_prs
-            ):
-                outf.write(f"{line}\n")
-            outf.write(f"# Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            outf.write(f"# Left branch: {left_branch}\n")
-            outf.write(f"# Right branch: {right_branch}\n")
-            outf.write(f"# Left author: {left_info.get('author', 'unknown')}\n")
-            outf.write(f"# Right author: {right_info.get('author', 'unknown')}\n")
-            outf.write(f"# Left URL: {left_info.get('url', '')}\n")
-            outf.write(f"# Right URL: {right_info.get('url', '')}\n")
-            outf.write(f"# Left summary: {left_summary}\n")
-            outf.write(f"# Right summary: {right_summary}\n")
-            outf.write(f"# Files compared: {len(combined_files)}\n")
-            outf.write(f"# Files: {', '.join(combined_files)}\n\n")
-            outf.write("=" * 80 + "\n")
-            outf.write(diff_output if diff_output else "# No differences found\n")
-            outf.write("\n\n")
+            reused_pairs += 1 if pair["reused"] else 0
+
+    def write_pair(pair: Dict[str, Any]) -> str:
+        if pair.get("reused"):
+            return pair["output_file"]
+        return _write_round_robin_pair(
+            pair,
+            selection_requested,
+            selection_canonical,
+            selected_prs,
+            max_diff_bytes,
+            max_file_diff_bytes,
+        )
 
+    output_files: List[str] = []
+    for pair, output_file in iter_pipelined(pairs, write_pair, jobs):
         output_files.append(output_file)
+        if manifest is not None:
+            record_artifact(manifest, [output_file], pair["inputs"])
+    identical_pairs = sum(1 for pair in pairs if not pair["differing_files"])
 
     print(
         f"✓ Created {len(output_files)} round-robin comparison file(s) "
         f"for selection {selection_canonical}"
     )
+    if identical_pairs:
+        print(f"✓ {identical_pairs} pair(s) had identical file versions and were not diffed")
+    if reused_pairs:
+        print(f"✓ Reused {reused_pairs} unchanged round-robin comparison file(s)")
     return output_files
 
 
+def _write_round_robin_pair(
+    pair: Dict[str, Any],
+    selection_requested: str,
+    selection_canonical: str,
+    selected_prs: Sequence[int],
+    max_diff_bytes: int,
+    max_file_diff_bytes: int,
+) -> str:
+    left_info = pair["left_info"]
+    right_info = pair["right_info"]
+    left_branch = pair["left_branch"]
+    right_branch = pair["right_branch"]
+    combined_files = pair["combined_files"]
+    differing_files = pair["differing_files"]
+    identical_files = pair["identical_files"]
+    output_file = pair["output_file"]
+
+    left_summary = " ".join(left_info.get("body", "").split()) or "(no summary provided)"
+    right_summary = " ".join(right_info.get("body", "").split()) or "(no summary provided)"
+
+    with open(output_file, "w", encoding="utf-8") as outf:
+        outf.write(
+            f"# PR #{left_info.get('number')} vs PR #{right_info.get('number')}: "
+            f"{left_info.get('title', '')} ↔ {right_info.get('title', '')}\n"
+        )
+        for line in selection_header_lines(
+            selection_requested, selection_canonical, selected_prs
+        ):
+            outf.write(f"{line}\n")
+        outf.write(f"# Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        outf.write(f"# Left branch: {left_branch}\n")
+        outf.write(f"# Right branch: {right_branch}\n")
+        outf.write(f"# Left author: {left_info.get('author', 'unknown')}\n")
+        outf.write(f"# Right author: {right_info.get('author', 'unknown')}\n")
+        outf.write(f"# Left URL: {left_info.get('url', '')}\n")
+        outf.write(f"# Right URL: {right_info.get('url', '')}\n")
+        outf.write(f"# Left summary: {left_summary}\n")
+        outf.write(f"# Right summary: {right_summary}\n")
+        if pair["mode"] == "overlap":
+            outf.write("# Round-robin mode: overlap (only paths included by both PRs)\n")
+        outf.write(f"# Files compared: {len(combined_files)}\n")
+        outf.write(f"# Files: {', '.join(combined_files)}\n")
+        if identical_files:
+            outf.write(
+                f"# Identical files (same blob on both sides, not diffed): "
+                f"{', '.join(identical_files)}\n"
+            )
+        outf.write("\n")
+        outf.write("=" * 80 + "\n")
+        written = 0
+        if differing_files:
+            written = stream_cached_diff(
+                command_batches(["git", "diff", left_branch, right_branch], sorted(differing_files)),
+                pair["cache_parts"],
+                [outf],
+                max_bytes=max_diff_bytes,
+                max_file_bytes=max_file_diff_bytes,
+            )
+        if not written:
+            outf.write("# No differences found\n")
+        outf.write("\n\n")
+
+    return output_file
+
+
+def iter_pipelined(
+    items: Iterable[T], func: Callable[[T], R], jobs: int = DEFAULT_JOBS
+) -> Iterator[Tuple[T, R]]:
+    """Yield (item, func(item)) in input order while running up to `jobs` calls ahead.
+
+    Results are consumed strictly in input order, so anything the caller does
+    with them stays deterministic regardless of `jobs`. At most `jobs` results
+    are held in flight at any time.
+    """
+    if jobs <= 1:
+        for item in items:
+            yield item, func(item)
+        return
+
+    pending: Deque[Tuple[T, "Future[R]"]] = deque()
+    iterator = iter(items)
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        try:
+            for item in iterator:
+                pending.append((item, executor.submit(func, item)))
+                if len(pending) >= jobs:
+                    ready_item, future = pending.popleft()
+                    yield ready_item, future.result()
+            while pending:
+                ready_item, future = pending.popleft()
+                yield ready_item, future.result()
+        finally:
+            for _item, future in pending:
+                future.cancel()
+
+
+def lookup_pr_info(pr_number: int) -> Dict[str, str] | Exception:
+    """Return PR info, or the lookup error so callers can report it in order."""
+    try:
+        return get_pr_info(pr_number)
+    except API_ERRORS as exc:
+        return exc
+
+
+def fetch_pr_inputs(pr_info: Dict[str, str]) -> Dict[str, Any]:
+    """Fetch the network-bound inputs for one PR: files, comments, checks and logs.
+
+    Errors are recorded under "<part>Error" keys instead of being printed so
+    the caller can report them in PR order.
+    """
+    pr_number = pr_info["number"]
+    fetched: Dict[str, Any] = {
+        "files": [],
+        "comments": [],
+        "checks": [],
+        "checksWithLogs": [],
+    }
+
+    try:
+        with PROFILE.phase("files"):
+            fetched["files"] = get_pr_changed_files(pr_number)
+    except API_ERRORS as exc:
+        fetched["filesError"] = exc
+        return fetched
+    if not fetched["files"]:
+        return fetched
+
+    try:
+        with PROFILE.phase("comments"):
+            fetched["comments"] = get_pr_comments(pr_number)
+    except API_ERRORS as exc:
+        fetched["commentsError"] = exc
+
+    try:
+        with PROFILE.phase("checks"):
+            checks = get_pr_checks(pr_number)
+    except API_ERRORS as exc:
+        fetched["checksError"] = exc
+    else:
+        fetched["checks"] = checks
+        with PROFILE.phase("logs"):
+            fetched["checksWithLogs"] = attach_failed_check_logs(checks)
+
+    return fetched
+
+
+def record_profile_counters(
+    github_client: GitHubClient | None,
+    result_cache: ResultCache | None,
+    log_fetcher: FailedLogFetcher,
+    snapshot_reader: GitObjectReader,
+    rate_limits: RateLimitScheduler,
+) -> None:
+    """Copy the run's request and cache counters into PROFILE."""
+    api_requests = github_client.requests if github_client is not None else 0
+    if _FETCH_ENGINE is not None:
+        api_requests += _FETCH_ENGINE.requests
+    PROFILE.set_counter("apiRequests", api_requests)
+    PROFILE.set_counter("apiRetries", rate_limits.retries)
+    PROFILE.set_counter("logDownloads", log_fetcher.downloads)
+    PROFILE.set_counter("catFileRequests", snapshot_reader.requests)
+    if result_cache is not None:
+        PROFILE.set_counter("cacheHits", result_cache.hits)
+        PROFILE.set_counter("cacheMisses", result_cache.misses)
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(
         description="Automate diff generation for selected pull requests",
@@ -885,18 +2715,361 @@ def main() -> None:
         action="store_true",
         help="Don't return to the base branch at the end",
     )
+    parser.add_argument(
+        "--no-checkout",
+        action="store_true",
+        help=(
+            "Pin each PR head into refs/pr-batch/<num> and diff git objects "
+            "directly instead of checking out every PR branch"
+        ),
+    )
+    parser.add_argument(
+        "--skip-remote-fetch",
+        action="store_true",
+        help=(
+            "Skip the full 'git fetch <remote> --prune --tags'; PR heads are "
+            "still fetched in one targeted request"
+        ),
+    )
+    parser.add_argument(
+        "--metadata-chunk-size",
+        type=int,
+        default=PR_GRAPHQL_CHUNK_SIZE,
+        help=(
+            "PRs per bulk GraphQL metadata query "
+            f"(default: {PR_GRAPHQL_CHUNK_SIZE}; 0 disables bulk prefetch)"
+        ),
+    )
+    parser.add_argument(
+        "--query",
+        help=(
+            "Select PRs with a GitHub search query scoped to this repository, e.g. "
+            "'is:merged base:main updated:>=2026-09-01 label:release'. With a "
+            "pr_selection, only matching PRs inside it are processed."
+        ),
+    )
+    parser.add_argument(
+        "--prefilter",
+        action="store_true",
+        help=(
+            "List which selected numbers are pull requests before looking them up, so "
+            "issue numbers in a large sweep cost no lookups (always on when a filter "
+            "below is set)"
+        ),
+    )
+    parser.add_argument(
+        "--state",
+        choices=sorted(PR_LISTING_STATES),
+        default="all",
+        help="Only process PRs in this state (default: all)",
+    )
+    parser.add_argument(
+        "--filter-base",
+        metavar="BRANCH",
+        help="Only process PRs that target BRANCH",
+    )
+    parser.add_argument(
+        "--filter-author",
+        metavar="LOGIN",
+        help="Only process PRs opened by LOGIN",
+    )
+    parser.add_argument(
+        "--filter-label",
+        action="append",
+        default=[],
+        metavar="LABEL",
+        help="Only process PRs carrying LABEL (repeatable; any listed label matches)",
+    )
+    parser.add_argument(
+        "--fetch-concurrency",
+        type=int,
+        default=DEFAULT_FETCH_CONCURRENCY,
+        help=(
+            "Maximum bulk metadata queries in flight at once on the asyncio fetch "
+            f"engine (default: {DEFAULT_FETCH_CONCURRENCY}; 1 runs them one at a time)"
+        ),
+    )
+    parser.add_argument(
+        "--max-diff-bytes",
+        type=int,
+        default=0,
+        help=(
+            "Truncate each per-PR or round-robin diff after this many bytes "
+            "(default: 0, unlimited)"
+        ),
+    )
+    parser.add_argument(
+        "--max-file-diff-bytes",
+        type=int,
+        default=0,
+        help=(
+            "Replace any single file's diff section larger than this many bytes "
+            "with a truncation marker (default: 0, unlimited)"
+        ),
+    )
+    parser.add_argument(
+        "--diff-budget-bytes",
+        type=int,
+        default=0,
+        metavar="N",
+        help=(
+            "Plan each per-PR diff to fit N bytes, estimated from the numstat pre-pass; "
+            "the largest files are left out first and listed in the header "
+            "(default: 0, unlimited)"
+        ),
+    )
+    parser.add_argument(
+        "--max-snapshot-bytes",
+        type=int,
+        default=0,
+        help=(
+            "Omit base-branch file snapshots larger than this many bytes from "
+            "the touched-files compilations (default: 0, unlimited)"
+        ),
+    )
+    parser.add_argument(
+        "--reference-master",
+        action="store_true",
+        help=(
+            "Reference the master comparison file by name at the end of the "
+            "touched-files compilations instead of appending a full copy"
+        ),
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=(
+            f"Reuse per-PR and round-robin files whose inputs match {MANIFEST_FILENAME} "
+            "from a previous run in the output directory; compilations are always rebuilt"
+        ),
+    )
+    parser.add_argument(
+        "--round-robin-mode",
+        choices=ROUND_ROBIN_MODES,
+        default="union",
+        help=(
+            "Paths compared for each PR pair: 'union' of both PRs' files, "
+            "'overlap' for files both PRs touch (disjoint pairs skipped), "
+            "or 'off' to skip round-robin comparisons (default: union)"
+        ),
+    )
+    parser.add_argument(
+        "--no-api-client",
+        action="store_true",
+        help=(
+            "Call the gh CLI for every GitHub request even when GH_TOKEN is set "
+            "(default: use a pooled HTTPS client when a token is available)"
+        ),
+    )
+    parser.add_argument(
+        "--api-retries",
+        type=int,
+        default=DEFAULT_MAX_RETRIES,
+        help=(
+            "Retries for a GitHub request that hits a rate limit or a 5xx error; "
+            f"requests are also paced to the remaining budget (default: {DEFAULT_MAX_RETRIES})"
+        ),
+    )
+    parser.add_argument(
+        "--log-jobs",
+        type=int,
+        default=DEFAULT_LOG_JOBS,
+        help=(
+            "Maximum concurrent failed-run log downloads; each run is fetched once "
+            f"with --log-failed (default: {DEFAULT_LOG_JOBS})"
+        ),
+    )
+    parser.add_argument(
+        "--log-head-lines",
+        type=int,
+        default=DEFAULT_LOG_HEAD_LINES,
+        help=f"Failed-check log lines always kept from the start (default: {DEFAULT_LOG_HEAD_LINES})",
+    )
+    parser.add_argument(
+        "--log-tail-lines",
+        type=int,
+        default=DEFAULT_LOG_TAIL_LINES,
+        help=f"Failed-check log lines always kept from the end (default: {DEFAULT_LOG_TAIL_LINES})",
+    )
+    parser.add_argument(
+        "--log-context-lines",
+        type=int,
+        default=DEFAULT_LOG_CONTEXT_LINES,
+        help=(
+            "Failed-check log lines kept before and after each error marker "
+            f"(default: {DEFAULT_LOG_CONTEXT_LINES})"
+        ),
+    )
+    parser.add_argument(
+        "--full-logs",
+        action="store_true",
+        help="Embed every failed-check log line instead of head/tail/error windows",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help=(
+            "Directory for a persistent cache of PR metadata, failed-run logs "
+            "and diffs between immutable SHAs (default: no cache)"
+        ),
+    )
+    parser.add_argument(
+        "--cache-max-bytes",
+        type=int,
+        default=DEFAULT_CACHE_MAX_BYTES,
+        help=(
+            "Evict least recently used cache entries beyond this size "
+            f"(default: {DEFAULT_CACHE_MAX_BYTES})"
+        ),
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=DEFAULT_CACHE_TTL,
+        help=(
+            "Seconds cached PR metadata stays valid for the same updatedAt and "
+            f"head SHA (default: {DEFAULT_CACHE_TTL})"
+        ),
+    )
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        default=[],
+        metavar="PATTERN",
+        help=(
+            "Keep paths matching this .gitignore-style glob out of diff output "
+            "(repeatable; adds to the default lockfile/minified/snapshot patterns)"
+        ),
+    )
+    parser.add_argument(
+        "--exclude-from",
+        action="append",
+        default=[],
+        metavar="FILE",
+        help="Read additional exclusion patterns from FILE, one per line (repeatable)",
+    )
+    parser.add_argument(
+        "--no-default-excludes",
+        action="store_true",
+        help="Drop the built-in exclusion patterns and use only --exclude/--exclude-from",
+    )
+    parser.add_argument(
+        "--no-gitattributes-excludes",
+        action="store_true",
+        help="Do not exclude paths marked linguist-generated or -diff in gitattributes",
+    )
+    parser.add_argument(
+        "--exclude-max-lines",
+        type=int,
+        default=0,
+        metavar="N",
+        help=(
+            "Exclude files whose diff adds plus removes more than N lines "
+            "(default: 0, no limit)"
+        ),
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="PATH",
+        help=(
+            "Write per-phase timings, per-command timings and resource counters "
+            "to PATH as JSON"
+        ),
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=DEFAULT_JOBS,
+        help=(
+            "Number of PRs whose network data is fetched ahead of the PR being "
+            f"rendered (default: {DEFAULT_JOBS}; 1 runs serially)"
+        ),
+    )
 
     args = parser.parse_args()
 
-    if not args.pr_selection:
-        parser.error("pr_selection is required (e.g. '123-130,135,140-142').")
-
+    if not args.pr_selection and not args.query:
+        parser.error("pr_selection or --query is required (e.g. '123-130,135,140-142').")
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1.")
+    if args.log_jobs < 1:
+        parser.error("--log-jobs must be at least 1.")
+    if args.fetch_concurrency < 1:
+        parser.error("--fetch-concurrency must be at least 1.")
+    if args.api_retries < 0:
+        parser.error("--api-retries must not be negative.")
+    if min(args.log_head_lines, args.log_tail_lines, args.log_context_lines) < 0:
+        parser.error("--log-head-lines, --log-tail-lines and --log-context-lines must not be negative.")
+    if args.diff_budget_bytes < 0:
+        parser.error("--diff-budget-bytes must not be negative.")
+    if args.exclude_max_lines < 0:
+        parser.error("--exclude-max-lines must not be negative.")
     try:
-        selected_prs = parse_pr_selection(args.pr_selection)
-    except SelectionParseError as exc:
-        parser.error(str(exc))
+        configure_exclusion_rules(
+            build_exclusion_rules(
+                args.exclude,
+                args.exclude_from,
+                use_defaults=not args.no_default_excludes,
+                use_gitattributes=not args.no_gitattributes_excludes,
+                max_changed_lines=args.exclude_max_lines,
+            )
+        )
+    except OSError as exc:
+        parser.error(f"--exclude-from: {exc}")
+
+    selected_prs = PRSelection()
+    if args.pr_selection:
+        try:
+            selected_prs = parse_pr_selection(args.pr_selection)
+        except SelectionParseError as exc:
+            parser.error(str(exc))
+
+    if args.no_checkout:
+        check_base_revision(args.base_branch)
+    else:
+        check_current_branch(args.base_branch)
+
+    PROFILE.reset()
+    result_cache = None
+    if args.cache_dir:
+        result_cache = ResultCache(args.cache_dir, max_bytes=args.cache_max_bytes)
+        configure_result_cache(result_cache, ttl=args.cache_ttl)
+    rate_limits = RateLimitScheduler(max_retries=args.api_retries)
+    configure_rate_limits(rate_limits)
+    github_client = (
+        None if args.no_api_client else GitHubClient.from_environment(scheduler=rate_limits)
+    )
+    configure_github_client(github_client)
+    fetch_rate_limit_snapshot = (
+        (lambda: github_client.get_json("rate_limit")) if github_client is not None else None
+    )
+    rate_limits.refresh(fetch_rate_limit_snapshot)
+    if args.fetch_concurrency > 1:
+        configure_fetch_engine(AsyncFetchEngine(args.fetch_concurrency, scheduler=rate_limits))
 
     selection_requested = args.pr_selection
+    if args.query:
+        print(f"Searching PRs: {args.query}")
+        selection_requested = f"query:{args.query}"
+        try:
+            with PROFILE.phase("search"):
+                matches = search_pr_numbers(args.query)
+        except (*API_ERRORS, ValueError) as exc:
+            print(f"Error: {exc}")
+            matches = PRSelection()
+        else:
+            if args.pr_selection:
+                matches = PRSelection.from_numbers(pr for pr in matches if pr in selected_prs)
+                selection_requested += f" within {args.pr_selection}"
+            print(f"✓ Search matched {len(matches)} PR(s)")
+        selected_prs = matches
+        if not selected_prs:
+            print("Error: No PRs selected by the query")
+            if github_client is not None:
+                github_client.close()
+            if result_cache is not None:
+                result_cache.close()
+            sys.exit(1)
+
     selection_canonical = format_pr_selection(selected_prs)
     selection_tag = build_selection_tag(selected_prs, selection_canonical)
     os.makedirs(args.output_dir, exist_ok=True)
@@ -907,63 +3080,139 @@ def main() -> None:
         preview = format_pr_list_preview(selected_prs)
         print(
             f"Expanded PRs: count={len(selected_prs)} "
-            f"min={min(selected_prs)} max={max(selected_prs)} preview={preview}"
+            f"min={selected_prs[0]} max={selected_prs[-1]} preview={preview}"
         )
 
-    check_current_branch(args.base_branch)
+    snapshot_reader = GitObjectReader(max_blob_bytes=args.max_snapshot_bytes)
+    # The manifest costs a rev-parse per PR and a re-read of every output, so
+    # it is only kept for --incremental runs.
+    manifest = load_manifest(args.output_dir) if args.incremental else None
+    log_fetcher = FailedLogFetcher(jobs=args.log_jobs, cache=result_cache, scheduler=rate_limits)
+    log_window = LogWindow(
+        head_lines=args.log_head_lines,
+        tail_lines=args.log_tail_lines,
+        context_lines=args.log_context_lines,
+        full=args.full_logs,
+    )
+    configure_log_fetcher(log_fetcher)
 
     try:
-        fetch_remote_branches(args.remote)
+        if args.skip_remote_fetch:
+            print(f"Skipping blanket fetch from {args.remote}")
+        else:
+            with PROFILE.phase("fetch"):
+                fetch_remote_branches(args.remote)
 
         print(f"Collecting info for PR selection: {selection_canonical}...")
         pr_infos: List[Dict[str, str]] = []
         touched_files: Set[str] = set()
         touched_file_prs: Dict[str, Set[int]] = {}
+        pr_diff_stats: Dict[int, Dict[str, FileStat]] = {}
+        binary_files: Set[str] = set()
         missing_prs: List[int] = []
 
-        for pr_num in selected_prs:
+        candidates = selected_prs
+        unlisted = PRSelection()
+        filtered = bool(
+            args.state != "all" or args.filter_base or args.filter_author or args.filter_label
+        )
+        # Search results are known PRs; only explicit filters still need the listing.
+        if filtered or (args.prefilter and not args.query):
+            with PROFILE.phase("prefilter"):
+                # Listings stop once they would cost more queries than the
+                # lookups they save; filters are then checked per PR instead.
+                lookups = (
+                    math.ceil(len(selected_prs) / args.metadata_chunk_size)
+                    if args.metadata_chunk_size > 0
+                    else len(selected_prs)
+                )
+                prefiltered = prefilter_pr_selection(
+                    selected_prs,
+                    state=args.state,
+                    base=args.filter_base,
+                    author=args.filter_author,
+                    labels=args.filter_label,
+                    max_pages=max(1, lookups),
+                )
+            if prefiltered is not None:
+                candidates, dropped = prefiltered
+                # Without filters, every dropped number is one a lookup would not have found.
+                unlisted = PRSelection() if filtered else dropped
+            elif filtered:
+                print("  Filtering looked-up PRs by --state and --filter-* instead")
+
+        with PROFILE.phase("metadata"):
             try:
-                pr_info = get_pr_info(pr_num)
-                pr_infos.append(pr_info)
-                print(f"  PR #{pr_num}: {pr_info['title']}")
-            except (subprocess.CalledProcessError, json.JSONDecodeError, KeyError) as exc:
-                print(f"  PR #{pr_num}: Not found or inaccessible ({exc})")
-                missing_prs.append(pr_num)
+                prefetch_pr_metadata(candidates, args.metadata_chunk_size)
+            except (*API_ERRORS, ValueError) as exc:
+                print(f"Warning: Bulk metadata prefetch unavailable ({exc}); using per-PR lookups")
+
+            for pr_num, pr_info in iter_pipelined(candidates, lookup_pr_info, args.jobs):
+                if isinstance(pr_info, dict) and filtered and not pr_matches_filters(
+                    pr_info,
+                    args.state,
+                    args.filter_base,
+                    args.filter_author,
+                    args.filter_label,
+                ):
+                    print(f"  PR #{pr_num}: Skipped (does not match the filters)")
+                elif isinstance(pr_info, dict):
+                    pr_infos.append(pr_info)
+                    print(f"  PR #{pr_num}: {pr_info['title']}")
+                else:
+                    print(f"  PR #{pr_num}: Not found or inaccessible ({pr_info})")
+                    missing_prs.append(pr_num)
 
         if not pr_infos:
             print("Error: No valid PRs found for the requested selection")
             sys.exit(1)
 
+        with PROFILE.phase("fetch"):
+            pinned_heads = fetch_pr_head_refs([info["number"] for info in pr_infos], args.remote)
+
         successful_prs: List[Tuple[Dict[str, str], str]] = []
         successful_prs_with_logs: List[Tuple[Dict[str, str], str]] = []
         processed_prs: List[Dict[str, object]] = []
         processed_prs_with_logs: List[Dict[str, object]] = []
 
-        for pr_info in pr_infos:
+        for pr_info, fetched in iter_pipelined(pr_infos, fetch_pr_inputs, args.jobs):
             print(f"\n--- Processing PR #{pr_info['number']}: {pr_info['title']} ---")
 
-            try:
-                all_files = get_pr_changed_files(pr_info["number"])
-            except (subprocess.CalledProcessError, json.JSONDecodeError, KeyError) as exc:
-                print(f"Failed to retrieve files for PR #{pr_info['number']}: {exc}")
+            if fetched.get("filesError"):
+                print(f"Failed to retrieve files for PR #{pr_info['number']}: {fetched['filesError']}")
                 continue
 
+            all_files = fetched["files"]
             if not all_files:
                 print(f"No changed files found for PR #{pr_info['number']}")
                 continue
 
             print(f"Total changed files: {len(all_files)}")
 
-            included_files, _excluded_files = filter_excluded_files(all_files)
-
             try:
-                local_branch = checkout_pr_branch(pr_info, args.remote)
+                with PROFILE.phase("checkout"):
+                    if args.no_checkout:
+                        local_branch = resolve_pr_head_ref(pr_info, args.remote, pinned_heads)
+                    else:
+                        local_branch = checkout_pr_branch(pr_info, args.remote, pinned_heads)
             except subprocess.CalledProcessError:
                 print(f"Failed to checkout branch for PR #{pr_info['number']}")
                 continue
 
+            # The pre-pass diffs against the resolved head, so it runs after checkout.
+            with PROFILE.phase("numstat"):
+                diff_stats = collect_pr_diff_stats(args.base_branch, local_branch, all_files)
+            pr_diff_stats[pr_info["number"]] = diff_stats
+            binary_files.update(path for path, stat in diff_stats.items() if stat.binary)
+            included_files, _excluded_files = filter_excluded_files(
+                all_files, diff_stats, local_branch
+            )
+
             if included_files:
-                report_missing_files_on_checked_out_branch(included_files)
+                if args.no_checkout:
+                    report_missing_files_at_revision(included_files, local_branch)
+                else:
+                    report_missing_files_on_checked_out_branch(included_files)
 
             if included_files:
                 print(
@@ -979,26 +3228,14 @@ def main() -> None:
             for file_path in all_files:
                 touched_file_prs.setdefault(file_path, set()).add(pr_info["number"])
 
-            try:
-                comments = get_pr_comments(pr_info["number"])
-            except (subprocess.CalledProcessError, json.JSONDecodeError, KeyError) as exc:
-                print(f"Failed to retrieve comments for PR #{pr_info['number']}: {exc}")
-                comments = []
+            if fetched.get("commentsError"):
+                print(f"Failed to retrieve comments for PR #{pr_info['number']}: {fetched['commentsError']}")
+            comments = fetched["comments"]
 
-            try:
-                checks_with_logs: List[Dict[str, str]] = []
-                checks = get_pr_checks(pr_info["number"])
-            except (subprocess.CalledProcessError, json.JSONDecodeError, KeyError) as exc:
-                print(f"Failed to retrieve checks for PR #{pr_info['number']}: {exc}")
-                checks = []
-                checks_with_logs = []
-            else:
-                for check in checks:
-                    check_copy = dict(check)
-                    logs = get_failed_check_logs(check_copy)
-                    if logs:
-                        check_copy["logOutput"] = logs
-                    checks_with_logs.append(check_copy)
+            if fetched.get("checksError"):
+                print(f"Failed to retrieve checks for PR #{pr_info['number']}: {fetched['checksError']}")
+            checks = fetched["checks"]
+            checks_with_logs = fetched["checksWithLogs"]
 
             output_file = os.path.join(
                 args.output_dir, f"pr-{pr_info['number']}-implementation.txt"
@@ -1006,105 +3243,150 @@ def main() -> None:
             output_file_with_logs = os.path.join(
                 args.output_dir, f"pr-{pr_info['number']}-implementation-with-logs.txt"
             )
-            if run_big_picture(
-                pr_info,
-                included_files,
-                _excluded_files,
-                all_files,
-                comments,
-                checks,
-                output_file,
-                include_logs=False,
-                base_branch=args.base_branch,
-                local_branch=local_branch,
-            ):
-                successful_prs.append((pr_info, output_file))
-                processed_prs.append(
-                    {
-                        "info": pr_info,
-                        "file": output_file,
-                        "local_branch": local_branch,
-                        "files": included_files,
-                    }
+            artifact_inputs = None
+            if manifest is not None:
+                artifact_inputs = pr_artifact_inputs(
+                    pr_info,
+                    args.base_branch,
+                    local_branch,
+                    included_files,
+                    _excluded_files,
+                    all_files,
+                    comments,
+                    checks,
+                    checks_with_logs,
+                    max_diff_bytes=args.max_diff_bytes,
+                    max_file_diff_bytes=args.max_file_diff_bytes,
+                    log_window=log_window,
+                    diff_budget_bytes=args.diff_budget_bytes,
                 )
-            if run_big_picture(
-                pr_info,
-                included_files,
-                _excluded_files,
-                all_files,
-                comments,
-                checks_with_logs,
-                output_file_with_logs,
-                include_logs=True,
-                base_branch=args.base_branch,
-                local_branch=local_branch,
+            pr_outputs = [output_file, output_file_with_logs]
+            if (
+                manifest is not None
+                and artifact_inputs is not None
+                and artifact_is_current(manifest, pr_outputs, artifact_inputs)
             ):
-                successful_prs_with_logs.append((pr_info, output_file_with_logs))
-                processed_prs_with_logs.append(
-                    {
-                        "info": pr_info,
-                        "file": output_file_with_logs,
-                        "local_branch": local_branch,
-                        "files": included_files,
-                    }
-                )
+                print(f"✓ Reusing unchanged outputs for PR #{pr_info['number']}")
+            else:
+                with PROFILE.phase("diff"):
+                    document = build_pr_document(
+                        pr_info,
+                        included_files,
+                        _excluded_files,
+                        all_files,
+                        comments,
+                        base_branch=args.base_branch,
+                        local_branch=local_branch,
+                        max_diff_bytes=args.max_diff_bytes,
+                        max_file_diff_bytes=args.max_file_diff_bytes,
+                        diff_stats=diff_stats,
+                        diff_budget_bytes=args.diff_budget_bytes,
+                    )
+                    write_pr_documents(
+                        document,
+                        [
+                            (output_file, checks, False),
+                            (output_file_with_logs, checks_with_logs, True),
+                        ],
+                        log_window,
+                    )
+            if manifest is not None and artifact_inputs is not None:
+                record_artifact(manifest, pr_outputs, artifact_inputs)
+
+            successful_prs.append((pr_info, output_file))
+            processed_prs.append(
+                {
+                    "info": pr_info,
+                    "file": output_file,
+                    "local_branch": local_branch,
+                    "files": included_files,
+                }
+            )
+            successful_prs_with_logs.append((pr_info, output_file_with_logs))
+            processed_prs_with_logs.append(
+                {
+                    "info": pr_info,
+                    "file": output_file_with_logs,
+                    "local_branch": local_branch,
+                    "files": included_files,
+                }
+            )
 
         if successful_prs:
             requested_count = len(selected_prs)
             processed_numbers = {info["number"] for info, _ in successful_prs}
             processed_count = len(processed_numbers)
-            skipped_prs = [pr for pr in selected_prs if pr not in processed_numbers]
+            skipped_prs = candidates.difference(processed_numbers)
             print(
                 f"\nRequested PR count: {requested_count}; "
                 f"processed PR count: {processed_count}"
             )
-            if missing_prs:
-                print(f"Missing/inaccessible PRs: {', '.join(map(str, missing_prs))}")
+            if missing_prs or unlisted:
+                missing = PRSelection(
+                    PRSelection.from_numbers(missing_prs).ranges() + unlisted.ranges()
+                )
+                print(f"Missing/inaccessible PRs: {format_pr_selection(missing)}")
             if skipped_prs:
-                print(f"Skipped PRs after processing: {', '.join(map(str, skipped_prs))}")
+                print(f"Skipped PRs after processing: {format_pr_selection(skipped_prs)}")
 
             master_output = os.path.join(
                 args.output_dir, f"pr-comparison-{selection_tag}.txt"
             )
-            create_master_comparison(
-                successful_prs,
-                selection_requested,
-                selection_canonical,
-                selected_prs,
-                master_output,
-            )
+            with PROFILE.phase("master comparison"):
+                create_master_comparison(
+                    successful_prs,
+                    selection_requested,
+                    selection_canonical,
+                    selected_prs,
+                    master_output,
+                )
 
             summary_output = os.path.join(
                 args.output_dir, f"pr-summaries-{selection_tag}.txt"
             )
-            create_summary_compilation(
-                successful_prs,
-                selection_requested,
-                selection_canonical,
-                selected_prs,
-                summary_output,
-            )
+            with PROFILE.phase("summary compilation"):
+                create_summary_compilation(
+                    successful_prs,
+                    selection_requested,
+                    selection_canonical,
+                    selected_prs,
+                    summary_output,
+                    diff_stats=pr_diff_stats,
+                )
 
             touched_output = os.path.join(
                 args.output_dir, f"pr-touched-files-{selection_tag}.txt"
             )
-            create_touched_files_compilation(
-                touched_files,
-                touched_file_prs,
-                args.base_branch,
-                selection_requested,
-                selection_canonical,
-                selected_prs,
-                touched_output,
-                master_output,
-            )
-            round_robin_outputs = create_round_robin_comparisons(
-                processed_prs,
-                args.output_dir,
-                selection_requested,
-                selection_canonical,
-                selected_prs,
-            )
+            with PROFILE.phase("touched files compilation"):
+                create_touched_files_compilation(
+                    touched_files,
+                    touched_file_prs,
+                    args.base_branch,
+                    selection_requested,
+                    selection_canonical,
+                    selected_prs,
+                    touched_output,
+                    master_output,
+                    append_master=not args.reference_master,
+                    reader=snapshot_reader,
+                    binary_files=binary_files,
+                )
+            round_robin_outputs: List[str] = []
+            if args.round_robin_mode != "off":
+                with PROFILE.phase("round-robin"):
+                    round_robin_outputs = create_round_robin_comparisons(
+                        processed_prs,
+                        args.output_dir,
+                        selection_requested,
+                        selection_canonical,
+                        selected_prs,
+                        max_diff_bytes=args.max_diff_bytes,
+                        max_file_diff_bytes=args.max_file_diff_bytes,
+                        jobs=args.jobs,
+                        mode=args.round_robin_mode,
+                        manifest=manifest,
+                        reuse=args.incremental,
+                    )
 
             print(f"\n✓ Successfully processed {len(successful_prs)} PR(s) (without logs)")
             print(f"✓ Individual files: {args.output_dir}/pr-{{num}}-implementation.txt")
@@ -1123,41 +3405,48 @@ def main() -> None:
             master_output_with_logs = os.path.join(
                 args.output_dir, f"pr-comparison-{selection_tag}-with-logs.txt"
             )
-            create_master_comparison(
-                successful_prs_with_logs,
-                selection_requested,
-                selection_canonical,
-                selected_prs,
-                master_output_with_logs,
-                include_logs=True,
-            )
+            with PROFILE.phase("master comparison"):
+                create_master_comparison(
+                    successful_prs_with_logs,
+                    selection_requested,
+                    selection_canonical,
+                    selected_prs,
+                    master_output_with_logs,
+                    include_logs=True,
+                )
 
             summary_output_with_logs = os.path.join(
                 args.output_dir, f"pr-summaries-{selection_tag}-with-logs.txt"
             )
-            create_summary_compilation(
-                successful_prs_with_logs,
-                selection_requested,
-                selection_canonical,
-                selected_prs,
-                summary_output_with_logs,
-                include_logs=True,
-            )
+            with PROFILE.phase("summary compilation"):
+                create_summary_compilation(
+                    successful_prs_with_logs,
+                    selection_requested,
+                    selection_canonical,
+                    selected_prs,
+                    summary_output_with_logs,
+                    include_logs=True,
+                    diff_stats=pr_diff_stats,
+                )
 
             touched_output_with_logs = os.path.join(
                 args.output_dir, f"pr-touched-files-{selection_tag}-with-logs.txt"
             )
-            create_touched_files_compilation(
-                touched_files,
-                touched_file_prs,
-                args.base_branch,
-                selection_requested,
-                selection_canonical,
-                selected_prs,
-                touched_output_with_logs,
-                master_output_with_logs,
-                include_logs=True,
-            )
+            with PROFILE.phase("touched files compilation"):
+                create_touched_files_compilation(
+                    touched_files,
+                    touched_file_prs,
+                    args.base_branch,
+                    selection_requested,
+                    selection_canonical,
+                    selected_prs,
+                    touched_output_with_logs,
+                    master_output_with_logs,
+                    include_logs=True,
+                    append_master=not args.reference_master,
+                    reader=snapshot_reader,
+                    binary_files=binary_files,
+                )
 
             print(f"\n✓ Successfully processed {len(successful_prs_with_logs)} PR(s) (with logs)")
             print(f"✓ Individual files (with logs): {args.output_dir}/pr-{{num}}-implementation-with-logs.txt")
@@ -1167,10 +3456,45 @@ def main() -> None:
         else:
             print("\nNo PRs were successfully processed (with logs)")
 
+        if successful_prs and manifest is not None:
+            print(f"✓ Manifest: {write_manifest(args.output_dir, manifest)}")
+
     except KeyboardInterrupt:
         print("\nInterrupted by user")
     finally:
-        if not args.no_cleanup:
+        snapshot_reader.close()
+        log_fetcher.close()
+        if github_client is not None:
+            print(
+                f"GitHub API: {github_client.requests} request(s) over "
+                f"{github_client.connections_opened} connection(s)"
+            )
+        if rate_limits.throttled:
+            rate_limits.refresh(fetch_rate_limit_snapshot)
+        for line in rate_limits.report_lines():
+            print(line)
+        if github_client is not None:
+            github_client.close()
+        if result_cache is not None:
+            print(
+                f"Cache: {result_cache.hits} hit(s), {result_cache.misses} miss(es) "
+                f"in {args.cache_dir}"
+            )
+            result_cache.close()
+        record_profile_counters(
+            github_client=github_client,
+            result_cache=result_cache,
+            log_fetcher=log_fetcher,
+            snapshot_reader=snapshot_reader,
+            rate_limits=rate_limits,
+        )
+        for line in PROFILE.summary_lines():
+            print(line)
+        if args.profile:
+            for line in TIMINGS.report_lines():
+                print(line)
+            print(f"Profile: {PROFILE.write_json(args.profile)}")
+        if not args.no_cleanup and not args.no_checkout:
             try:
                 checkout_base_branch(args.base_branch)
                 print(f"✓ Returned to {args.base_branch} branch")
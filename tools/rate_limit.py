@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+rate_limit - Shared GitHub rate-limit scheduler for the repo tools
+
+GitHub meters REST ("core"), GraphQL and search requests against separate
+hourly budgets and adds secondary limits on bursts. RateLimitScheduler
+tracks each budget from `X-RateLimit-*` response headers (or from the free
+`rate_limit` endpoint when requests go through `gh`), spreads the last part
+of a budget evenly until its reset instead of running into a wall, and
+decides when a failed request is worth retrying: rate-limit 403s and 429s
+wait as long as GitHub asks, and 5xx responses back off with jitter.
+"""
+
+import http.client
+import json
+import math
+import random
+import re
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Mapping, Sequence, Set, Tuple
+
+
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF_BASE = 1.0
+DEFAULT_BACKOFF_CAP = 60.0
+# GitHub asks clients to wait at least a minute after a secondary rate limit
+# that carries no retry-after or reset hint.
+SECONDARY_LIMIT_WAIT = 60.0
+# Below this share of a budget, requests are spread evenly until its reset.
+DEFAULT_RESERVE_FRACTION = 0.1
+# Waits at least this long are announced, once per budget window, so a
+# stalled run does not look hung.
+WAIT_NOTICE_SECONDS = 5.0
+
+RETRYABLE_SERVER_STATUSES = {500, 502, 503, 504}
+GH_HTTP_STATUS = re.compile(r"\bHTTP (\d{3})\b")
+
+
+def gh_resource(args: Sequence[str]) -> str:
+    """Return the budget a `gh` invocation draws from ("core", "graphql" or "search")."""
+    args = list(args)
+    if args and args[0] == "gh":
+        args = args[1:]
+    if not args:
+        return "core"
+    if args[0] == "api":
+        endpoint = next((arg for arg in args[1:] if not arg.startswith("-")), "")
+        if endpoint.lstrip("/") == "graphql":
+            return "graphql"
+        if endpoint.lstrip("/").startswith("search/"):
+            return "search"
+        return "core"
+    if args[0] == "run":
+        return "core"
+    # gh pr/repo/issue subcommands are implemented with GraphQL.
+    return "graphql"
+
+
+def api_resource(path: str) -> str:
+    """Return the budget a GitHubClient request path draws from."""
+    path = path.split("?", 1)[0].rstrip("/")
+    if path.endswith("/graphql") or path == "graphql":
+        return "graphql"
+    if "search/" in path:
+        return "search"
+    return "core"
+
+
+@dataclass
+class RateLimitBudget:
+    """Last known state of one rate-limit resource; `reset` is epoch seconds."""
+
+    resource: str
+    limit: int
+    remaining: int
+    reset: float
+    used: int = 0
+
+
+class RateLimitScheduler:
+    """Thread-safe pacing and retry policy shared by every GitHub caller in a run.
+
+    reserve() returns how long a caller should wait before its next request
+    (callers on an event loop sleep asynchronously); acquire() sleeps for it.
+    retry_delay() returns how long to wait before retrying a failed request,
+    or None when the failure should be raised.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff_base: float = DEFAULT_BACKOFF_BASE,
+        backoff_cap: float = DEFAULT_BACKOFF_CAP,
+        reserve_fraction: float = DEFAULT_RESERVE_FRACTION,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.time,
+        jitter: Callable[[], float] = random.random,
+    ) -> None:
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.reserve_fraction = reserve_fraction
+        self._sleep = sleep
+        self._clock = clock
+        self._jitter = jitter
+        self._lock = threading.Lock()
+        self._next_slot: Dict[str, float] = {}
+        self._noticed: Set[Tuple[str, float, bool]] = set()
+        self.budgets: Dict[str, RateLimitBudget] = {}
+        # Resources this run sent requests against; only these are reported.
+        self.used_resources: Set[str] = set()
+        self.retries = 0
+        self.waited = 0.0
+
+    def reserve(self, resource: str) -> float:
+        """Claim the next request slot for `resource` and return the seconds to wait."""
+        notice = ""
+        with self._lock:
+            self.used_resources.add(resource)
+            now = self._clock()
+            budget = self.budgets.get(resource)
+            if budget is None:
+                return 0.0
+            if budget.reset <= now:
+                # The window rolled over; the next response will report the new budget.
+                self._next_slot.pop(resource, None)
+                return 0.0
+
+            if budget.remaining <= 0:
+                wait = budget.reset - now + 1.0
+            else:
+                reserve = math.ceil(budget.limit * self.reserve_fraction)
+                interval = 0.0
+                if budget.remaining <= reserve:
+                    interval = (budget.reset - now) / budget.remaining
+                slot = max(now, self._next_slot.get(resource, now))
+                self._next_slot[resource] = slot + interval
+                wait = slot - now
+            exhausted = budget.remaining <= 0
+            notice_key = (resource, budget.reset, exhausted)
+            if wait >= WAIT_NOTICE_SECONDS and notice_key not in self._noticed:
+                self._noticed.add(notice_key)
+                reset = time.strftime("%H:%M:%S", time.localtime(budget.reset))
+                reason = "exhausted" if exhausted else f"low ({budget.remaining} left)"
+                notice = (
+                    f"Rate limit {resource} budget {reason}; waiting {wait:.0f}s "
+                    f"(resets {reset})"
+                )
+            # Count this request against the local estimate until headers correct it.
+            budget.remaining = max(0, budget.remaining - 1)
+            budget.used += 1
+            self.waited += wait
+        if notice:
+            print(notice)
+        return wait
+
+    @property
+    def throttled(self) -> bool:
+        """Whether the run retried or waited, making a closing budget snapshot worth its call."""
+        return bool(self.retries or self.waited)
+
+    def acquire(self, resource: str) -> None:
+        """Block until a request against `resource` may be sent."""
+        self.sleep(self.reserve(resource))
+
+    def sleep(self, seconds: float) -> None:
+        if seconds > 0:
+            self._sleep(seconds)
+
+    def observe(self, headers: Mapping[str, str], resource: str | None = None) -> None:
+        """Update a budget from lower-cased `x-ratelimit-*` response headers."""
+        try:
+            limit = int(headers["x-ratelimit-limit"])
+            remaining = int(headers["x-ratelimit-remaining"])
+            reset = float(headers["x-ratelimit-reset"])
+            used = int(headers.get("x-ratelimit-used") or limit - remaining)
+        except (KeyError, ValueError):
+            return
+        name = headers.get("x-ratelimit-resource") or resource or "core"
+        with self._lock:
+            self.budgets[name] = RateLimitBudget(name, limit, remaining, reset, used)
+
+    def observe_snapshot(self, payload: Any) -> None:
+        """Update every budget from a `GET /rate_limit` payload."""
+        resources = (payload or {}).get("resources") if isinstance(payload, dict) else None
+        for name, entry in (resources or {}).items():
+            if not isinstance(entry, dict):
+                continue
+            self.observe(
+                {
+                    "x-ratelimit-limit": str(entry.get("limit", "")),
+                    "x-ratelimit-remaining": str(entry.get("remaining", "")),
+                    "x-ratelimit-reset": str(entry.get("reset", "")),
+                    "x-ratelimit-used": str(entry.get("used", "")),
+                },
+                resource=name,
+            )
+
+    def refresh(self, fetch_snapshot: Callable[[], Any] | None = None) -> bool:
+        """Reload every budget from the rate_limit endpoint, which costs no budget.
+
+        `fetch_snapshot` returns the endpoint's payload (for example through a
+        GitHubClient); by default `gh api rate_limit` is used. Returns False
+        when the snapshot could not be read.
+        """
+        try:
+            if fetch_snapshot is not None:
+                payload = fetch_snapshot()
+            else:
+                output = subprocess.run(
+                    ["gh", "api", "rate_limit"], capture_output=True, text=True, check=True
+                ).stdout
+                payload = json.loads(output)
+        except (OSError, ValueError, RuntimeError, http.client.HTTPException, subprocess.CalledProcessError):
+            return False
+        self.observe_snapshot(payload)
+        return True
+
+    def _backoff(self, attempt: int) -> float:
+        ceiling = min(self.backoff_cap, self.backoff_base * (2**attempt))
+        return ceiling / 2 + self._jitter() * ceiling / 2
+
+    def retry_delay(
+        self,
+        attempt: int,
+        status: int,
+        headers: Mapping[str, str] | None = None,
+        message: str = "",
+    ) -> float | None:
+        """Return seconds to wait before retry number `attempt` + 1, or None to give up.
+
+        Primary rate limits wait for the budget's reset, secondary limits for
+        retry-after (or at least SECONDARY_LIMIT_WAIT), and 5xx responses for
+        a jittered exponential backoff.
+        """
+        if attempt >= self.max_retries:
+            return None
+        headers = headers or {}
+        delay: float | None = None
+        if status in (403, 429):
+            retry_after = headers.get("retry-after")
+            if retry_after and retry_after.strip().isdigit():
+                delay = float(retry_after)
+            elif headers.get("x-ratelimit-remaining") == "0" and headers.get("x-ratelimit-reset"):
+                try:
+                    delay = max(0.0, float(headers["x-ratelimit-reset"]) - self._clock()) + 1.0
+                except ValueError:
+                    delay = None
+            if delay is None and (status == 429 or "rate limit" in message.lower()):
+                delay = max(SECONDARY_LIMIT_WAIT, self._backoff(attempt))
+        elif status in RETRYABLE_SERVER_STATUSES:
+            delay = self._backoff(attempt)
+
+        if delay is None:
+            return None
+        with self._lock:
+            self.retries += 1
+            self.waited += delay
+        return delay
+
+    def retry_delay_for_gh(self, attempt: int, stderr: str) -> float | None:
+        """retry_delay for a failed `gh` call, judged from its error output."""
+        match = GH_HTTP_STATUS.search(stderr or "")
+        if match:
+            status = int(match.group(1))
+        elif "rate limit" in (stderr or "").lower():
+            status = 403
+        else:
+            return None
+        return self.retry_delay(attempt, status, message=stderr)
+
+    def report_lines(self) -> List[str]:
+        """Describe the budgets this run used and how much pacing and retrying cost."""
+        lines = []
+        with self._lock:
+            for name in sorted(self.used_resources & set(self.budgets)):
+                budget = self.budgets[name]
+                reset = time.strftime("%H:%M:%S", time.localtime(budget.reset))
+                lines.append(
+                    f"Rate limit {name}: {budget.remaining}/{budget.limit} remaining "
+                    f"(resets {reset})"
+                )
+            if self.retries or self.waited:
+                lines.append(
+                    f"Rate limit: {self.retries} retr{'y' if self.retries == 1 else 'ies'}, "
+                    f"{self.waited:.1f}s spent waiting"
+                )
+        return lines
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+run_profile - Per-phase timing and resource counters for the batch tools
+
+RunProfile records wall time per named phase (entered with `with
+PROFILE.phase("diff"):`), free-form counters, and at the end folds in the
+per-command timings from command_runner, process I/O byte counts and peak
+RSS. summary_lines() renders the table printed at the end of a run and
+to_dict() is what `--profile out.json` writes.
+
+Phases entered on worker threads overlap, so their summed seconds can exceed
+the run's wall time; they measure where work was spent, not the critical
+path.
+"""
+
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterator, List
+
+from command_runner import TIMINGS, CommandTimings
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None  # type: ignore[assignment]
+
+
+PROFILE_VERSION = 1
+
+
+@dataclass
+class PhaseStat:
+    """Accumulated wall time of one phase."""
+
+    calls: int = 0
+    seconds: float = 0.0
+
+
+def peak_rss_bytes() -> Dict[str, int]:
+    """Return peak resident set size of this process and its reaped children."""
+    if resource is None:
+        return {}
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    scale = 1 if sys.platform == "darwin" else 1024
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale,
+    }
+
+
+def process_io_bytes() -> Dict[str, int]:
+    """Return bytes read and written by this process, where the platform reports them."""
+    try:
+        with open("/proc/self/io", encoding="ascii") as io_file:
+            fields = dict(line.split(":", 1) for line in io_file if ":" in line)
+    except OSError:
+        return {}
+    return {
+        "readBytes": int(fields.get("rchar", 0)),
+        "writtenBytes": int(fields.get("wchar", 0)),
+    }
+
+
+class RunProfile:
+    """Thread-safe phase timer and counter set for one tool run."""
+
+    def __init__(self, timings: CommandTimings = TIMINGS) -> None:
+        self.timings = timings
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self.phases: Dict[str, PhaseStat] = {}
+        self.counters: Dict[str, int] = {}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._started = time.perf_counter()
+            self.phases.clear()
+            self.counters.clear()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time the enclosed block under `name`, even when it raises."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                stat = self.phases.setdefault(name, PhaseStat())
+                stat.calls += 1
+                stat.seconds += elapsed
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def set_counter(self, name: str, value: int) -> None:
+        with self._lock:
+            self.counters[name] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Snapshot everything recorded so far as JSON-ready data."""
+        with self._lock:
+            phases = {name: asdict(stat) for name, stat in self.phases.items()}
+            counters = dict(self.counters)
+            wall_seconds = time.perf_counter() - self._started
+        commands = {kind: asdict(stat) for kind, stat in dict(self.timings.stats).items()}
+        counters.setdefault("subprocesses", sum(stat["calls"] for stat in commands.values()))
+        return {
+            "version": PROFILE_VERSION,
+            "wallSeconds": round(wall_seconds, 3),
+            "phases": phases,
+            "commands": commands,
+            "counters": counters,
+            "io": process_io_bytes(),
+            "peakRssBytes": peak_rss_bytes(),
+        }
+
+    def write_json(self, path: str) -> str:
+        with open(path, "w", encoding="utf-8") as profile_file:
+            json.dump(self.to_dict(), profile_file, indent=2, sort_keys=True)
+            profile_file.write("\n")
+        return path
+
+    def summary_lines(self) -> List[str]:
+        """Render phases, counters and resource use as a fixed-width table."""
+        data = self.to_dict()
+        wall = data["wallSeconds"] or 1.0
+        lines = [f"Profile: {data['wallSeconds']:.2f}s wall"]
+        ranked = sorted(data["phases"].items(), key=lambda item: item[1]["seconds"], reverse=True)
+        if ranked:
+            width = max(len(name) for name, _ in ranked)
+            lines.append(f"  {'phase'.ljust(width)}  {'calls':>6}  {'seconds':>9}  {'% wall':>6}")
+            for name, stat in ranked:
+                share = 100.0 * stat["seconds"] / wall
+                lines.append(
+                    f"  {name.ljust(width)}  {stat['calls']:>6}  {stat['seconds']:>9.2f}  {share:>6.1f}"
+                )
+        for name, value in sorted(data["counters"].items()):
+            lines.append(f"  {name}: {value}")
+        io_bytes = data["io"]
+        if io_bytes:
+            lines.append(
+                f"  I/O: {io_bytes['readBytes']} byte(s) read, {io_bytes['writtenBytes']} written"
+            )
+        rss = data["peakRssBytes"]
+        if rss:
+            lines.append(
+                f"  Peak RSS: {rss['self'] / 2**20:.1f} MiB (children {rss['children'] / 2**20:.1f} MiB)"
+            )
+        return lines
+
+
+# Process-wide profile shared by the tools' phases.
+PROFILE = RunProfile()
@@ -3,9 +3,14 @@
 
 from __future__ import annotations
 
+import contextlib
+import time
 import importlib.util
+import io
 import json
 import os
+import subprocess
+import sys
 import tempfile
 import unittest
 from pathlib import Path
@@ -14,12 +19,23 @@ from unittest import mock
 
 MODULE_PATH = Path(__file__).with_name("pr_batch_big_picture.py")
 REPO_ROOT = MODULE_PATH.parent.parent
+if str(MODULE_PATH.parent) not in sys.path:
+    sys.path.insert(0, str(MODULE_PATH.parent))
 SPEC = importlib.util.spec_from_file_location("pr_batch_big_picture", MODULE_PATH)
 if SPEC is None or SPEC.loader is None:
     raise RuntimeError(f"Could not load module spec for {MODULE_PATH}")
 MODULE = importlib.util.module_from_spec(SPEC)
 SPEC.loader.exec_module(MODULE)
 
+from async_fetch import AsyncFetchEngine  # noqa: E402
+from batch_cache import ResultCache  # noqa: E402
+from bench_batch_tools import BenchShape, compare_results, run_scale  # noqa: E402
+from check_logs import FailedLogFetcher  # noqa: E402
+from git_object_reader import GitBlob  # noqa: E402
+from github_client import GitHubAPIError, GitHubClient  # noqa: E402
+from rate_limit import RateLimitScheduler  # noqa: E402
+from run_profile import RunProfile  # noqa: E402
+
 
 class PrBatchBigPictureTests(unittest.TestCase):
     def setUp(self) -> None:
@@ -29,6 +45,122 @@ class PrBatchBigPictureTests(unittest.TestCase):
     def tearDown(self) -> None:
         os.chdir(self._original_cwd)
         MODULE.get_repo_slug.cache_clear()
+        MODULE.clear_prefetched_pr_data()
+        MODULE.configure_result_cache(None)
+        MODULE.configure_log_fetcher(None)
+        MODULE.configure_github_client(None)
+        MODULE.configure_fetch_engine(None)
+        MODULE.configure_exclusion_rules(MODULE.ExclusionRules())
+
+    def test_parse_pr_selection_keeps_huge_ranges_as_intervals(self) -> None:
+        selection = MODULE.parse_pr_selection("#7-9, 1-200000, 300000-300002, 5")
+
+        self.assertEqual(selection.ranges(), [(1, 200000), (300000, 300002)])
+        self.assertEqual(len(selection), 200003)
+        self.assertEqual((selection[0], selection[199999], selection[-1]), (1, 200000, 300002))
+        self.assertEqual(selection[-2:], [300001, 300002])
+        self.assertIn(300001, selection)
+        self.assertNotIn(250000, selection)
+        self.assertEqual(MODULE.format_pr_selection(selection), "1-200000,300000-300002")
+        self.assertTrue(
+            MODULE.build_selection_tag(selection, "1-200000,300000-300002").startswith(
+                "1-300002-200003prs-"
+            )
+        )
+        self.assertEqual(
+            MODULE.format_pr_selection(selection.difference([1, 5, 200000, 300001])),
+            "2-4,6-199999,300000,300002",
+        )
+        self.assertEqual(MODULE.parse_pr_selection("3,1-2"), [1, 2, 3])
+        self.assertEqual(MODULE.format_pr_selection([5, 3, 4, 9]), "3-5,9")
+
+    def test_prefilter_lists_prs_newest_first_and_stops_below_selection(self) -> None:
+        # Every third number up to 600 is a PR, listed newest first, 100 per page.
+        numbers = list(range(600, 0, -3))
+        queries = []
+
+        def run_query(query, owner, name):
+            queries.append(query)
+            offset = int(query.split('after: "c')[1].split('"')[0]) if "after:" in query else 0
+            page = numbers[offset : offset + 100]
+            return {
+                "pullRequests": {
+                    "pageInfo": {"hasNextPage": offset + 100 < len(numbers), "endCursor": f"c{offset + 100}"},
+                    "nodes": [
+                        {"number": number, "author": {"login": "alice" if number % 2 else "bob"}}
+                        for number in page
+                    ],
+                }
+            }
+
+        selection = MODULE.parse_pr_selection("280-290,5000")
+        with mock.patch.object(MODULE, "_run_repository_query", side_effect=run_query), mock.patch.object(
+            MODULE, "get_repo_slug", return_value="o/r"
+        ), contextlib.redirect_stdout(io.StringIO()) as output:
+            candidates, dropped = MODULE.prefilter_pr_selection(selection, base="main", labels=["bug"])
+            by_author, _ = MODULE.prefilter_pr_selection(selection, author="alice")
+            queries.clear()
+            partial, _ = MODULE.prefilter_pr_selection(MODULE.parse_pr_selection("1-600"), max_pages=1)
+            partial_queries = len(queries)
+            # Page one covers ~300 numbers; reaching #30 would take three pages.
+            old_window, old_dropped = MODULE.prefilter_pr_selection(
+                MODULE.parse_pr_selection("1-30"), max_pages=2
+            )
+            old_queries = len(queries) - partial_queries
+
+        self.assertEqual(list(candidates), [282, 285, 288])
+        # Dropped numbers are named, the way missing PRs are reported.
+        self.assertEqual(MODULE.format_pr_selection(dropped), "280-281,283-284,286-287,289-290,5000")
+        self.assertIn(
+            "Skipped (not pull requests or not matching the filters): 280-281,283-284,286-287,289-290,5000",
+            output.getvalue(),
+        )
+        self.assertEqual(list(by_author), [285])
+        self.assertEqual(partial_queries, 1)
+        self.assertIn('baseRefName: "main"', MODULE.build_pr_listing_query(None, "merged", "main", ["bug"]))
+        self.assertIn("states: [MERGED]", MODULE.build_pr_listing_query(None, "merged"))
+        # One page reaches down to #303; numbers below it are left for per-PR lookups.
+        self.assertEqual(list(partial.window(303, 600)), list(range(303, 601, 3)))
+        self.assertEqual(partial.window(1, 302).ranges(), [(1, 302)])
+        self.assertEqual(old_queries, 1)
+        self.assertEqual(old_window.ranges(), [(1, 30)])
+        self.assertFalse(old_dropped)
+
+        # Numbers left unlisted are filtered client-side from their looked-up metadata.
+        info = {"state": "MERGED", "base": "main", "author": "alice", "labels": ["bug", "ui"]}
+        self.assertTrue(MODULE.pr_matches_filters(info, "merged", "main", "alice", ["docs", "bug"]))
+        self.assertFalse(MODULE.pr_matches_filters(info, "open"))
+        self.assertFalse(MODULE.pr_matches_filters(info, base="release"))
+        self.assertFalse(MODULE.pr_matches_filters(info, author="bob"))
+        self.assertFalse(MODULE.pr_matches_filters(info, labels=["docs"]))
+
+    def test_search_pr_numbers_scopes_query_and_follows_pages(self) -> None:
+        pages = [
+            {"issueCount": 1500, "pageInfo": {"hasNextPage": True, "endCursor": "c1"}, "nodes": [{"number": 9}, {"number": 4}]},
+            {"issueCount": 1500, "pageInfo": {"hasNextPage": False, "endCursor": "c2"}, "nodes": [{"number": 5}, {}]},
+        ]
+        calls = []
+
+        def run_graphql(query, variables):
+            calls.append((query, variables))
+            return {"data": {"search": pages[len(calls) - 1]}}
+
+        stdout = io.StringIO()
+        with mock.patch.object(MODULE, "_run_graphql", side_effect=run_graphql), mock.patch.object(
+            MODULE, "get_repo_slug", return_value="o/r"
+        ), contextlib.redirect_stdout(stdout):
+            selection = MODULE.search_pr_numbers("is:merged base:main label:release")
+
+        self.assertEqual(selection.ranges(), [(4, 5), (9, 9)])
+        self.assertEqual(calls[0][1], {"q": "repo:o/r is:pr is:merged base:main label:release"})
+        self.assertIn('after: "c1"', calls[1][0])
+        self.assertIn("matched 1500 PRs", stdout.getvalue())
+
+        with mock.patch.object(MODULE, "_run_graphql", return_value=None), mock.patch.object(
+            MODULE, "get_repo_slug", return_value="o/r"
+        ):
+            with self.assertRaises(ValueError):
+                MODULE.search_pr_numbers("repo:o/r is:pr")
 
     def test_should_include_review_entry_for_empty_body_actions(self) -> None:
         self.assertTrue(MODULE.should_include_review_entry({"state": "APPROVED", "body": ""}))
@@ -38,7 +170,8 @@ class PrBatchBigPictureTests(unittest.TestCase):
         self.assertFalse(MODULE.should_include_review_entry({"state": "COMMENTED", "body": ""}))
 
     def test_get_pr_comments_includes_bare_review_actions_and_inline_threads(self) -> None:
-        def fake_run_command(cmd: str, check: bool = True, capture_output: bool = True) -> str:
+        def fake_run_command(args: list, check: bool = True, capture_output: bool = True) -> str:
+            cmd = " ".join(args)
             if "--json comments,reviews" in cmd:
                 return json.dumps(
                     {
@@ -167,24 +300,24 @@ class PrBatchBigPictureTests(unittest.TestCase):
         self.assertIn("(no content)", text)
 
     def test_create_touched_files_compilation_can_include_deleted_path_source(self) -> None:
-        def fake_run_command(cmd: str, check: bool = True, capture_output: bool = True) -> str:
-            expected = "git show HEAD:package-lock.json"
-            if cmd == expected:
-                return '{\n  "name": "fixture"\n}\n'
-            raise AssertionError(f"Unexpected command: {cmd}")
+        class FakeReader:
+            def read(self, spec: str):
+                if spec == "HEAD:package-lock.json":
+                    return GitBlob(spec, "ok", "blob", 24, '{\n  "name": "fixture"\n}\n')
+                raise AssertionError(f"Unexpected object spec: {spec}")
 
         with tempfile.TemporaryDirectory() as tmpdir:
             output_file = str(Path(tmpdir) / "touched.txt")
-            with mock.patch.object(MODULE, "run_command", side_effect=fake_run_command):
-                ok = MODULE.create_touched_files_compilation(
-                    touched_files={"package-lock.json"},
-                    touched_file_prs={"package-lock.json": {78}},
-                    base_branch="HEAD",
-                    selection_requested="78",
-                    selection_canonical="78",
-                    selected_prs=[78],
-                    output_file=output_file,
-                )
+            ok = MODULE.create_touched_files_compilation(
+                touched_files={"package-lock.json"},
+                touched_file_prs={"package-lock.json": {78}},
+                base_branch="HEAD",
+                selection_requested="78",
+                selection_canonical="78",
+                selected_prs=[78],
+                output_file=output_file,
+                reader=FakeReader(),
+            )
 
             self.assertTrue(ok)
             text = Path(output_file).read_text(encoding="utf-8")
@@ -231,8 +364,8 @@ class PrBatchBigPictureTests(unittest.TestCase):
     def test_checkout_pr_branch_prefers_pr_ref_over_existing_local_branch(self) -> None:
         commands = []
 
-        def fake_run_command(cmd: str, check: bool = True, capture_output: bool = True) -> str:
-            commands.append(cmd)
+        def fake_run_command(args: list, check: bool = True, capture_output: bool = True) -> str:
+            commands.append(args)
             return ""
 
         with mock.patch.object(MODULE, "run_command", side_effect=fake_run_command):
@@ -242,10 +375,1277 @@ class PrBatchBigPictureTests(unittest.TestCase):
         self.assertEqual(
             commands,
             [
-                "git fetch github pull/123/head",
-                "git checkout -B pr-123 FETCH_HEAD",
+                ["git", "fetch", "github", "pull/123/head"],
+                ["git", "checkout", "-B", "pr-123", "FETCH_HEAD"],
+            ],
+        )
+
+    def test_prefetch_pr_metadata_serves_per_pr_lookups_from_one_query(self) -> None:
+        commands = []
+
+        def connection(nodes):
+            return {"pageInfo": {"hasNextPage": False}, "nodes": nodes}
+
+        pr_node = {
+            "number": 5,
+            "title": "bulk fixture",
+            "body": "fixture body",
+            "url": "https://example.test/pull/5",
+            "createdAt": "2026-03-10T00:00:00Z",
+            "author": {"login": "bulk-user"},
+            "headRefName": "bulk-branch",
+            "headRefOid": "a" * 40,
+            "baseRefName": "main",
+            "files": connection([{"path": "tools/a.py"}, {"path": "package-lock.json"}]),
+            "comments": connection(
+                [{"author": {"login": "issue-user"}, "createdAt": "2026-03-10T00:00:01Z", "body": "hi"}]
+            ),
+            "reviews": connection(
+                [{"author": {"login": "approver"}, "submittedAt": "2026-03-10T00:00:02Z", "body": "", "state": "APPROVED"}]
+            ),
+            "reviewThreads": connection(
+                [
+                    {
+                        "diffSide": "RIGHT",
+                        "comments": connection(
+                            [
+                                {
+                                    "author": {"login": "inline-user"},
+                                    "createdAt": "2026-03-10T00:00:03Z",
+                                    "body": "inline",
+                                    "path": "tools/a.py",
+                                    "line": 3,
+                                    "replyTo": None,
+                                },
+                                {
+                                    "author": {"login": "reply-user"},
+                                    "createdAt": "2026-03-10T00:00:04Z",
+                                    "body": "reply",
+                                    "path": "tools/a.py",
+                                    "line": 3,
+                                    "replyTo": {"databaseId": 777},
+                                },
+                            ]
+                        ),
+                    }
+                ]
+            ),
+            "commits": {
+                "nodes": [
+                    {
+                        "commit": {
+                            "statusCheckRollup": {
+                                "contexts": connection(
+                                    [
+                                        {
+                                            "__typename": "CheckRun",
+                                            "name": "tests",
+                                            "status": "COMPLETED",
+                                            "conclusion": "FAILURE",
+                                            "detailsUrl": "https://example.test/actions/runs/42/job/1",
+                                        },
+                                        {
+                                            "__typename": "StatusContext",
+                                            "context": "ci/legacy",
+                                            "state": "SUCCESS",
+                                            "targetUrl": "https://example.test/status",
+                                        },
+                                    ]
+                                )
+                            }
+                        }
+                    }
+                ]
+            },
+        }
+
+        def fake_run_command(args: list, check: bool = True, capture_output: bool = True) -> str:
+            cmd = " ".join(args)
+            commands.append(cmd)
+            if cmd == "gh repo view --json nameWithOwner":
+                return json.dumps({"nameWithOwner": "techofourown/org"})
+            if cmd.startswith("gh api graphql"):
+                self.assertIn("pr5: pullRequest(number: 5)", cmd)
+                self.assertIn("pr6: pullRequest(number: 6)", cmd)
+                return json.dumps({"data": {"repository": {"pr5": pr_node, "pr6": None}}})
+            raise AssertionError(f"Unexpected command: {cmd}")
+
+        with mock.patch.object(MODULE, "run_command", side_effect=fake_run_command):
+            resolved = MODULE.prefetch_pr_metadata([5, 6])
+            info = MODULE.get_pr_info(5)
+            files = MODULE.get_pr_changed_files(5)
+            comments = MODULE.get_pr_comments(5)
+            checks = MODULE.get_pr_checks(5)
+            with self.assertRaises(KeyError):
+                MODULE.get_pr_info(6)
+
+        self.assertEqual(resolved, 1)
+        self.assertEqual(len(commands), 2)
+        self.assertEqual(info["branch"], "bulk-branch")
+        self.assertEqual(info["author"], "bulk-user")
+        self.assertEqual(files, ["tools/a.py", "package-lock.json"])
+        self.assertEqual(
+            [comment["type"] for comment in comments],
+            ["issue", "review", "review-comment", "review-reply"],
+        )
+        self.assertEqual(comments[3]["inReplyToId"], "777")
+        self.assertEqual(comments[2]["side"], "RIGHT")
+        self.assertEqual(checks[0]["conclusion"], "FAILURE")
+        self.assertEqual(checks[1]["name"], "ci/legacy")
+        self.assertEqual(checks[1]["detailsUrl"], "https://example.test/status")
+
+    def test_prefetched_pr_falls_back_when_connection_is_truncated(self) -> None:
+        MODULE._PREFETCHED_PRS[9] = {
+            "files": {"pageInfo": {"hasNextPage": True}, "nodes": [{"path": "a"}]},
+        }
+
+        def fake_run_command(args: list, check: bool = True, capture_output: bool = True) -> str:
+            cmd = " ".join(args)
+            if cmd == "gh pr view 9 --json files":
+                return json.dumps({"files": [{"path": "a"}, {"path": "b"}]})
+            raise AssertionError(f"Unexpected command: {cmd}")
+
+        with mock.patch.object(MODULE, "run_command", side_effect=fake_run_command):
+            files = MODULE.get_pr_changed_files(9)
+
+        self.assertEqual(files, ["a", "b"])
+
+    def test_iter_pipelined_preserves_input_order(self) -> None:
+        import threading
+        import time
+
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def slow_square(value: int) -> int:
+            with lock:
+                active.append(value)
+                peak.append(len(active))
+            time.sleep(0.01 * (5 - value))
+            with lock:
+                active.remove(value)
+            return value * value
+
+        results = list(MODULE.iter_pipelined(range(5), slow_square, jobs=3))
+
+        self.assertEqual(results, [(0, 0), (1, 1), (2, 4), (3, 9), (4, 16)])
+        self.assertLessEqual(max(peak), 3)
+        self.assertEqual(list(MODULE.iter_pipelined([1, 2], slow_square, jobs=1)), [(1, 1), (2, 4)])
+
+    def test_fetch_pr_inputs_records_errors_without_raising(self) -> None:
+        def fake_run_command(args: list, check: bool = True, capture_output: bool = True) -> str:
+            cmd = " ".join(args)
+            if cmd == "gh pr view 12 --json files":
+                return json.dumps({"files": [{"path": "README.md"}]})
+            if cmd == "gh pr view 12 --json comments,reviews":
+                raise MODULE.subprocess.CalledProcessError(1, cmd)
+            if cmd == "gh pr view 12 --json statusCheckRollup":
+                return json.dumps({"statusCheckRollup": []})
+            raise AssertionError(f"Unexpected command: {cmd}")
+
+        with mock.patch.object(MODULE, "run_command", side_effect=fake_run_command):
+            fetched = MODULE.fetch_pr_inputs({"number": 12})
+
+        self.assertEqual(fetched["files"], ["README.md"])
+        self.assertEqual(fetched["comments"], [])
+        self.assertIsInstance(fetched["commentsError"], MODULE.subprocess.CalledProcessError)
+        self.assertEqual(fetched["checks"], [])
+        self.assertNotIn("checksError", fetched)
+
+    @staticmethod
+    def _git(*args: str, cwd: Path | None = None) -> str:
+        identity = ["-c", "user.name=fixture", "-c", "user.email=fixture@example.test"]
+        return MODULE.run_argv(["git", *identity, *args], cwd=str(cwd) if cwd else None).stdout.strip()
+
+    def _make_pr_remote_clone(self, root: Path) -> Path:
+        """Create an origin with refs/pull/7/head on a feature branch and clone it."""
+        origin = root / "origin"
+        clone = root / "clone"
+        self._git("init", "-q", "-b", "main", str(origin))
+        (origin / "kept.txt").write_text("base\n", encoding="utf-8")
+        self._git("add", "kept.txt", cwd=origin)
+        self._git("commit", "-qm", "base", cwd=origin)
+        self._git("checkout", "-qb", "feature", cwd=origin)
+        (origin / "added.txt").write_text("feature\n", encoding="utf-8")
+        self._git("add", "added.txt", cwd=origin)
+        self._git("commit", "-qm", "feature", cwd=origin)
+        self._git("update-ref", "refs/pull/7/head", "feature", cwd=origin)
+        self._git("checkout", "-q", "main", cwd=origin)
+        self._git("clone", "-q", str(origin), str(clone))
+        return clone
+
+    def test_resolve_pr_head_ref_pins_pr_without_touching_worktree(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            clone = self._make_pr_remote_clone(Path(tmpdir))
+            os.chdir(clone)
+            head_before = self._git("rev-parse", "HEAD")
+            ref = MODULE.resolve_pr_head_ref({"number": 7, "branch": "feature"}, "origin")
+            missing_on_base = MODULE.report_missing_files_at_revision(
+                ["added.txt", "kept.txt"], "main"
+            )
+            missing_on_pr = MODULE.report_missing_files_at_revision(["added.txt", "gone.txt"], ref)
+
+            self.assertEqual(ref, "refs/pr-batch/7")
+            self.assertEqual(self._git("rev-parse", "HEAD"), head_before)
+            self.assertEqual(self._git("branch", "--show-current"), "main")
+            self.assertFalse((clone / "added.txt").exists())
+            self.assertEqual(missing_on_base, ["added.txt"])
+            self.assertEqual(missing_on_pr, ["gone.txt"])
+            self.assertEqual(
+                self._git("diff", "--name-only", f"main...{ref}"), "added.txt"
+            )
+
+    def test_fetch_pr_head_refs_pins_available_prs_in_one_namespace(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            clone = self._make_pr_remote_clone(Path(tmpdir))
+            os.chdir(clone)
+
+            pinned = MODULE.fetch_pr_head_refs([7, 8], "origin")
+            feature_sha = self._git("rev-parse", "origin/feature")
+
+            import command_runner
+
+            # With one refspec per command, only the batch holding the missing ref is retried.
+            self._git("update-ref", "-d", "refs/pr-batch/7")
+            command_runner.TIMINGS.reset()
+            with mock.patch.object(command_runner, "PATH_ARGS_BUDGET", 20):
+                batched = MODULE.fetch_pr_head_refs([7, 8], "origin")
+            fetches = command_runner.TIMINGS.stats["git fetch"].calls
+            pinned_sha = self._git("rev-parse", "refs/pr-batch/7")
+
+            commands = []
+            with mock.patch.object(
+                MODULE, "run_command", side_effect=lambda cmd, **_: commands.append(cmd) or ""
+            ):
+                ref = MODULE.resolve_pr_head_ref(
+                    {"number": 7, "branch": "feature"}, "origin", pinned
+                )
+
+        self.assertEqual(pinned, {7})
+        self.assertEqual(batched, {7})
+        self.assertEqual(fetches, 2)
+        self.assertEqual(pinned_sha, feature_sha)
+        self.assertEqual(ref, "refs/pr-batch/7")
+        self.assertEqual(commands, [])
+
+    def test_write_pr_documents_runs_diff_once_for_both_variants(self) -> None:
+        commands = []
+
+        def fake_stream_diff_output(cmd, handles, max_bytes=0, max_file_bytes=0) -> int:
+            commands.append(cmd)
+            for handle in handles:
+                handle.write("diff --git a/app.py b/app.py\n+change")
+            return 1
+
+        pr_info = {
+            "number": 55,
+            "title": "variant fixture",
+            "branch": "fixture-branch",
+            "body": "",
+        }
+        failed_check = {
+            "name": "tests",
+            "status": "COMPLETED",
+            "conclusion": "FAILURE",
+            "logOutput": "line one\nline two",
+        }
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            plain = str(Path(tmpdir) / "plain.txt")
+            with_logs = str(Path(tmpdir) / "with-logs.txt")
+            with mock.patch.object(
+                MODULE, "stream_diff_output", side_effect=fake_stream_diff_output
+            ):
+                document = MODULE.build_pr_document(
+                    pr_info, ["app.py"], [], ["app.py"], [], base_branch="main"
+                )
+                MODULE.write_pr_documents(
+                    document,
+                    [(plain, [failed_check], False), (with_logs, [failed_check], True)],
+                )
+            plain_text = Path(plain).read_text(encoding="utf-8")
+            logs_text = Path(with_logs).read_text(encoding="utf-8")
+
+        self.assertEqual(commands, [[["git", "diff", "main...fixture-branch", "--", "app.py"]]])
+        self.assertIn("+change", plain_text)
+        self.assertNotIn("    Logs:", plain_text)
+        self.assertIn("    Logs:\n    line one\n    line two\n", logs_text)
+        self.assertEqual(
+            plain_text.split("Comments (0):")[1], logs_text.split("Comments (0):")[1]
+        )
+
+    def _stream(self, script: str, **caps: int) -> tuple:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            first = Path(tmpdir) / "first.txt"
+            second = Path(tmpdir) / "second.txt"
+            with open(first, "w", encoding="utf-8") as one, open(
+                second, "w", encoding="utf-8"
+            ) as two:
+                written = MODULE.stream_diff_output([["sh", "-c", script]], [one, two], **caps)
+            first_text = first.read_text(encoding="utf-8")
+            self.assertEqual(first_text, second.read_text(encoding="utf-8"))
+        return written, first_text
+
+    def test_stream_diff_output_matches_stripped_capture(self) -> None:
+        cmd = "printf '\\ndiff --git a/x b/x\\n+one\\n\\n+two\\n\\n\\n'"
+        written, text = self._stream(cmd)
+
+        self.assertEqual(text, MODULE.run_command(["sh", "-c", cmd]))
+        self.assertEqual(written, len(text))
+        self.assertEqual(self._stream("true"), (0, ""))
+        with self.assertRaises(MODULE.subprocess.CalledProcessError):
+            self._stream("printf 'partial'; exit 3")
+
+    def test_stream_diff_output_truncates_per_file_and_total(self) -> None:
+        cmd = (
+            "printf 'diff --git a/big b/big\\n+aaaaaaaaaa\\n+bbbbbbbbbb\\n"
+            "diff --git a/small b/small\\n+c\\n'"
+        )
+        _, per_file = self._stream(cmd, max_file_bytes=15)
+        self.assertIn("+aaaaaaaaaa\n# [truncated: diff section exceeded 15 bytes", per_file)
+        self.assertNotIn("bbbbbbbbbb", per_file)
+        self.assertTrue(per_file.endswith("diff --git a/small b/small\n+c"))
+
+        # The next file header would not leave room for the marker, so it is dropped too.
+        written, total = self._stream(cmd, max_bytes=130)
+        self.assertTrue(total.startswith("diff --git a/big b/big\n+aaaaaaaaaa\n+bbbbbbbbbb\n"))
+        self.assertTrue(total.endswith("# [truncated: diff output exceeded 130 bytes; remaining files omitted]"))
+        self.assertNotIn("small", total)
+        self.assertEqual(written, len(total))
+        self.assertLessEqual(written, 130)
+        self.assertEqual(self._stream(cmd, max_bytes=30), (0, ""))
+
+    def test_copy_file_into_appends_between_buffered_writes(self) -> None:
+        payload = "per-PR body ✓\n" * 5000
+
+        def fail_kernel_copy(*_args):
+            raise OSError("kernel copy unavailable")
+
+        kernel_copies = {"copy_file_range": fail_kernel_copy, "sendfile": fail_kernel_copy}
+        for patches in ({}, kernel_copies):
+            with tempfile.TemporaryDirectory() as tmpdir:
+                source = Path(tmpdir) / "source.txt"
+                target = Path(tmpdir) / "target.txt"
+                source.write_text(payload, encoding="utf-8")
+                patcher = (
+                    mock.patch.multiple(MODULE.os, **patches, create=True)
+                    if patches
+                    else contextlib.nullcontext()
+                )
+                with patcher:
+                    with open(target, "w", encoding="utf-8") as outf:
+                        outf.write("before\n")
+                        copied = MODULE.copy_file_into(outf, str(source))
+                        outf.write("after\n")
+
+                self.assertEqual(copied, len(payload.encode("utf-8")))
+                self.assertEqual(
+                    target.read_text(encoding="utf-8"), "before\n" + payload + "after\n"
+                )
+
+    def test_create_touched_files_compilation_can_reference_master(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            master = Path(tmpdir) / "pr-comparison-fixture.txt"
+            master.write_text("MASTER BODY\n", encoding="utf-8")
+            outputs = {}
+            for append_master in (True, False):
+                output_file = Path(tmpdir) / f"touched-{append_master}.txt"
+                with mock.patch.object(
+                    MODULE.GitObjectReader,
+                    "read",
+                    return_value=GitBlob("main:README.md", "ok", "blob", 7, "content"),
+                ):
+                    MODULE.create_touched_files_compilation(
+                        touched_files={"README.md"},
+                        touched_file_prs={"README.md": {1}},
+                        base_branch="main",
+                        selection_requested="1",
+                        selection_canonical="1",
+                        selected_prs=[1],
+                        output_file=str(output_file),
+                        master_comparison_file=str(master),
+                        append_master=append_master,
+                    )
+                outputs[append_master] = output_file.read_text(encoding="utf-8")
+
+        self.assertTrue(outputs[True].endswith("# Appended master comparison (diffs and summaries)\n\nMASTER BODY\n"))
+        self.assertNotIn("MASTER BODY", outputs[False])
+        self.assertIn("# Master comparison (diffs and summaries): pr-comparison-fixture.txt", outputs[False])
+
+    def test_git_object_reader_reports_missing_binary_and_oversized_blobs(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            clone = self._make_pr_remote_clone(Path(tmpdir))
+            (clone / "image.bin").write_bytes(b"\x89PNG\x00\x01\x02")
+            (clone / "big.txt").write_text("x" * 64, encoding="utf-8")
+            (clone / ".gitmodules").write_text(
+                '[submodule "lib"]\n\tpath = lib\n\turl = ../lib\n', encoding="utf-8"
+            )
+            self._git("add", ".", cwd=clone)
+            self._git(
+                "update-index", "--add", "--cacheinfo", f"160000,{'1' * 40},lib", cwd=clone
+            )
+            self._git("commit", "-qm", "blobs", cwd=clone)
+
+            import command_runner
+
+            command_runner.TIMINGS.reset()
+            with MODULE.GitObjectReader(max_blob_bytes=32, cwd=str(clone)) as reader:
+                kept = reader.read("HEAD:kept.txt")
+                missing = reader.read("HEAD:added.txt")
+                directory = reader.read("HEAD:")
+                submodule = reader.read("HEAD:lib")
+                binary = reader.read("HEAD:image.bin")
+                oversized = reader.read("HEAD:big.txt")
+                kept_again = reader.read("HEAD:kept.txt")
+                info = reader.info("HEAD:big.txt")
+            # One round trip per read, plus the .gitmodules lookup and the info call.
+            cat_file_calls = command_runner.TIMINGS.stats["git cat-file"].calls
+
+        self.assertEqual((kept.status, kept.content), ("ok", "base\n"))
+        self.assertEqual(kept_again.content, "base\n")
+        self.assertFalse(missing.found)
+        self.assertEqual((directory.status, directory.object_type), ("non-blob", "tree"))
+        self.assertEqual((submodule.status, submodule.object_id), ("non-blob", "1" * 40))
+        self.assertIn("submodule at commit 1111", MODULE.non_blob_placeholder(submodule))
+        self.assertEqual((binary.status, binary.content), ("binary", ""))
+        self.assertEqual((oversized.status, oversized.size), ("oversized", 64))
+        self.assertEqual((info.status, info.size), ("oversized", 64))
+        self.assertEqual(cat_file_calls, 9)
+
+    def test_round_robin_skips_identical_blobs_without_diffing(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            clone = self._make_pr_remote_clone(Path(tmpdir))
+            os.chdir(clone)
+            for branch, extra in (("one", None), ("two", "new.txt"), ("three", None)):
+                self._git("checkout", "-q", "-b", branch, "main")
+                Path("kept.txt").write_text("shared change\n", encoding="utf-8")
+                if extra:
+                    Path(extra).write_text("only on two\n", encoding="utf-8")
+                self._git("add", "-A")
+                self._git("commit", "-qm", branch)
+            self._git("checkout", "-q", "main")
+
+            def processed(number: int, branch: str, files: list) -> dict:
+                info = {"number": number, "title": branch, "body": "", "author": "a", "url": ""}
+                return {"info": info, "local_branch": branch, "files": files}
+
+            real_stream = MODULE.stream_diff_output
+            diff_commands = []
+
+            def counting_stream(cmd, handles, **caps):
+                diff_commands.append(cmd)
+                return real_stream(cmd, handles, **caps)
+
+            with mock.patch.object(MODULE, "stream_diff_output", side_effect=counting_stream):
+                outputs = MODULE.create_round_robin_comparisons(
+                    processed_prs=[
+                        processed(1, "one", ["kept.txt"]),
+                        processed(2, "two", ["kept.txt", "new.txt"]),
+                        processed(3, "three", ["kept.txt"]),
+                    ],
+                    output_dir=tmpdir,
+                    selection_requested="1-3",
+                    selection_canonical="1-3",
+                    selected_prs=[1, 2, 3],
+                    jobs=2,
+                )
+            texts = {Path(path).name: Path(path).read_text(encoding="utf-8") for path in outputs}
+
+        self.assertEqual(
+            sorted(texts), ["pr-1-versus-2.txt", "pr-1-versus-3.txt", "pr-2-versus-3.txt"]
+        )
+        self.assertEqual(
+            sorted(diff_commands),
+            [
+                [["git", "diff", "one", "two", "--", "new.txt"]],
+                [["git", "diff", "two", "three", "--", "new.txt"]],
+            ],
+        )
+        self.assertIn("# Identical files (same blob on both sides, not diffed): kept.txt", texts["pr-1-versus-2.txt"])
+        self.assertIn("+only on two", texts["pr-1-versus-2.txt"])
+        self.assertIn("# No differences found", texts["pr-1-versus-3.txt"])
+
+    def test_round_robin_overlap_mode_compares_shared_paths_only(self) -> None:
+        def processed(number: int, files: list) -> dict:
+            info = {"number": number, "title": f"pr {number}", "body": "", "author": "a", "url": ""}
+            return {"info": info, "local_branch": f"pr-{number}", "files": files}
+
+        diff_commands = []
+
+        def fake_stream(cmd, handles, **caps):
+            diff_commands.append(cmd)
+            return 0
+
+        entries = {
+            "pr-1": {"shared.py": ("100644", "a"), "left.py": ("100644", "b")},
+            "pr-2": {"shared.py": ("100644", "c"), "right.py": ("100644", "d")},
+            "pr-3": {"other.py": ("100644", "e")},
+        }
+
+        with tempfile.TemporaryDirectory() as tmpdir, mock.patch.object(
+            MODULE, "get_tree_entries", side_effect=lambda branch, files: entries[branch]
+        ), mock.patch.object(MODULE, "stream_diff_output", side_effect=fake_stream):
+            outputs = MODULE.create_round_robin_comparisons(
+                processed_prs=[
+                    processed(1, ["left.py", "shared.py"]),
+                    processed(2, ["right.py", "shared.py"]),
+                    processed(3, ["other.py"]),
+                ],
+                output_dir=tmpdir,
+                selection_requested="1-3",
+                selection_canonical="1-3",
+                selected_prs=[1, 2, 3],
+                mode="overlap",
+            )
+            text = Path(outputs[0]).read_text(encoding="utf-8")
+
+        self.assertEqual([Path(path).name for path in outputs], ["pr-1-versus-2.txt"])
+        self.assertEqual(diff_commands, [[["git", "diff", "pr-1", "pr-2", "--", "shared.py"]]])
+        self.assertIn("# Round-robin mode: overlap", text)
+        self.assertIn("# Files: shared.py\n", text)
+
+    def test_result_cache_expires_and_evicts_least_recently_used(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = ResultCache(tmpdir, max_bytes=15)
+            try:
+                cache.put_bytes("a", b"12345")
+                cache.put_bytes("shared", b"12345")
+                cache.put_json("b", {"x": 1})
+                cache.put_bytes("stale", b"old", ttl=-1)
+
+                self.assertIsNone(cache.get_bytes("stale"))
+                self.assertEqual(cache.get_json("b"), {"x": 1})
+                self.assertEqual(cache.get_bytes("a"), b"12345")
+                self.assertEqual(cache.get_bytes("shared"), b"12345")
+                self.assertEqual(cache.get_path("a"), cache.get_path("shared"))
+
+                cache.put_bytes("c", b"abcdefgh")
+                self.assertIsNone(cache.get_bytes("b"))
+                self.assertEqual(cache.get_bytes("a"), b"12345")
+                self.assertEqual(cache.get_bytes("c"), b"abcdefgh")
+                blob_files = [name for _, _, names in os.walk(Path(tmpdir) / "blobs") for name in names]
+                self.assertEqual(len(blob_files), 2)
+            finally:
+                cache.close()
+
+            roomy = ResultCache(tmpdir, max_bytes=1024)
+            try:
+                with mock.patch.object(roomy, "evict") as evict:
+                    roomy.put_bytes("d", b"fits under the cap")
+                evict.assert_not_called()
+            finally:
+                roomy.close()
+
+    def test_prefetch_reuses_cached_pr_payload_for_unchanged_stamp(self) -> None:
+        node = {"number": 5, "title": "cached", "headRefName": "b", "baseRefName": "main", "headRefOid": "a" * 40}
+        stamp = {"updatedAt": "2026-03-10T00:00:00Z", "headRefOid": "a" * 40}
+        queries = []
+
+        def fake_run_command(args: list, check: bool = True, capture_output: bool = True) -> str:
+            cmd = " ".join(args)
+            if cmd == "gh repo view --json nameWithOwner":
+                return json.dumps({"nameWithOwner": "techofourown/org"})
+            queries.append("updatedAt" in cmd and "reviewThreads" not in cmd)
+            pr = stamp if queries[-1] else node
+            return json.dumps({"data": {"repository": {"pr5": pr}}})
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = ResultCache(tmpdir)
+            MODULE.configure_result_cache(cache, ttl=60)
+            try:
+                with mock.patch.object(MODULE, "run_command", side_effect=fake_run_command):
+                    self.assertEqual(MODULE.prefetch_pr_metadata([5]), 1)
+                    MODULE.clear_prefetched_pr_data()
+                    self.assertEqual(MODULE.prefetch_pr_metadata([5]), 1)
+                    info = MODULE.get_pr_info(5)
+            finally:
+                cache.close()
+
+        self.assertEqual(queries, [True, False, True])
+        self.assertEqual(info["title"], "cached")
+
+    def test_stream_cached_diff_replays_cached_output(self) -> None:
+        cmd = "printf 'diff --git a/x b/x\\n+one\\n'"
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = ResultCache(str(Path(tmpdir) / "cache"))
+            MODULE.configure_result_cache(cache)
+            outputs = []
+            try:
+                for index, command in enumerate([["sh", "-c", cmd], ["false"]]):
+                    out_path = Path(tmpdir) / f"out{index}.txt"
+                    with open(out_path, "w", encoding="utf-8") as outf:
+                        outf.write("header\n")
+                        written = MODULE.stream_cached_diff([command], ["sha1", "sha2", ["x"]], [outf])
+                        outf.write("\nfooter")
+                    outputs.append((written, out_path.read_text(encoding="utf-8")))
+                with self.assertRaises(subprocess.CalledProcessError):
+                    MODULE.stream_cached_diff([["false"]], ["sha1", "sha3", ["x"]], [io.StringIO()])
+                leftovers = [path.name for path in (Path(tmpdir) / "cache").iterdir() if path.is_file()]
+            finally:
+                cache.close()
+
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertEqual(leftovers, ["index.sqlite3"])
+        self.assertEqual(outputs[0][1], "header\ndiff --git a/x b/x\n+one\nfooter")
+
+    def test_round_robin_reuses_pairs_recorded_in_manifest(self) -> None:
+        def processed(number: int, title: str) -> dict:
+            info = {"number": number, "title": title, "body": "", "author": "a", "url": ""}
+            return {"info": info, "local_branch": f"pr-{number}", "files": ["shared.py"]}
+
+        diff_commands = []
+
+        def fake_stream(cmd, handles, **caps):
+            diff_commands.append(cmd)
+            handles[0].write("diff --git a/shared.py b/shared.py")
+            return 1
+
+        entries = {
+            "pr-1": {"shared.py": ("100644", "a")},
+            "pr-2": {"shared.py": ("100644", "b")},
+        }
+
+        with tempfile.TemporaryDirectory() as tmpdir, mock.patch.object(
+            MODULE, "get_tree_entries", side_effect=lambda branch, files: entries[branch]
+        ), mock.patch.object(
+            MODULE, "resolve_commit_shas", side_effect=lambda revs: [f"sha-{rev}" for rev in revs]
+        ), mock.patch.object(MODULE, "stream_diff_output", side_effect=fake_stream):
+
+            def run(second_title: str) -> str:
+                manifest = MODULE.load_manifest(tmpdir)
+                outputs = MODULE.create_round_robin_comparisons(
+                    processed_prs=[processed(1, "one"), processed(2, second_title)],
+                    output_dir=tmpdir,
+                    selection_requested="1-2",
+                    selection_canonical="1-2",
+                    selected_prs=[1, 2],
+                    manifest=manifest,
+                    reuse=True,
+                )
+                MODULE.write_manifest(tmpdir, manifest)
+                return Path(outputs[0]).read_text(encoding="utf-8")
+
+            first = run("two")
+            self.assertEqual(run("two"), first)
+            self.assertEqual(len(diff_commands), 1)
+
+            Path(tmpdir, "pr-1-versus-2.txt").write_text("edited", encoding="utf-8")
+            run("two")
+            self.assertEqual(len(diff_commands), 2)
+
+            self.assertIn("one ↔ renamed", run("renamed"))
+            self.assertEqual(len(diff_commands), 3)
+            manifest = json.loads(Path(tmpdir, MODULE.MANIFEST_FILENAME).read_text(encoding="utf-8"))
+
+        entry = manifest["artifacts"]["pr-1-versus-2.txt"]
+        self.assertEqual(entry["inputs"]["leftSha"], "sha-pr-1")
+
+    def test_failed_log_fetcher_downloads_each_run_once(self) -> None:
+        def check(name: str, conclusion: str, run_id: str) -> dict:
+            return {
+                "name": name,
+                "status": "COMPLETED",
+                "conclusion": conclusion,
+                "detailsUrl": f"https://github.com/o/r/actions/runs/{run_id}/job/1",
+            }
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            calls = Path(tmpdir) / "calls.txt"
+            fake_gh = Path(tmpdir) / "gh"
+            fake_gh.write_text(
+                "#!/bin/sh\n"
+                f"echo \"$*\" >> {calls}\n"
+                "[ \"$3\" = 200 ] && exit 1\n"
+                "printf 'build\\tcompile\\terror: boom\\nlint\\truff\\tE501\\n'\n",
+                encoding="utf-8",
+            )
+            fake_gh.chmod(0o755)
+            checks = [
+                check("build", "FAILURE", "100"),
+                check("lint", "FAILURE", "100"),
+                check("docs", "SUCCESS", "100"),
+                check("deploy", "FAILURE", "200"),
+                check("other", "FAILURE", "100"),
+            ]
+
+            path = f"{tmpdir}{os.pathsep}{os.environ.get('PATH', '')}"
+            with mock.patch.dict(os.environ, {"PATH": path}):
+                with FailedLogFetcher(jobs=2) as fetcher:
+                    MODULE.configure_log_fetcher(fetcher)
+                    with_logs = MODULE.attach_failed_check_logs(checks)
+                    downloads = fetcher.downloads
+                    logs = ["".join(MODULE.iter_check_log_lines(check)).strip() for check in with_logs]
+            recorded = sorted(calls.read_text(encoding="utf-8").splitlines())
+
+        self.assertEqual(recorded, ["run view 100 --log-failed", "run view 200 --log-failed"])
+        self.assertEqual(downloads, 2)
+        self.assertEqual(logs[0], "build\tcompile\terror: boom")
+        self.assertEqual(logs[1], "lint\truff\tE501")
+        self.assertEqual(logs[2:4], ["", ""])
+        self.assertNotIn("logPath", with_logs[3])
+        self.assertIn("build\tcompile", logs[4])
+        self.assertIn("lint\truff", logs[4])
+        self.assertEqual(with_logs[0]["logDigest"], with_logs[4]["logDigest"])
+
+    def test_failed_log_fetcher_rekeys_rerun_attempts_and_survives_missing_gh(self) -> None:
+        def check(job: str) -> dict:
+            return {
+                "name": "build",
+                "status": "COMPLETED",
+                "conclusion": "FAILURE",
+                "detailsUrl": f"https://github.com/o/r/actions/runs/100/job/{job}",
+            }
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            bin_dir = Path(tmpdir) / "bin"
+            bin_dir.mkdir()
+            fake_gh = bin_dir / "gh"
+            fake_gh.write_text("#!/bin/sh\necho attempt-$ATTEMPT\n", encoding="utf-8")
+            fake_gh.chmod(0o755)
+            cache = ResultCache(str(Path(tmpdir) / "cache"))
+            logs = []
+            for attempt, job in (("1", "1"), ("1", "1"), ("2", "2")):
+                env = {"PATH": f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}", "ATTEMPT": attempt}
+                with mock.patch.dict(os.environ, env):
+                    with FailedLogFetcher(cache=cache) as fetcher:
+                        fetcher.prefetch([check(job)])
+                        logs.append((Path(fetcher.log_path("100")).read_text().strip(), fetcher.downloads))
+            # Evicting every cached blob must not pull a log out from under a live fetcher.
+            with mock.patch.dict(os.environ, env):
+                with FailedLogFetcher(cache=cache) as fetcher:
+                    fetcher.prefetch([check("2")])
+                    log_path = fetcher.log_path("100")
+                    cache.max_bytes = 1
+                    cache.evict()
+                    survived = Path(log_path).read_text().strip()
+                    blobs = [path for path in Path(tmpdir, "cache", "blobs").rglob("*") if path.is_file()]
+            cache.close()
+
+            with mock.patch.dict(os.environ, {"PATH": str(Path(tmpdir) / "empty")}):
+                with FailedLogFetcher() as fetcher:
+                    fetcher.prefetch([check("3")])
+                    missing = fetcher.log_path("100")
+                    leftovers = os.listdir(fetcher.log_dir)
+
+        self.assertEqual(logs, [("attempt-1", 1), ("attempt-1", 0), ("attempt-2", 1)])
+        self.assertEqual(survived, "attempt-2")
+        self.assertEqual(blobs, [])
+        self.assertIsNone(missing)
+        self.assertEqual(leftovers, [])
+
+    def test_default_log_fetcher_follows_result_cache_and_closes_at_exit(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = ResultCache(str(Path(tmpdir) / "cache"))
+            try:
+                fetcher = MODULE._log_fetcher()
+                uncached = fetcher.cache
+                MODULE.configure_result_cache(cache)
+                same = MODULE._log_fetcher() is fetcher
+                cached = fetcher.cache
+                log_dir = fetcher.log_dir
+                MODULE._close_default_log_fetcher()
+            finally:
+                cache.close()
+
+        self.assertIsNone(uncached)
+        self.assertTrue(same)
+        self.assertIs(cached, cache)
+        self.assertFalse(os.path.exists(log_dir))
+        self.assertIsNone(MODULE._DEFAULT_LOG_FETCHER)
+
+    def test_write_log_excerpt_keeps_windows_around_errors(self) -> None:
+        import io
+
+        lines = [f"2026-03-10T00:00:{index % 60:02d}.1234567Z step {index}" for index in range(200)]
+        lines[100] = "2026-03-10T00:01:40.0000000Z ##[error]compile failed"
+        lines[150:160] = ["retrying..."] * 10
+
+        out = io.StringIO()
+        stats = MODULE.write_log_excerpt(
+            lines, out, window=MODULE.LogWindow(head_lines=2, tail_lines=3, context_lines=1)
+        )
+        text = out.getvalue()
+
+        self.assertEqual(
+            text.splitlines()[:8],
+            [
+                "    step 0",
+                "    step 1",
+                "    ... [97 line(s) omitted]",
+                "    step 99",
+                "    ##[error]compile failed",
+                "    step 101",
+                "    ... [95 line(s) omitted]",
+                "    step 197",
             ],
         )
+        self.assertTrue(text.rstrip().endswith("byte(s) dropped]"))
+        self.assertEqual(stats["inputLines"], 200)
+        self.assertEqual(stats["keptLines"], 8)
+        self.assertEqual(stats["omittedLines"], 192)
+
+        out = io.StringIO()
+        stats = MODULE.write_log_excerpt(lines[148:162], out, window=MODULE.LogWindow(full=True))
+        self.assertIn("    retrying...\n    ... [previous line repeated 9 more time(s)]\n", out.getvalue())
+        self.assertEqual(stats["collapsedLines"], 9)
+
+    @contextlib.contextmanager
+    def _stub_github(self, routes: dict, **client_kwargs):
+        """Serve `routes` ({path: (status, headers, payload)}) over keep-alive HTTP.
+
+        A route may be a list of responses, served in order; the last one repeats.
+        """
+        import http.server
+        import threading
+
+        seen = []
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _respond(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length)) if length else None
+                seen.append((self.command, self.path, self.headers.get("Authorization"), self.client_address[1], body))
+                route = routes.get(self.path, (404, {}, {"message": "Not Found"}))
+                if isinstance(route, list):
+                    route = route.pop(0) if len(route) > 1 else route[0]
+                status, headers, payload = route
+                encoded = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value.replace("{base}", base_url))
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(encoded)))
+                self.end_headers()
+                self.wfile.write(encoded)
+
+            do_GET = _respond
+            do_POST = _respond
+
+            def log_message(self, *_args) -> None:
+                pass
+
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            with GitHubClient(token="test-token", api_url=base_url, pool_size=2, **client_kwargs) as client:
+                yield client, seen
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_github_client_paginates_over_one_keep_alive_connection(self) -> None:
+        routes = {
+            "/repos/o/r/pulls/3/files?per_page=100": (
+                200,
+                {"Link": '<{base}/repos/o/r/pulls/3/files?per_page=100&page=2>; rel="next"'},
+                [{"filename": "a.py"}],
+            ),
+            "/repos/o/r/pulls/3/files?per_page=100&page=2": (200, {}, [{"filename": "b.py"}]),
+            "/graphql": (200, {}, {"data": {"repository": {"pr3": {"number": 3}}}}),
+        }
+        with self._stub_github(routes) as (client, seen), mock.patch.dict(os.environ, {"GH_REPO": "o/r"}):
+            MODULE.configure_github_client(client)
+            files = MODULE.get_pr_changed_files(3)
+            repository = MODULE._run_repository_query("query { x }", "o", "r")
+            with self.assertRaises(GitHubAPIError) as raised:
+                client.get_json("repos/o/r/pulls/404")
+            connections = client.connections_opened
+
+        self.assertEqual(files, ["a.py", "b.py"])
+        self.assertEqual(repository, {"pr3": {"number": 3}})
+        self.assertEqual(raised.exception.status, 404)
+        self.assertEqual(connections, 1)
+        self.assertEqual(len({port for *_rest, port, _body in seen}), 1)
+        self.assertEqual({auth for _method, _path, auth, *_rest in seen}, {"Bearer test-token"})
+        self.assertEqual(seen[2][4]["variables"], {"owner": "o", "name": "r"})
+
+    def test_get_pr_checks_builds_rollup_from_rest_api(self) -> None:
+        routes = {
+            "/repos/o/r/pulls/4": (200, {}, {"head": {"sha": "abc"}}),
+            "/repos/o/r/commits/abc/check-runs?per_page=100": (
+                200,
+                {},
+                {
+                    "total_count": 1,
+                    "check_runs": [
+                        {
+                            "name": "tests",
+                            "status": "completed",
+                            "conclusion": "failure",
+                            "details_url": "https://github.com/o/r/actions/runs/9/job/1",
+                            "output": {"title": "1 failed", "summary": "boom"},
+                        }
+                    ],
+                },
+            ),
+            "/repos/o/r/commits/abc/status?per_page=100": (
+                200,
+                {},
+                {"statuses": [{"context": "ci/legacy", "state": "success", "target_url": "https://ci"}]},
+            ),
+        }
+        with self._stub_github(routes) as (client, _seen), mock.patch.dict(os.environ, {"GH_REPO": "o/r"}):
+            MODULE.configure_github_client(client)
+            checks = MODULE.get_pr_checks(4)
+
+        self.assertEqual(
+            checks,
+            [
+                {
+                    "name": "tests",
+                    "status": "COMPLETED",
+                    "conclusion": "FAILURE",
+                    "detailsUrl": "https://github.com/o/r/actions/runs/9/job/1",
+                    "title": "1 failed",
+                    "summary": "boom",
+                },
+                {
+                    "name": "ci/legacy",
+                    "status": "SUCCESS",
+                    "conclusion": "SUCCESS",
+                    "detailsUrl": "https://ci",
+                    "title": "",
+                    "summary": "",
+                },
+            ],
+        )
+
+    def test_fetch_engine_runs_metadata_chunks_concurrently(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            fake_gh = Path(tmp) / "gh"
+            fake_gh.write_text(
+                "#!/usr/bin/env python3\n"
+                "import json, re, sys, time\n"
+                "query = next(arg[6:] for arg in sys.argv if arg.startswith('query='))\n"
+                "time.sleep(0.5)\n"
+                "numbers = [int(n) for n in re.findall(r'pr(\\d+): pullRequest', query)]\n"
+                "nodes = {f'pr{n}': ({'number': n} if n != 4 else None) for n in numbers}\n"
+                "print(json.dumps({'data': {'repository': nodes}}))\n",
+                encoding="utf-8",
+            )
+            fake_gh.chmod(0o755)
+            engine = AsyncFetchEngine(concurrency=4)
+            MODULE.configure_fetch_engine(engine)
+            path = f"{tmp}{os.pathsep}{os.environ.get('PATH', '')}"
+            with mock.patch.dict(os.environ, {"PATH": path}), mock.patch.object(
+                MODULE, "get_repo_slug", return_value="o/r"
+            ):
+                started = time.monotonic()
+                resolved = MODULE.prefetch_pr_metadata([1, 2, 3, 4], chunk_size=1)
+                elapsed = time.monotonic() - started
+
+        self.assertEqual(resolved, 3)
+        self.assertEqual(engine.requests, 4)
+        self.assertLess(elapsed, 1.5)
+        self.assertEqual(MODULE._PREFETCHED_PRS[2], {"number": 2})
+        self.assertIsNone(MODULE._PREFETCHED_PRS[4])
+
+    def test_rate_limit_scheduler_paces_and_picks_retry_delays(self) -> None:
+        now = 1_000.0
+        scheduler = RateLimitScheduler(max_retries=2, clock=lambda: now, jitter=lambda: 0.5)
+        scheduler.observe(
+            {"x-ratelimit-limit": "100", "x-ratelimit-remaining": "50", "x-ratelimit-reset": "1100"},
+            resource="core",
+        )
+        self.assertEqual(scheduler.reserve("core"), 0.0)
+        self.assertEqual(scheduler.reserve("graphql"), 0.0)
+
+        # Inside the last 10% of a budget, requests are spread evenly until the reset.
+        scheduler.observe(
+            {"x-ratelimit-limit": "100", "x-ratelimit-remaining": "5", "x-ratelimit-reset": "1100"},
+            resource="core",
+        )
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            self.assertEqual(scheduler.reserve("core"), 0.0)
+            self.assertEqual(scheduler.reserve("core"), 20.0)
+            self.assertEqual(scheduler.reserve("core"), 45.0)
+        self.assertEqual(scheduler.budgets["core"].remaining, 2)
+        # Long waits are announced once per budget window, not once per request.
+        self.assertEqual(len(output.getvalue().splitlines()), 1)
+        self.assertIn("Rate limit core budget low (4 left); waiting 20s", output.getvalue())
+
+        scheduler.observe(
+            {"x-ratelimit-limit": "30", "x-ratelimit-remaining": "0", "x-ratelimit-reset": "1100"},
+            resource="search",
+        )
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            self.assertEqual(scheduler.reserve("search"), 101.0)
+        self.assertIn("Rate limit search budget exhausted; waiting 101s", output.getvalue())
+
+        exhausted = {"x-ratelimit-remaining": "0", "x-ratelimit-reset": "1030"}
+        self.assertEqual(scheduler.retry_delay(0, 403, exhausted), 31.0)
+        self.assertEqual(scheduler.retry_delay(0, 429, {"retry-after": "7"}), 7.0)
+        self.assertEqual(scheduler.retry_delay(1, 502), 1.5)
+        self.assertEqual(scheduler.retry_delay(0, 403, {}, "You have exceeded a secondary rate limit"), 60.0)
+        self.assertIsNone(scheduler.retry_delay(0, 403, {}, "Resource not accessible by integration"))
+        self.assertIsNone(scheduler.retry_delay(0, 404))
+        self.assertIsNone(scheduler.retry_delay(2, 502))
+        self.assertEqual(scheduler.retry_delay_for_gh(0, "gh: Server Error (HTTP 503)"), 0.75)
+        self.assertIsNone(scheduler.retry_delay_for_gh(0, "gh: Not Found (HTTP 404)"))
+        self.assertEqual(scheduler.retries, 5)
+        self.assertIn("Rate limit core: 2/100 remaining", scheduler.report_lines()[0])
+        self.assertTrue(scheduler.throttled)
+        # Resources that only came from a /rate_limit snapshot were never used and are not reported.
+        scheduler.observe_snapshot({"resources": {"scim": {"limit": 15000, "remaining": 15000, "reset": 1100}}})
+        self.assertIn("scim", scheduler.budgets)
+        self.assertFalse(any("scim" in line for line in scheduler.report_lines()))
+        self.assertFalse(RateLimitScheduler().throttled)
+
+    def test_github_client_retries_server_errors_and_tracks_budget(self) -> None:
+        sleeps = []
+        scheduler = RateLimitScheduler(sleep=sleeps.append, jitter=lambda: 0.0)
+        budget = {"X-RateLimit-Limit": "5000", "X-RateLimit-Remaining": "4321", "X-RateLimit-Reset": "9999999999"}
+        routes = {
+            "/repos/o/r": [
+                (502, {}, {"message": "Bad Gateway"}),
+                (503, {}, {"message": "Unavailable"}),
+                (200, {**budget, "X-RateLimit-Resource": "core"}, {"full_name": "o/r"}),
+            ],
+            "/repos/o/r/private": (403, budget, {"message": "Must have admin rights"}),
+        }
+        with self._stub_github(routes, scheduler=scheduler) as (client, seen):
+            repo = client.get_json("repos/o/r")
+            with self.assertRaises(GitHubAPIError):
+                client.get_json("repos/o/r/private")
+
+        self.assertEqual(repo, {"full_name": "o/r"})
+        self.assertEqual(len(seen), 4)
+        self.assertEqual(sleeps, [0.5, 1.0])
+        self.assertEqual(scheduler.retries, 2)
+        self.assertEqual(scheduler.budgets["core"].remaining, 4321)
+
+    def test_command_batches_split_large_path_sets_and_stream_in_order(self) -> None:
+        import command_runner
+
+        paths = [f"dir/file-{index:03d}.txt" for index in range(40)]
+        batches = command_runner.command_batches(["git", "diff", "a", "b"], paths, budget=200)
+        self.assertGreater(len(batches), 1)
+        self.assertEqual([path for batch in batches for path in batch[5:]], paths)
+        self.assertTrue(all(batch[:5] == ["git", "diff", "a", "b", "--"] for batch in batches))
+        self.assertEqual(command_runner.command_batches(["git", "diff"], []), [])
+        refspecs = command_runner.argument_batches(["git", "fetch", "origin"], ["+a:b", "+c:d"], budget=6)
+        self.assertEqual(refspecs, [["git", "fetch", "origin", "+a:b"], ["git", "fetch", "origin", "+c:d"]])
+
+        with self.assertRaises(subprocess.CalledProcessError) as missing_program:
+            command_runner.run_argv(["definitely-not-a-real-program-xyz"])
+        self.assertEqual(missing_program.exception.returncode, 127)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            clone = self._make_pr_remote_clone(Path(tmpdir))
+            os.chdir(clone)
+            for path in paths:
+                (clone / path).parent.mkdir(exist_ok=True)
+                (clone / path).write_text(f"{path}\n", encoding="utf-8")
+            self._git("add", ".")
+            self._git("commit", "-qm", "many files")
+
+            command_runner.TIMINGS.reset()
+            with mock.patch.object(command_runner, "PATH_ARGS_BUDGET", 200):
+                missing = MODULE.report_missing_files_at_revision(paths + ["gone.txt"], "HEAD")
+                batched_diff = MODULE.stream_diff_output(
+                    command_runner.command_batches(["git", "diff", "main", "HEAD"], paths),
+                    [io.StringIO()],
+                )
+            single_diff = len(self._git("diff", "main", "HEAD").encode("utf-8"))
+            stats = command_runner.TIMINGS.stats
+
+        self.assertEqual(missing, ["gone.txt"])
+        self.assertEqual(batched_diff, single_diff)
+        self.assertGreater(stats["git ls-tree"].calls, 1)
+        self.assertGreater(stats["git diff"].calls, 1)
+        self.assertIn("Commands:", command_runner.TIMINGS.report_lines()[0])
+
+    def test_exclusion_rules_combine_globs_gitattributes_and_line_threshold(self) -> None:
+        from exclusion_rules import compile_patterns
+
+        matcher = compile_patterns(["*.min.js", "/docs/generated/", "**/fixtures/*.json", "vendor/"])
+        assert matcher is not None
+        self.assertTrue(matcher.search("web/app.min.js"))
+        self.assertTrue(matcher.search("docs/generated/api.md"))
+        self.assertFalse(matcher.search("src/docs/generated/api.md"))
+        self.assertTrue(matcher.search("a/b/fixtures/data.json"))
+        self.assertTrue(matcher.search("third/vendor/lib.py"))
+        self.assertFalse(matcher.search("vendor.py"))
+
+        # `!` re-includes; the last matching pattern wins, and `\!` is a literal bang.
+        negated = MODULE.ExclusionRules(["*.lock", "!keep.lock", "vendor/", "!vendor/patched/", "\\!bang"])
+        self.assertTrue(negated.matches_pattern("yarn.lock"))
+        self.assertFalse(negated.matches_pattern("sub/keep.lock"))
+        self.assertTrue(negated.matches_pattern("vendor/lib.py"))
+        self.assertFalse(negated.matches_pattern("vendor/patched/fix.py"))
+        self.assertTrue(negated.matches_pattern("!bang"))
+        self.assertFalse(MODULE.ExclusionRules(["!*.py"]).matches_pattern("a.py"))
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            clone = self._make_pr_remote_clone(Path(tmpdir))
+            os.chdir(clone)
+            (clone / ".gitattributes").write_text(
+                "gen/** linguist-generated\n*.dat binary\n", encoding="utf-8"
+            )
+            (clone / "gen").mkdir()
+            (clone / "gen" / "schema.py").write_text("generated\n", encoding="utf-8")
+            (clone / "blob.dat").write_text("data\n", encoding="utf-8")
+            (clone / "big.txt").write_text("line\n" * 30, encoding="utf-8")
+            (clone / "small.txt").write_text("line\n", encoding="utf-8")
+            (clone / "yarn.lock").write_text("lock\n", encoding="utf-8")
+            self._git("add", ".")
+            self._git("commit", "-qm", "mixed files")
+            files = ["big.txt", "blob.dat", "gen/schema.py", "small.txt", "yarn.lock"]
+
+            MODULE.configure_exclusion_rules(MODULE.build_exclusion_rules(max_changed_lines=10))
+            with contextlib.redirect_stdout(io.StringIO()) as output:
+                diff_stats = MODULE.collect_pr_diff_stats("origin/main", "HEAD", files)
+                included, excluded = MODULE.filter_excluded_files(files, diff_stats)
+
+            MODULE.configure_exclusion_rules(
+                MODULE.build_exclusion_rules(use_defaults=False, use_gitattributes=False)
+            )
+            with contextlib.redirect_stdout(io.StringIO()):
+                unfiltered, _ = MODULE.filter_excluded_files(files)
+
+            # An item's own .gitattributes apply, not the checked-out branch's (git 2.40+);
+            # older git falls back to the working tree once and stays there.
+            head = self._git("rev-parse", "HEAD")
+            self._git("checkout", "-q", "origin/main")
+            rules = MODULE.ExclusionRules([])
+            by_revision = rules.classify(files, revision=head)
+            by_worktree = rules.classify(files)
+            self._git("checkout", "-q", "-")
+
+        self.assertEqual(included, ["small.txt"])
+        self.assertEqual(excluded, ["big.txt", "blob.dat", "gen/schema.py", "yarn.lock"])
+        self.assertIn("big.txt (30 changed lines)", output.getvalue())
+        self.assertIn("blob.dat (-diff)", output.getvalue())
+        self.assertIn("gen/schema.py (linguist-generated)", output.getvalue())
+        self.assertIn("yarn.lock (pattern)", output.getvalue())
+        self.assertEqual(unfiltered, files)
+        self.assertEqual(by_worktree, {})
+        if rules._source_supported:
+            self.assertEqual(by_revision, {"blob.dat": "-diff", "gen/schema.py": "linguist-generated"})
+        else:
+            self.assertEqual(by_revision, {})
+
+    def test_diff_stats_prepass_plans_budget_and_feeds_summary(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            clone = self._make_pr_remote_clone(Path(tmpdir))
+            os.chdir(clone)
+            (clone / "kept.txt").write_text("base\nmore\n", encoding="utf-8")
+            (clone / "big.txt").write_text("a fairly long line of text\n" * 200, encoding="utf-8")
+            (clone / "image.png").write_bytes(b"\x89PNG\x00" * 100)
+            self._git("add", ".")
+            self._git("commit", "-qm", "mixed sizes")
+            files = ["big.txt", "image.png", "kept.txt"]
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                stats = MODULE.collect_pr_diff_stats("origin/main", "HEAD", files)
+                document = MODULE.build_pr_document(
+                    {"number": 7, "title": "Sizes", "branch": "feature"},
+                    files,
+                    [],
+                    files,
+                    [],
+                    base_branch="origin/main",
+                    local_branch="HEAD",
+                    diff_stats=stats,
+                    diff_budget_bytes=1000,
+                )
+                left_out = MODULE.build_pr_document(
+                    {"number": 7, "title": "Sizes", "branch": "feature"},
+                    ["big.txt", "image.png"],
+                    [],
+                    files,
+                    [],
+                    base_branch="origin/main",
+                    local_branch="HEAD",
+                    diff_stats=stats,
+                    diff_budget_bytes=1000,
+                )
+                summary_path = Path(tmpdir) / "summary.txt"
+                MODULE.create_summary_compilation(
+                    [
+                        ({"number": 7, "title": "Sizes"}, "pr-7.txt"),
+                        ({"number": 8, "title": "Lines"}, "pr-8.txt"),
+                    ],
+                    "7-8",
+                    "7-8",
+                    [7, 8],
+                    str(summary_path),
+                    diff_stats={7: stats, 8: {"kept.txt": stats["kept.txt"]}},
+                )
+            summary = summary_path.read_text(encoding="utf-8")
+
+        self.assertEqual((stats["big.txt"].status, stats["big.txt"].added), ("A", 200))
+        self.assertEqual(stats["big.txt"].new_size, 5400)
+        self.assertTrue(stats["image.png"].binary)
+        self.assertEqual(stats["image.png"].new_size, 500)
+        self.assertEqual((stats["kept.txt"].added, stats["kept.txt"].deleted), (1, 0))
+        self.assertEqual([command[-1] for command in document["diffCommands"]], ["kept.txt"])
+        self.assertIn("# Diff stats: 3 file(s), +201 -0, 1 binary", document["head"])
+        self.assertIn("# Binary files (not diffed): image.png (binary, 0 -> 500 bytes)", document["head"])
+        self.assertIn("# Over diff budget of 1000 bytes (not diffed, largest first): big.txt", document["head"])
+        self.assertIn("# Estimated diff size: ~", document["head"])
+        self.assertEqual(left_out["diffCommands"], [])
+        self.assertIn(
+            "# No diff written: every included file was left out (1 binary, 1 over the diff budget)",
+            left_out["head"],
+        )
+        self.assertIn("- Diff stats: 3 file(s), +201 -0, 1 binary", summary)
+        self.assertIn("- Largest changes: big.txt (+200 -0), kept.txt (+1 -0)", summary)
+        self.assertIn("- kept.txt: 2 PR(s), 2 changed line(s) (#7, #8)", summary)
+
+    def test_run_profile_times_phases_and_writes_json(self) -> None:
+        from command_runner import CommandTimings
+
+        timings = CommandTimings()
+        timings.record(["git", "diff", "a", "b"], 0.5)
+        timings.record(["gh", "api", "repos/o/r"], 0.25, returncode=1)
+        profile = RunProfile(timings=timings)
+        with profile.phase("diff"):
+            pass
+        with self.assertRaises(RuntimeError):
+            with profile.phase("diff"):
+                raise RuntimeError("boom")
+        profile.count("apiRequests", 3)
+        profile.count("apiRequests")
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = profile.write_json(os.path.join(tmpdir, "profile.json"))
+            with open(path, encoding="utf-8") as profile_file:
+                data = json.load(profile_file)
+
+        self.assertEqual(data["phases"]["diff"]["calls"], 2)
+        self.assertEqual(data["counters"], {"apiRequests": 4, "subprocesses": 2})
+        self.assertEqual(data["commands"]["gh api"]["failures"], 1)
+        self.assertGreaterEqual(data["wallSeconds"], 0)
+        lines = profile.summary_lines()
+        self.assertTrue(lines[0].startswith("Profile:"))
+        self.assertTrue(any(line.strip().startswith("diff") for line in lines))
+        self.assertIn("  apiRequests: 4", lines)
+
+    def test_benchmark_runs_batch_tools_offline_against_synthetic_repo(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            results = run_scale(
+                Path(tmpdir) / "scale-5", BenchShape(items=5, files_per_item=3), ["pr", "commit"]
+            )
+            pr_outputs = sorted(os.listdir(Path(tmpdir) / "scale-5" / "pr-output"))
+
+        self.assertEqual([result.exitCode for result in results], [0, 0])
+        self.assertTrue(all(result.subprocesses for result in results))
+        self.assertGreater(results[0].ghCalls, 0)
+        self.assertIn("pr-5-implementation-with-logs.txt", pr_outputs)
+
+        baseline = [{"tool": "pr", "items": 5, "wallSeconds": 1.0, "subprocesses": 10}]
+        current = [{"tool": "pr", "items": 5, "wallSeconds": 1.5, "subprocesses": 12}]
+        self.assertEqual(
+            compare_results(current, baseline, max_regression=25.0),
+            ["REGRESSION pr @ 5: wall 1.00s -> 1.50s (+50.0%), subprocesses 10 -> 12"],
+        )
+        self.assertTrue(compare_results(current, baseline, max_regression=60.0)[0].startswith("ok"))
 
 
 if __name__ == "__main__":